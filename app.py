@@ -5,12 +5,17 @@ Main Streamlit Application Entry Point
 
 import os
 import sys
+import importlib
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
 import streamlit as st
 
-# Add project root to path
-sys.path.insert(0, str(Path(__file__).parent))
+# Add project root to path (once; app.py is re-executed on every rerun)
+_PROJECT_ROOT = str(Path(__file__).parent)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
 
 # Configure Streamlit page
 st.set_page_config(
@@ -25,60 +30,80 @@ from app.db import init_database_simple, create_all_tables
 
 @st.cache_resource
 def initialize_database():
-    """Initialize database (cached to run only once)."""
+    """
+    Initialize database (cached to run only once).
+    The engine and session factory stay process-wide in app.db.session
+    (sessions never expire their objects on commit).
+    """
     engine = init_database_simple()
     create_all_tables(engine)
     return True
 
 initialize_database()
 
-# Import UI pages
-from app.ui import (
-    render_login_page,
-    render_dashboard_page,
-    render_import_page,
-    render_payroll_page,
-    render_export_page,
-    render_reports_page,
-    render_user_management_page,
-    render_audit_log_page,
-    render_settings_page,
-)
-from app.ui.pages import is_logged_in, logout, has_role, get_current_user
-from app.db import UserRole
+
+# Navigation label -> app.ui renderer name (resolved lazily via _page)
+PAGES = {
+    "📊 控制面板": "render_dashboard_page",
+    "📥 数据导入": "render_import_page",
+    "💰 工资计算": "render_payroll_page",
+    "📤 报表导出": "render_export_page",
+    "📈 报表中心": "render_reports_page",
+    "👥 用户管理": "render_user_management_page",
+    "📋 审计日志": "render_audit_log_page",
+    "⚙️ 系统设置": "render_settings_page",
+}
+
+
+@lru_cache(maxsize=None)
+def _page(name: str):
+    """Resolve a UI function on first use (page modules are imported lazily)."""
+    return getattr(importlib.import_module("app.ui"), name)
+
+
+@st.cache_resource
+def load_env_master_key() -> Optional[str]:
+    """
+    Read the development master key from the environment (cached to run only once).
+    Also initializes the encryption manager with it.
+    """
+    env_key = os.environ.get("TEST_MASTER_KEY")
+    if env_key:
+        from app.security.core import get_encryption_manager
+        try:
+            get_encryption_manager(env_key)
+        except:
+            pass
+    return env_key
 
 
 def main():
     """Main application entry point."""
+    ss = st.session_state  # bind the session state proxy once per rerun
     
     # Check if master key is set (required for encryption)
-    if "master_key" not in st.session_state:
+    if "master_key" not in ss:
         # Try to get from environment for development
-        env_key = os.environ.get("TEST_MASTER_KEY")
+        env_key = load_env_master_key()
         if env_key:
-            st.session_state["master_key"] = env_key
-            # Initialize encryption manager
-            from app.security.core import get_encryption_manager
-            try:
-                get_encryption_manager(env_key)
-            except:
-                pass
+            ss["master_key"] = env_key
     
     # Check login status
-    if not is_logged_in():
-        render_login_page()
+    user = ss.get("user")
+    if user is None:
+        _page("render_login_page")()
         return
     
     # Sidebar navigation
     with st.sidebar:
-        st.title("💰 薪酬管理系统")
-        st.divider()
-        
-        user = get_current_user()
-        st.write(f"👤 {user['username']}")
-        st.write(f"🔑 {user['role']}")
-        
-        st.divider()
+        # Static header as a single element (one delta instead of five)
+        st.markdown(
+            "# 💰 薪酬管理系统\n"
+            "---\n"
+            f"👤 {user['username']}  \n"
+            f"🔑 {user['role']}\n"
+            "\n---"
+        )
         
         # Page mapping for quick action buttons
         page_mapping = {
@@ -89,26 +114,15 @@ def main():
         }
         
         # Get current page from session state (set by quick action buttons)
-        page_options = [
-            "📊 控制面板",
-            "📥 数据导入",
-            "💰 工资计算",
-            "📤 报表导出",
-            "📈 报表中心",
-            "👥 用户管理",
-            "📋 审计日志",
-            "⚙️ 系统设置",
-        ]
+        page_options = list(PAGES)
         
-        # Check if quick action button set a page
-        quick_page = st.session_state.get("page")
+        # Check if quick action button set a page (and clear it after using it)
+        quick_page = ss.pop("page", None)
         default_index = 0
         if quick_page and quick_page in page_mapping:
             target_page = page_mapping[quick_page]
             if target_page in page_options:
                 default_index = page_options.index(target_page)
-            # Clear the quick action page after using it
-            del st.session_state["page"]
         
         # Navigation menu
         page = st.radio(
@@ -121,26 +135,11 @@ def main():
         st.divider()
         
         if st.button("🚪 退出登录", use_container_width=True):
-            logout()
+            _page("logout")()
             st.rerun()
     
     # Render selected page
-    if page == "📊 控制面板":
-        render_dashboard_page()
-    elif page == "📥 数据导入":
-        render_import_page()
-    elif page == "💰 工资计算":
-        render_payroll_page()
-    elif page == "📤 报表导出":
-        render_export_page()
-    elif page == "📈 报表中心":
-        render_reports_page()
-    elif page == "👥 用户管理":
-        render_user_management_page()
-    elif page == "📋 审计日志":
-        render_audit_log_page()
-    elif page == "⚙️ 系统设置":
-        render_settings_page()
+    _page(PAGES[page])()
 
 
 if __name__ == "__main__":
@@ -6,7 +6,11 @@ Provides ORM models, repositories, and session management.
 from .session import (
     init_database_simple,
     create_all_tables,
+    migrate_json_columns,
+    migrate_legacy_ciphertexts,
+    optimize_database,
     session_scope,
+    bulk_session_scope,
     get_engine,
 )
 from .models import (
@@ -33,13 +37,23 @@ from .repositories import (
     PayrollRunRepository,
     PayrollSlipRepository,
     AuditLogRepository,
+    PeriodBundle,
+)
+from .audit_writer import (
+    AuditLogWriter,
+    get_audit_writer,
+    flush_audit_logs,
 )
 
 __all__ = [
     # Session
     "init_database_simple",
     "create_all_tables",
+    "migrate_json_columns",
+    "migrate_legacy_ciphertexts",
+    "optimize_database",
     "session_scope",
+    "bulk_session_scope",
     "get_engine",
     # Models
     "Base",
@@ -64,4 +78,9 @@ __all__ = [
     "PayrollRunRepository",
     "PayrollSlipRepository",
     "AuditLogRepository",
+    "PeriodBundle",
+    # Audit writer
+    "AuditLogWriter",
+    "get_audit_writer",
+    "flush_audit_logs",
 ]
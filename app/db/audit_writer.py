@@ -0,0 +1,215 @@
+"""
+Audit Log Writer - 审计日志批量写入器
+Buffers audit log entries in memory and persists them in batches
+from a background thread, keeping audit inserts off the request path.
+"""
+
+import atexit
+import os
+import threading
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .session import session_scope
+from .repositories import AuditLogRepository
+
+
+class AuditLogWriter:
+    """
+    Buffered audit log writer.
+    审计日志缓冲写入器
+    
+    Entries are flushed with one bulk INSERT when `batch_size` entries are
+    pending or every `flush_interval` seconds, whichever comes first.
+    Pending entries are also flushed at interpreter exit.
+    """
+    
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.5):
+        """
+        Initialize audit log writer.
+        
+        Args:
+            batch_size: Number of pending entries that triggers an immediate flush
+            flush_interval: Maximum seconds an entry waits before being written
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def enqueue(
+        self,
+        actor: str,
+        action: str,
+        result: str = "success",
+        resource_type: Optional[str] = None,
+        resource_id: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Queue an audit log entry (timestamped now, written later)."""
+        entry = {
+            "actor": actor,
+            "action": action,
+            "result": result,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "metadata": metadata,
+            "created_at": datetime.utcnow(),
+        }
+        
+        with self._buffer_lock:
+            self._buffer.append(entry)
+            pending = len(self._buffer)
+        
+        self._ensure_started()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+    
+    def enqueue_on_commit(self, session: Session, **entry: Any) -> None:
+        """
+        Queue an audit log entry once `session` commits.
+        
+        The entry describes work done in that session, so it is dropped if
+        the transaction rolls back instead of recording a change that never
+        happened. Takes the same keyword arguments as enqueue().
+        """
+        # Make sure there is a transaction to commit, even if the session
+        # has not touched the database yet
+        if not session.in_transaction():
+            session.begin()
+        self._watch_transaction(session)
+        session.info.setdefault("audit_pending", []).append(entry)
+    
+    def _watch_transaction(self, session: Session) -> None:
+        """Register the commit/rollback listeners on session, once."""
+        if not session.info.get("audit_hooks"):
+            session.info["audit_hooks"] = True
+            event.listen(session, "after_commit", self._on_commit)
+            event.listen(session, "after_transaction_end", self._on_transaction_end)
+    
+    def _on_commit(self, session: Session) -> None:
+        session.info.pop("audit_flushed", None)
+        for entry in session.info.pop("audit_pending", ()):
+            self.enqueue(**entry)
+    
+    def _on_transaction_end(self, session: Session, transaction) -> None:
+        # Savepoints ending do not decide anything; only the outer transaction
+        if transaction.parent is not None:
+            return
+        # Still set here means no commit: rolled back, or the session closed
+        session.info.pop("audit_pending", None)
+        # Entries flushed into this transaction were never committed; put
+        # them back in the buffer rather than losing them
+        flushed = session.info.pop("audit_flushed", None)
+        if flushed:
+            with self._buffer_lock:
+                self._buffer[:0] = flushed
+            self._ensure_started()
+    
+    def flush(self, session: Optional[Session] = None) -> int:
+        """
+        Write all pending entries now.
+        
+        Args:
+            session: Write into this session's transaction instead of a new
+                one, so the entries commit with the caller's work; if that
+                transaction ends without committing they return to the buffer
+        
+        Returns:
+            Number of entries written
+        """
+        with self._flush_lock:
+            with self._buffer_lock:
+                entries, self._buffer = self._buffer, []
+            
+            if not entries:
+                return 0
+            
+            try:
+                if session is not None:
+                    AuditLogRepository.bulk_create(session, entries)
+                    # Re-queued by _on_transaction_end unless the caller commits
+                    self._watch_transaction(session)
+                    session.info.setdefault("audit_flushed", []).extend(entries)
+                else:
+                    with session_scope() as own_session:
+                        AuditLogRepository.bulk_create(own_session, entries)
+            except Exception:
+                # Keep entries for the next attempt rather than losing audit records
+                with self._buffer_lock:
+                    self._buffer[:0] = entries
+                raise
+            
+            return len(entries)
+    
+    def pending_count(self) -> int:
+        """Number of entries waiting to be written."""
+        with self._buffer_lock:
+            return len(self._buffer)
+    
+    def _ensure_started(self) -> None:
+        """Start the background flush thread on first use."""
+        if self._thread is not None:
+            return
+        
+        with self._buffer_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-log-writer", daemon=True
+                )
+                self._thread.start()
+    
+    def _run(self) -> None:
+        """Background loop: flush on batch size or interval."""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Warning: audit log flush failed, will retry: {e}")
+
+
+# Singleton instance
+_audit_writer: Optional[AuditLogWriter] = None
+_audit_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditLogWriter:
+    """
+    Get or create the singleton AuditLogWriter instance.
+    
+    Batch size and flush interval can be tuned with the AUDIT_BATCH_SIZE
+    and AUDIT_FLUSH_INTERVAL environment variables.
+    
+    Returns:
+        AuditLogWriter instance
+    """
+    global _audit_writer
+    
+    if _audit_writer is None:
+        with _audit_writer_lock:
+            if _audit_writer is None:
+                _audit_writer = AuditLogWriter(
+                    batch_size=int(os.environ.get("AUDIT_BATCH_SIZE", "100")),
+                    flush_interval=float(os.environ.get("AUDIT_FLUSH_INTERVAL", "0.5")),
+                )
+    
+    return _audit_writer
+
+
+def flush_audit_logs(session: Optional[Session] = None) -> int:
+    """Flush pending audit log entries, if a writer has been created."""
+    if _audit_writer is None:
+        return 0
+    return _audit_writer.flush(session)
+
+
+atexit.register(flush_audit_logs)
@@ -5,14 +5,78 @@ SQLAlchemy ORM models for the payroll management system.
 
 import enum
 from datetime import datetime, date
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, Dict, Any, List
 
 from sqlalchemy import (
-    Column, Integer, String, Text, Boolean, Date, DateTime,
-    Numeric, Enum, ForeignKey, JSON, Index, UniqueConstraint
+    Column, Integer, BigInteger, String, Text, Boolean, Date, DateTime,
+    Numeric, ForeignKey, JSON, Index, UniqueConstraint, cast, func
 )
-from sqlalchemy.orm import DeclarativeBase, relationship, Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import DeclarativeBase, relationship, Mapped, mapped_column, validates
+from sqlalchemy.types import TypeDecorator
+
+
+# JSON column type: native JSONB on PostgreSQL, JSON (TEXT + JSON1) on SQLite
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
+class EnumString(TypeDecorator):
+    """
+    Python enum stored as a short VARCHAR.
+    枚举字符串列
+    
+    Stores the member name, which is what SQLAlchemy's Enum type wrote,
+    so existing rows read back unchanged. Unlike Enum there is no CHECK
+    constraint or native enum type; conversion happens only in Python.
+    """
+    impl = String(16)
+    cache_ok = True
+    
+    def __init__(self, enum_class: type, length: int = 16):
+        super().__init__(length)
+        self.enum_class = enum_class
+    
+    def coerce(self, value: Any) -> Optional[enum.Enum]:
+        """Accept a member, member name or member value."""
+        if value is None or isinstance(value, self.enum_class):
+            return value
+        try:
+            return self.enum_class[value]
+        except KeyError:
+            return self.enum_class(value)
+    
+    def process_bind_param(self, value: Any, dialect) -> Optional[str]:
+        member = self.coerce(value)
+        return member.name if member is not None else None
+    
+    def process_result_value(self, value: Optional[str], dialect) -> Optional[enum.Enum]:
+        return self.coerce(value)
+
+
+def cents_property(attr: str) -> hybrid_property:
+    """
+    Integer-cents view of a 2-decimal money column.
+    金额列的整数分视图
+    
+    Reads as int on instances and as ROUND(col * 100) in SQL, so hot
+    arithmetic and DB aggregates can stay in exact integer units while the
+    column itself remains Numeric for compatibility.
+    """
+    def fget(self) -> Optional[int]:
+        value = getattr(self, attr)
+        if value is None:
+            return None
+        return int((Decimal(value) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+    
+    def fset(self, cents: int) -> None:
+        setattr(self, attr, Decimal(int(cents)).scaleb(-2))
+    
+    def expr(cls):
+        return cast(func.round(getattr(cls, attr) * 100), BigInteger)
+    
+    return hybrid_property(fget, fset, expr=expr)
 
 
 class Base(DeclarativeBase):
@@ -66,7 +130,7 @@ class User(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     username: Mapped[str] = mapped_column(String(50), unique=True, nullable=False, index=True)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
-    role: Mapped[UserRole] = mapped_column(Enum(UserRole), default=UserRole.EMPLOYEE)
+    role: Mapped[UserRole] = mapped_column(EnumString(UserRole), default=UserRole.EMPLOYEE)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     
     # Optional: Link to employee record
@@ -80,6 +144,11 @@ class User(Base):
     # Relationships
     employee = relationship("Employee", back_populates="user")
     
+    @validates("role")
+    def _validate_role(self, key: str, value: Any) -> UserRole:
+        # Same coercion the column type applies when binding
+        return self.__table__.c.role.type.coerce(value)
+    
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', role={self.role.value})>"
 
@@ -102,7 +171,7 @@ class Employee(Base):
     id_number_encrypted: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     # Status
-    status: Mapped[EmployeeStatus] = mapped_column(Enum(EmployeeStatus), default=EmployeeStatus.ACTIVE)
+    status: Mapped[EmployeeStatus] = mapped_column(EnumString(EmployeeStatus), default=EmployeeStatus.ACTIVE)
     
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -121,6 +190,11 @@ class Employee(Base):
         Index("idx_employee_status", "status"),
     )
     
+    @validates("status")
+    def _validate_status(self, key: str, value: Any) -> EmployeeStatus:
+        # Same coercion the column type applies when binding
+        return self.__table__.c.status.type.coerce(value)
+    
     def __repr__(self):
         return f"<Employee(id={self.id}, no='{self.employee_no}', name='{self.name}')>"
 
@@ -141,9 +215,13 @@ class SalaryStructure(Base):
     overtime_multiplier: Mapped[Decimal] = mapped_column(Numeric(4, 2), nullable=False, default=Decimal("1.5"))
     daily_deduction: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False, default=0)
     
+    base_salary_cents = cents_property("base_salary")
+    hourly_rate_cents = cents_property("hourly_rate")
+    daily_deduction_cents = cents_property("daily_deduction")
+    
     # JSON fields for flexible allowances and deductions
-    allowances_json: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # {"餐补": 500, "交通": 200}
-    deductions_json: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # {"社保": 800, "公积金": 600}
+    allowances_json: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONType, nullable=True)  # {"餐补": 500, "交通": 200}
+    deductions_json: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONType, nullable=True)  # {"社保": 800, "公积金": 600}
     
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -202,8 +280,9 @@ class Adjustment(Base):
     period: Mapped[str] = mapped_column(String(7), nullable=False)  # "2024-01" format
     
     # Adjustment details
-    adjustment_type: Mapped[AdjustmentType] = mapped_column(Enum(AdjustmentType), nullable=False)
+    adjustment_type: Mapped[AdjustmentType] = mapped_column(EnumString(AdjustmentType), nullable=False)
     amount: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
+    amount_cents = cents_property("amount")
     reason: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     
     # Timestamps
@@ -215,7 +294,8 @@ class Adjustment(Base):
     # Indexes
     __table_args__ = (
         Index("idx_adjustment_period", "period"),
-        Index("idx_adjustment_employee_period", "employee_id", "period"),
+        # Covers the per-employee period sums: type and amount come from the index
+        Index("idx_adjustment_employee_period_amount", "employee_id", "period", "adjustment_type", "amount"),
     )
     
     def __repr__(self):
@@ -233,7 +313,7 @@ class PayrollRun(Base):
     period: Mapped[str] = mapped_column(String(7), nullable=False, index=True)  # "2024-01" format
     
     # Status
-    status: Mapped[PayrollStatus] = mapped_column(Enum(PayrollStatus), default=PayrollStatus.DRAFT)
+    status: Mapped[PayrollStatus] = mapped_column(EnumString(PayrollStatus), default=PayrollStatus.DRAFT)
     
     # Summary statistics (encrypted for security)
     total_employees: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -241,6 +321,10 @@ class PayrollRun(Base):
     total_deductions: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
     total_net: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
     
+    total_gross_cents = cents_property("total_gross")
+    total_deductions_cents = cents_property("total_deductions")
+    total_net_cents = cents_property("total_net")
+    
     # Metadata
     generated_by: Mapped[str] = mapped_column(String(50), nullable=False)
     locked_by: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
@@ -284,6 +368,19 @@ class PayrollSlip(Base):
     total_deductions: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False, default=0)
     net_salary: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False, default=0)
     
+    # Integer-cents views of the amounts above
+    base_salary_cents = cents_property("base_salary")
+    overtime_pay_cents = cents_property("overtime_pay")
+    allowances_total_cents = cents_property("allowances_total")
+    adjustments_add_cents = cents_property("adjustments_add")
+    gross_salary_cents = cents_property("gross_salary")
+    absence_deduction_cents = cents_property("absence_deduction")
+    deductions_total_cents = cents_property("deductions_total")
+    adjustments_deduct_cents = cents_property("adjustments_deduct")
+    tax_cents = cents_property("tax")
+    total_deductions_cents = cents_property("total_deductions")
+    net_salary_cents = cents_property("net_salary")
+    
     # Detailed breakdown (encrypted JSON)
     details_encrypted: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
@@ -297,7 +394,8 @@ class PayrollSlip(Base):
     # Constraints
     __table_args__ = (
         UniqueConstraint("payroll_run_id", "employee_id", name="uq_slip_run_employee"),
-        Index("idx_slip_employee", "employee_id"),
+        Index("idx_slip_run_created", "payroll_run_id", "created_at"),
+        Index("idx_slip_employee_run", "employee_id", "payroll_run_id"),  # 员工历史工资条
     )
     
     def __repr__(self):
@@ -325,7 +423,7 @@ class AuditLog(Base):
     result: Mapped[str] = mapped_column(String(20), nullable=False, default="success")  # success, failure, error
     
     # Additional metadata (JSON)
-    metadata_json: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    metadata_json: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONType, nullable=True)
     
     # Timestamp (cannot be modified)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
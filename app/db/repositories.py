@@ -3,13 +3,16 @@ Database Repositories - 数据访问层
 Provides repository pattern for database operations.
 """
 
-import json
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, date
 from decimal import Decimal
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Iterator
 
-from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete, func, and_, or_
+from sqlalchemy.orm import Session, defer
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy import select, insert, update, delete, func, and_, or_, case, lambda_stmt, bindparam, text, Row
+from sqlalchemy.dialects import sqlite, postgresql
 
 from .models import (
     User, UserRole,
@@ -23,6 +26,64 @@ from .models import (
 )
 
 
+# Hot single-row getters below are built with lambda_stmt: the statement is
+# constructed and its cache key computed once per call site, with the closure
+# variables bound as parameters, instead of rebuilding the select() each call.
+# They look up unique keys, so they LIMIT 1 and take first() rather than
+# paying scalar_one_or_none()'s extra-row check.
+
+# Max bound parameters per IN (...) query, kept well under SQLite's limit
+IN_CLAUSE_CHUNK_SIZE = 500
+
+
+def _chunked(values: Iterable[int], size: int = IN_CLAUSE_CHUNK_SIZE) -> Iterator[List[int]]:
+    """Split IDs into lists of at most `size` items for IN (...) queries."""
+    chunk: List[int] = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@dataclass
+class PeriodBundle:
+    """
+    Payroll inputs for one period, keyed by employee ID.
+    工资期间数据包
+    """
+    period: str
+    structures: Dict[int, SalaryStructure] = field(default_factory=dict)
+    attendance: Dict[int, Attendance] = field(default_factory=dict)
+    adjustment_cents: Dict[int, Tuple[int, int]] = field(default_factory=dict)
+    
+    def adjustment_totals_cents(self, employee_id: int) -> Tuple[int, int]:
+        """Sum of (additions, deductions) for an employee, in integer cents."""
+        return self.adjustment_cents.get(employee_id, (0, 0))
+    
+    def adjustment_totals(self, employee_id: int) -> Tuple[Decimal, Decimal]:
+        """Sum of (additions, deductions) for an employee."""
+        add_cents, deduct_cents = self.adjustment_totals_cents(employee_id)
+        return _cents_to_decimal(add_cents), _cents_to_decimal(deduct_cents)
+
+
+def _cents_to_decimal(cents: Any) -> Decimal:
+    """Convert an integer-cents aggregate to a 2-decimal Decimal."""
+    return Decimal(int(cents or 0)).scaleb(-2)
+
+
+def _adjustment_cents(adjustment_type: AdjustmentType):
+    """SQL expression: the adjustment amount in cents if it has the given type, else 0."""
+    return case((Adjustment.adjustment_type == adjustment_type, Adjustment.amount_cents), else_=0)
+
+
+def _json_or_none(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Value for a JSON column (None when empty)."""
+    return data or None
+
+
 # =============================================================================
 # User Repository
 # =============================================================================
@@ -57,8 +118,8 @@ class UserRepository:
     @staticmethod
     def get_by_username(session: Session, username: str) -> Optional[User]:
         """Get user by username."""
-        stmt = select(User).where(User.username == username)
-        return session.execute(stmt).scalar_one_or_none()
+        stmt = lambda_stmt(lambda: select(User).where(User.username == username).limit(1))
+        return session.execute(stmt).scalars().first()
     
     @staticmethod
     def list_all(session: Session, active_only: bool = True) -> List[User]:
@@ -69,6 +130,15 @@ class UserRepository:
         stmt = stmt.order_by(User.username)
         return list(session.execute(stmt).scalars().all())
     
+    @staticmethod
+    def list_summary(session: Session, active_only: bool = True) -> List[Row]:
+        """List users as lightweight rows (no password hashes, no ORM objects)."""
+        stmt = select(User.id, User.username, User.role, User.is_active, User.last_login)
+        if active_only:
+            stmt = stmt.where(User.is_active == True)
+        stmt = stmt.order_by(User.username)
+        return list(session.execute(stmt).all())
+    
     @staticmethod
     def update_password(session: Session, user_id: int, password_hash: str) -> bool:
         """Update user password."""
@@ -133,20 +203,66 @@ class EmployeeRepository:
         """Get employee by ID."""
         return session.get(Employee, employee_id)
     
+    @staticmethod
+    def get_by_ids(session: Session, employee_ids: Iterable[int]) -> Dict[int, Employee]:
+        """Get many employees with IN queries, keyed by ID (missing IDs are omitted)."""
+        result: Dict[int, Employee] = {}
+        for chunk in _chunked(set(employee_ids)):
+            stmt = select(Employee).where(Employee.id.in_(chunk))
+            for employee in session.execute(stmt).scalars():
+                result[employee.id] = employee
+        return result
+    
     @staticmethod
     def get_by_employee_no(session: Session, employee_no: str) -> Optional[Employee]:
         """Get employee by employee number."""
-        stmt = select(Employee).where(Employee.employee_no == employee_no)
-        return session.execute(stmt).scalar_one_or_none()
+        stmt = lambda_stmt(lambda: select(Employee).where(Employee.employee_no == employee_no).limit(1))
+        return session.execute(stmt).scalars().first()
+    
+    @staticmethod
+    def get_id_map(session: Session, employee_nos: Iterable[str]) -> Dict[str, int]:
+        """Map employee numbers to IDs with IN queries (unknown numbers are omitted)."""
+        result: Dict[str, int] = {}
+        for chunk in _chunked(set(employee_nos)):
+            stmt = select(Employee.employee_no, Employee.id).where(Employee.employee_no.in_(chunk))
+            result.update(session.execute(stmt).all())
+        return result
+    
+    @staticmethod
+    def create_many(session: Session, rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Create employees with one batched INSERT ... RETURNING.
+        批量创建员工
+        
+        Each row takes the same keys as create().
+        
+        Returns:
+            IDs of the created employees, in row order
+        """
+        if not rows:
+            return []
+        
+        now = datetime.utcnow()
+        params = [{"created_at": now, "updated_at": now, **row} for row in rows]
+        stmt = insert(Employee).returning(Employee.id, sort_by_parameter_order=True)
+        return list(session.execute(stmt, params).scalars())
     
     @staticmethod
     def list_all(
         session: Session,
         status: Optional[EmployeeStatus] = None,
         department: Optional[str] = None,
+        load_encrypted: bool = False,
     ) -> List[Employee]:
-        """List employees with optional filters."""
+        """
+        List employees with optional filters.
+        
+        The encrypted bank card and ID number tokens are deferred unless
+        load_encrypted is set; accessing them otherwise costs a SELECT each.
+        """
         stmt = select(Employee)
+        if not load_encrypted:
+            stmt = stmt.options(defer(Employee.bank_card_encrypted), defer(Employee.id_number_encrypted))
         
         if status is not None:
             stmt = stmt.where(Employee.status == status)
@@ -157,9 +273,33 @@ class EmployeeRepository:
         return list(session.execute(stmt).scalars().all())
     
     @staticmethod
-    def list_active(session: Session) -> List[Employee]:
+    def list_summary(
+        session: Session,
+        status: Optional[EmployeeStatus] = None,
+        department: Optional[str] = None,
+    ) -> List[Row]:
+        """List employees as lightweight rows without encrypted fields."""
+        stmt = select(
+            Employee.id,
+            Employee.employee_no,
+            Employee.name,
+            Employee.department,
+            Employee.hire_date,
+            Employee.status,
+        )
+        
+        if status is not None:
+            stmt = stmt.where(Employee.status == status)
+        if department is not None:
+            stmt = stmt.where(Employee.department == department)
+        
+        stmt = stmt.order_by(Employee.employee_no)
+        return list(session.execute(stmt).all())
+    
+    @staticmethod
+    def list_active(session: Session, load_encrypted: bool = False) -> List[Employee]:
         """List all active employees."""
-        return EmployeeRepository.list_all(session, status=EmployeeStatus.ACTIVE)
+        return EmployeeRepository.list_all(session, status=EmployeeStatus.ACTIVE, load_encrypted=load_encrypted)
     
     @staticmethod
     def update(
@@ -223,8 +363,8 @@ class SalaryStructureRepository:
             existing.hourly_rate = hourly_rate
             existing.overtime_multiplier = overtime_multiplier
             existing.daily_deduction = daily_deduction
-            existing.allowances_json = json.dumps(allowances) if allowances else None
-            existing.deductions_json = json.dumps(deductions) if deductions else None
+            existing.allowances_json = _json_or_none(allowances)
+            existing.deductions_json = _json_or_none(deductions)
             session.flush()
             return existing
         else:
@@ -234,18 +374,76 @@ class SalaryStructureRepository:
                 hourly_rate=hourly_rate,
                 overtime_multiplier=overtime_multiplier,
                 daily_deduction=daily_deduction,
-                allowances_json=json.dumps(allowances) if allowances else None,
-                deductions_json=json.dumps(deductions) if deductions else None,
+                allowances_json=_json_or_none(allowances),
+                deductions_json=_json_or_none(deductions),
             )
             session.add(structure)
             session.flush()
             return structure
     
+    @staticmethod
+    def bulk_upsert(session: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Create or update salary structures for many employees in one statement.
+        批量创建或更新薪资结构
+        
+        Each row takes the same keys as create_or_update's arguments
+        (employee_id, base_salary, hourly_rate, ...). Later rows win when
+        an employee appears more than once.
+        
+        Returns:
+            Number of rows written
+        """
+        values_by_employee: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            values_by_employee[row["employee_id"]] = {
+                "employee_id": row["employee_id"],
+                "base_salary": row["base_salary"],
+                "hourly_rate": row["hourly_rate"],
+                "overtime_multiplier": row.get("overtime_multiplier", Decimal("1.5")),
+                "daily_deduction": row.get("daily_deduction", Decimal("0")),
+                "allowances_json": _json_or_none(row.get("allowances")),
+                "deductions_json": _json_or_none(row.get("deductions")),
+            }
+        values = list(values_by_employee.values())
+        if not values:
+            return 0
+        
+        dialect = session.get_bind().dialect.name
+        if dialect == "sqlite":
+            stmt = sqlite.insert(SalaryStructure)
+        elif dialect == "postgresql":
+            stmt = postgresql.insert(SalaryStructure)
+        else:
+            for row in rows:
+                SalaryStructureRepository.create_or_update(session, **row)
+            return len(values)
+        
+        updated_columns = (
+            "base_salary", "hourly_rate", "overtime_multiplier", "daily_deduction",
+            "allowances_json", "deductions_json",
+        )
+        set_ = {column: stmt.excluded[column] for column in updated_columns}
+        set_["updated_at"] = datetime.utcnow()
+        stmt = stmt.on_conflict_do_update(index_elements=["employee_id"], set_=set_)
+        session.execute(stmt, values)
+        return len(values)
+    
     @staticmethod
     def get_by_employee(session: Session, employee_id: int) -> Optional[SalaryStructure]:
         """Get salary structure for an employee."""
-        stmt = select(SalaryStructure).where(SalaryStructure.employee_id == employee_id)
-        return session.execute(stmt).scalar_one_or_none()
+        stmt = lambda_stmt(lambda: select(SalaryStructure).where(SalaryStructure.employee_id == employee_id).limit(1))
+        return session.execute(stmt).scalars().first()
+    
+    @staticmethod
+    def get_by_employees(session: Session, employee_ids: Iterable[int]) -> Dict[int, SalaryStructure]:
+        """Get salary structures for many employees, keyed by employee ID."""
+        result: Dict[int, SalaryStructure] = {}
+        for chunk in _chunked(set(employee_ids)):
+            stmt = select(SalaryStructure).where(SalaryStructure.employee_id.in_(chunk))
+            for structure in session.execute(stmt).scalars():
+                result[structure.employee_id] = structure
+        return result
     
     @staticmethod
     def delete_by_employee(session: Session, employee_id: int) -> bool:
@@ -271,8 +469,9 @@ class AttendanceRepository:
         work_hours: int = 0,
         overtime_hours: Decimal = Decimal("0"),
         absence_days: Decimal = Decimal("0"),
+        flush: bool = True,
     ) -> Attendance:
-        """Create attendance record."""
+        """Create attendance record (flush=False defers the INSERT to the next flush/commit)."""
         attendance = Attendance(
             employee_id=employee_id,
             period=period,
@@ -282,7 +481,8 @@ class AttendanceRepository:
             absence_days=absence_days,
         )
         session.add(attendance)
-        session.flush()
+        if flush:
+            session.flush()
         return attendance
     
     @staticmethod
@@ -292,28 +492,142 @@ class AttendanceRepository:
         period: str,
         **kwargs
     ) -> Tuple[Attendance, bool]:
-        """Get existing or create new attendance record."""
-        existing = AttendanceRepository.get_by_employee_period(session, employee_id, period)
-        if existing:
-            # Update if exists
-            for key, value in kwargs.items():
-                setattr(existing, key, value)
-            session.flush()
-            return existing, False
-        else:
+        """
+        Get existing or create new attendance record, updating it with kwargs.
+        
+        On SQLite/PostgreSQL this is a single INSERT ... ON CONFLICT DO UPDATE
+        ... RETURNING against uq_attendance_employee_period, so there is no
+        read-then-write race. Other dialects fall back to select-then-insert.
+        """
+        now = datetime.utcnow()
+        stmt = AttendanceRepository._upsert_stmt(session, employee_id, period, now, kwargs)
+        if stmt is None:
+            existing = AttendanceRepository.get_by_employee_period(session, employee_id, period)
+            if existing:
+                # Update if exists
+                for key, value in kwargs.items():
+                    setattr(existing, key, value)
+                session.flush()
+                return existing, False
             attendance = AttendanceRepository.create(session, employee_id, period, **kwargs)
             return attendance, True
+        
+        attendance = session.scalars(
+            stmt.returning(Attendance), execution_options={"populate_existing": True}
+        ).one()
+        # created_at is only `now` if this call inserted the row
+        return attendance, attendance.created_at == now
+    
+    @staticmethod
+    def upsert(session: Session, employee_id: int, period: str, **kwargs) -> None:
+        """
+        Insert or update an attendance record without loading it.
+        
+        Same write as get_or_create, for callers (bulk imports) that never
+        look at the row. Dialects without ON CONFLICT try an UPDATE first
+        and INSERT only when it matched nothing.
+        """
+        now = datetime.utcnow()
+        stmt = AttendanceRepository._upsert_stmt(session, employee_id, period, now, kwargs)
+        if stmt is not None:
+            session.execute(stmt)
+            return
+        
+        stmt = update(Attendance).where(
+            and_(
+                Attendance.employee_id == employee_id,
+                Attendance.period == period
+            )
+        ).values(updated_at=now, **kwargs)
+        if session.execute(stmt).rowcount == 0:
+            AttendanceRepository.create(session, employee_id, period, flush=False, **kwargs)
+    
+    @staticmethod
+    def bulk_upsert(session: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert or update many attendance records in one executemany.
+        批量写入考勤
+        
+        Each row holds employee_id, period and the columns to set; all rows
+        must set the same columns. Later rows win when an (employee, period)
+        appears more than once. Dialects without ON CONFLICT fall back to
+        upsert() per row.
+        
+        Returns:
+            Number of rows written
+        """
+        values_by_key = {(row["employee_id"], row["period"]): row for row in rows}
+        if not values_by_key:
+            return 0
+        
+        dialect = session.get_bind().dialect.name
+        if dialect == "sqlite":
+            stmt = sqlite.insert(Attendance)
+        elif dialect == "postgresql":
+            stmt = postgresql.insert(Attendance)
+        else:
+            for row in values_by_key.values():
+                AttendanceRepository.upsert(session, **row)
+            return len(values_by_key)
+        
+        now = datetime.utcnow()
+        values = [{"created_at": now, "updated_at": now, **row} for row in values_by_key.values()]
+        set_ = {
+            key: stmt.excluded[key]
+            for key in values[0]
+            if key not in ("employee_id", "period", "created_at")
+        }
+        stmt = stmt.on_conflict_do_update(index_elements=["employee_id", "period"], set_=set_)
+        session.execute(stmt, values)
+        return len(values)
+    
+    @staticmethod
+    def _upsert_stmt(
+        session: Session,
+        employee_id: int,
+        period: str,
+        now: datetime,
+        values: Dict[str, Any],
+    ):
+        """
+        Build INSERT ... ON CONFLICT (employee_id, period) DO UPDATE against
+        uq_attendance_employee_period, or None if the dialect lacks it.
+        """
+        dialect = session.get_bind().dialect.name
+        if dialect == "sqlite":
+            stmt = sqlite.insert(Attendance)
+        elif dialect == "postgresql":
+            stmt = postgresql.insert(Attendance)
+        else:
+            return None
+        
+        stmt = stmt.values(
+            employee_id=employee_id,
+            period=period,
+            created_at=now,
+            updated_at=now,
+            **values,
+        )
+        if values:
+            set_ = {key: stmt.excluded[key] for key in values}
+            set_["updated_at"] = now
+        else:
+            set_ = {"period": stmt.excluded.period}  # no-op update so RETURNING yields the row
+        return stmt.on_conflict_do_update(
+            index_elements=["employee_id", "period"],
+            set_=set_,
+        )
     
     @staticmethod
     def get_by_employee_period(session: Session, employee_id: int, period: str) -> Optional[Attendance]:
         """Get attendance for an employee in a specific period."""
-        stmt = select(Attendance).where(
+        stmt = lambda_stmt(lambda: select(Attendance).where(
             and_(
                 Attendance.employee_id == employee_id,
                 Attendance.period == period
             )
-        )
-        return session.execute(stmt).scalar_one_or_none()
+        ).limit(1))
+        return session.execute(stmt).scalars().first()
     
     @staticmethod
     def list_by_period(session: Session, period: str) -> List[Attendance]:
@@ -321,6 +635,44 @@ class AttendanceRepository:
         stmt = select(Attendance).where(Attendance.period == period)
         return list(session.execute(stmt).scalars().all())
     
+    @staticmethod
+    def iter_by_period(session: Session, period: str, chunk: int = 500) -> Iterator[Attendance]:
+        """Stream attendance records for a period, `chunk` rows at a time."""
+        stmt = (
+            select(Attendance)
+            .where(Attendance.period == period)
+            .execution_options(yield_per=chunk)
+        )
+        yield from session.execute(stmt).scalars()
+    
+    @staticmethod
+    def get_map_by_period(
+        session: Session,
+        period: str,
+        employee_ids: Optional[Iterable[int]] = None,
+    ) -> Dict[int, Attendance]:
+        """
+        Get attendance for a period keyed by employee ID.
+        按期间批量获取考勤
+        
+        Restricted to `employee_ids` when given (chunked IN queries),
+        otherwise every record in the period in one query.
+        """
+        if employee_ids is None:
+            return {a.employee_id: a for a in AttendanceRepository.iter_by_period(session, period)}
+        
+        result: Dict[int, Attendance] = {}
+        for chunk in _chunked(set(employee_ids)):
+            stmt = select(Attendance).where(
+                and_(
+                    Attendance.period == period,
+                    Attendance.employee_id.in_(chunk)
+                )
+            )
+            for attendance in session.execute(stmt).scalars():
+                result[attendance.employee_id] = attendance
+        return result
+    
     @staticmethod
     def list_by_employee(session: Session, employee_id: int) -> List[Attendance]:
         """List all attendance records for an employee."""
@@ -343,8 +695,9 @@ class AdjustmentRepository:
         adjustment_type: AdjustmentType,
         amount: Decimal,
         reason: Optional[str] = None,
+        flush: bool = True,
     ) -> Adjustment:
-        """Create adjustment record."""
+        """Create adjustment record (flush=False defers the INSERT to the next flush/commit)."""
         adjustment = Adjustment(
             employee_id=employee_id,
             period=period,
@@ -353,9 +706,28 @@ class AdjustmentRepository:
             reason=reason,
         )
         session.add(adjustment)
-        session.flush()
+        if flush:
+            session.flush()
         return adjustment
     
+    @staticmethod
+    def bulk_create(session: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Create many adjustments with a plain executemany INSERT (no ORM objects).
+        批量写入调整项
+        
+        Each row takes the same keys as create().
+        
+        Returns:
+            Number of adjustments written
+        """
+        if not rows:
+            return 0
+        
+        created_at = datetime.utcnow()
+        session.execute(insert(Adjustment), [{"created_at": created_at, **row} for row in rows])
+        return len(rows)
+    
     @staticmethod
     def list_by_employee_period(session: Session, employee_id: int, period: str) -> List[Adjustment]:
         """List adjustments for an employee in a specific period."""
@@ -373,21 +745,80 @@ class AdjustmentRepository:
         stmt = select(Adjustment).where(Adjustment.period == period)
         return list(session.execute(stmt).scalars().all())
     
+    @staticmethod
+    def iter_by_period(session: Session, period: str, chunk: int = 500) -> Iterator[Adjustment]:
+        """Stream adjustments for a period, `chunk` rows at a time."""
+        stmt = (
+            select(Adjustment)
+            .where(Adjustment.period == period)
+            .execution_options(yield_per=chunk)
+        )
+        yield from session.execute(stmt).scalars()
+    
     @staticmethod
     def sum_by_employee_period(session: Session, employee_id: int, period: str) -> Tuple[Decimal, Decimal]:
         """Get sum of additions and deductions for an employee in a period."""
-        adjustments = AdjustmentRepository.list_by_employee_period(session, employee_id, period)
-        
-        add_total = Decimal("0")
-        deduct_total = Decimal("0")
+        stmt = select(
+            func.coalesce(func.sum(_adjustment_cents(AdjustmentType.ADD)), 0),
+            func.coalesce(func.sum(_adjustment_cents(AdjustmentType.DEDUCT)), 0),
+        ).where(
+            and_(
+                Adjustment.employee_id == employee_id,
+                Adjustment.period == period
+            )
+        )
+        add_cents, deduct_cents = session.execute(stmt).one()
+        return _cents_to_decimal(add_cents), _cents_to_decimal(deduct_cents)
+    
+    @staticmethod
+    def sum_cents_by_period_grouped(
+        session: Session,
+        period: str,
+        employee_ids: Optional[Iterable[int]] = None,
+    ) -> Dict[int, Tuple[int, int]]:
+        """
+        Get (additions, deductions) sums in integer cents for every employee in a period.
+        按员工汇总期间调整项（分）
         
-        for adj in adjustments:
-            if adj.adjustment_type == AdjustmentType.ADD:
-                add_total += adj.amount
-            else:
-                deduct_total += adj.amount
+        One GROUP BY query for the period (per IN chunk when employee_ids
+        restricts it), summed in the database; employees without
+        adjustments are absent from the result.
+        """
+        stmt = (
+            select(
+                Adjustment.employee_id,
+                func.sum(_adjustment_cents(AdjustmentType.ADD)),
+                func.sum(_adjustment_cents(AdjustmentType.DEDUCT)),
+            )
+            .where(Adjustment.period == period)
+            .group_by(Adjustment.employee_id)
+        )
+        if employee_ids is None:
+            statements = [stmt]
+        else:
+            statements = [
+                stmt.where(Adjustment.employee_id.in_(chunk))
+                for chunk in _chunked(set(employee_ids))
+            ]
         
-        return add_total, deduct_total
+        return {
+            employee_id: (int(add_cents or 0), int(deduct_cents or 0))
+            for chunk_stmt in statements
+            for employee_id, add_cents, deduct_cents in session.execute(chunk_stmt)
+        }
+    
+    @staticmethod
+    def sum_by_period_grouped(
+        session: Session,
+        period: str,
+        employee_ids: Optional[Iterable[int]] = None,
+    ) -> Dict[int, Tuple[Decimal, Decimal]]:
+        """Get (additions, deductions) sums for every employee (or the given ones) in a period."""
+        return {
+            employee_id: (_cents_to_decimal(add_cents), _cents_to_decimal(deduct_cents))
+            for employee_id, (add_cents, deduct_cents)
+            in AdjustmentRepository.sum_cents_by_period_grouped(session, period, employee_ids).items()
+        }
     
     @staticmethod
     def delete_by_id(session: Session, adjustment_id: int) -> bool:
@@ -395,12 +826,96 @@ class AdjustmentRepository:
         stmt = delete(Adjustment).where(Adjustment.id == adjustment_id)
         result = session.execute(stmt)
         return result.rowcount > 0
+    
+    @staticmethod
+    def delete_many(session: Session, adjustment_ids: Iterable[int]) -> int:
+        """Delete many adjustments with one DELETE per IN chunk. Returns rows deleted."""
+        deleted = 0
+        for chunk in _chunked(set(adjustment_ids)):
+            stmt = delete(Adjustment).where(Adjustment.id.in_(chunk))
+            deleted += session.execute(stmt).rowcount
+        return deleted
 
 
 # =============================================================================
 # Payroll Run Repository
 # =============================================================================
 
+# State-changing statements are built once at import; callers only supply
+# parameters, so each execution is a compiled-cache hit. The ORM cannot
+# evaluate bindparam() values into loaded objects, so session sync is off
+# and _expire_run() refreshes the in-session PayrollRun instead.
+_RUN_UPDATE_TOTALS_STMT = update(PayrollRun).execution_options(synchronize_session=False).where(
+    PayrollRun.id == bindparam("run_id")
+).values(
+    total_employees=bindparam("employees"),
+    total_gross=bindparam("gross"),
+    total_deductions=bindparam("deductions"),
+    total_net=bindparam("net"),
+)
+
+def _run_slip_total(expression):
+    """Scalar subquery aggregating `expression` over the slips of run :run_id."""
+    return (
+        select(func.coalesce(expression, 0))
+        .where(PayrollSlip.payroll_run_id == bindparam("run_id"))
+        .scalar_subquery()
+    )
+
+
+_RUN_RECOMPUTE_TOTALS_STMT = update(PayrollRun).execution_options(synchronize_session=False).where(
+    PayrollRun.id == bindparam("run_id")
+).values(
+    total_employees=_run_slip_total(func.count(PayrollSlip.id)),
+    total_gross=_run_slip_total(func.sum(PayrollSlip.gross_salary)),
+    total_deductions=_run_slip_total(func.sum(PayrollSlip.total_deductions)),
+    total_net=_run_slip_total(func.sum(PayrollSlip.net_salary)),
+)
+
+_RUN_TOTAL_COLUMNS = (
+    PayrollRun.total_employees,
+    PayrollRun.total_gross,
+    PayrollRun.total_deductions,
+    PayrollRun.total_net,
+)
+
+_RUN_LOCK_STMT = update(PayrollRun).execution_options(synchronize_session=False).where(
+    and_(
+        PayrollRun.id == bindparam("run_id"),
+        PayrollRun.status == PayrollStatus.DRAFT
+    )
+).values(
+    status=PayrollStatus.LOCKED,
+    locked_by=bindparam("who"),
+    locked_at=bindparam("when"),
+)
+
+_RUN_UNLOCK_STMT = update(PayrollRun).execution_options(synchronize_session=False).where(
+    and_(
+        PayrollRun.id == bindparam("run_id"),
+        PayrollRun.status == PayrollStatus.LOCKED
+    )
+).values(
+    status=PayrollStatus.DRAFT,
+    locked_by=None,
+    locked_at=None,
+)
+
+_RUN_DELETE_STMT = delete(PayrollRun).execution_options(synchronize_session=False).where(
+    and_(
+        PayrollRun.id == bindparam("run_id"),
+        PayrollRun.status == PayrollStatus.DRAFT
+    )
+)
+
+
+def _expire_run(session: Session, run_id: int) -> None:
+    """Expire a loaded PayrollRun so it reloads after a bulk UPDATE."""
+    run = session.identity_map.get(identity_key(PayrollRun, run_id))
+    if run is not None:
+        session.expire(run)
+
+
 class PayrollRunRepository:
     """Repository for PayrollRun operations."""
     
@@ -409,15 +924,17 @@ class PayrollRunRepository:
         session: Session,
         period: str,
         generated_by: str,
+        flush: bool = True,
     ) -> PayrollRun:
-        """Create a new payroll run."""
+        """Create a new payroll run (flush=False defers the INSERT; run.id is unset until then)."""
         run = PayrollRun(
             period=period,
             generated_by=generated_by,
             status=PayrollStatus.DRAFT,
         )
         session.add(run)
-        session.flush()
+        if flush:
+            session.flush()
         return run
     
     @staticmethod
@@ -428,9 +945,26 @@ class PayrollRunRepository:
     @staticmethod
     def get_by_period(session: Session, period: str) -> Optional[PayrollRun]:
         """Get the latest payroll run for a period."""
-        stmt = select(PayrollRun).where(PayrollRun.period == period).order_by(PayrollRun.created_at.desc())
+        stmt = select(PayrollRun).where(PayrollRun.period == period).order_by(PayrollRun.created_at.desc()).limit(1)
         return session.execute(stmt).scalars().first()
     
+    @staticmethod
+    def load_period_bundle(session: Session, period: str, employee_ids: Iterable[int]) -> PeriodBundle:
+        """
+        Load salary structures, attendance and adjustments for a period.
+        批量加载期间工资数据
+        
+        One query per relation (per IN chunk) instead of three per employee;
+        adjustments arrive already summed per employee, in integer cents.
+        """
+        employee_ids = list(employee_ids)
+        return PeriodBundle(
+            period=period,
+            structures=SalaryStructureRepository.get_by_employees(session, employee_ids),
+            attendance=AttendanceRepository.get_map_by_period(session, period, employee_ids),
+            adjustment_cents=AdjustmentRepository.sum_cents_by_period_grouped(session, period, employee_ids),
+        )
+    
     @staticmethod
     def list_all(session: Session, limit: int = 50) -> List[PayrollRun]:
         """List all payroll runs."""
@@ -447,57 +981,69 @@ class PayrollRunRepository:
         total_net: Decimal,
     ) -> bool:
         """Update payroll run totals."""
-        stmt = update(PayrollRun).where(PayrollRun.id == run_id).values(
-            total_employees=total_employees,
-            total_gross=total_gross,
-            total_deductions=total_deductions,
-            total_net=total_net,
-        )
-        result = session.execute(stmt)
+        result = session.execute(_RUN_UPDATE_TOTALS_STMT, {
+            "run_id": run_id,
+            "employees": total_employees,
+            "gross": total_gross,
+            "deductions": total_deductions,
+            "net": total_net,
+        })
+        _expire_run(session, run_id)
         return result.rowcount > 0
     
+    @staticmethod
+    def recompute_totals(session: Session, run_id: int) -> Dict[str, Any]:
+        """
+        Recompute run totals from its slips with a single UPDATE.
+        重新汇总工资批次合计
+        
+        The sums are correlated subqueries over payroll_slips, so no slip
+        rows reach Python; the new totals come back via RETURNING where the
+        backend supports it.
+        
+        Returns:
+            Dict with count, gross, deductions and net
+        """
+        params = {"run_id": run_id}
+        if session.get_bind().dialect.update_returning:
+            row = session.execute(
+                _RUN_RECOMPUTE_TOTALS_STMT.returning(*_RUN_TOTAL_COLUMNS), params
+            ).one()
+        else:
+            session.execute(_RUN_RECOMPUTE_TOTALS_STMT, params)
+            row = session.execute(
+                select(*_RUN_TOTAL_COLUMNS).where(PayrollRun.id == run_id)
+            ).one()
+        _expire_run(session, run_id)
+        
+        count, gross, deductions, net = row
+        return {"count": count, "gross": gross, "deductions": deductions, "net": net}
+    
     @staticmethod
     def lock(session: Session, run_id: int, locked_by: str) -> bool:
         """Lock a payroll run."""
-        stmt = update(PayrollRun).where(
-            and_(
-                PayrollRun.id == run_id,
-                PayrollRun.status == PayrollStatus.DRAFT
-            )
-        ).values(
-            status=PayrollStatus.LOCKED,
-            locked_by=locked_by,
-            locked_at=datetime.utcnow(),
-        )
-        result = session.execute(stmt)
+        result = session.execute(_RUN_LOCK_STMT, {
+            "run_id": run_id,
+            "who": locked_by,
+            "when": datetime.utcnow(),
+        })
+        _expire_run(session, run_id)
         return result.rowcount > 0
     
     @staticmethod
     def unlock(session: Session, run_id: int) -> bool:
         """Unlock a payroll run."""
-        stmt = update(PayrollRun).where(
-            and_(
-                PayrollRun.id == run_id,
-                PayrollRun.status == PayrollStatus.LOCKED
-            )
-        ).values(
-            status=PayrollStatus.DRAFT,
-            locked_by=None,
-            locked_at=None,
-        )
-        result = session.execute(stmt)
+        result = session.execute(_RUN_UNLOCK_STMT, {"run_id": run_id})
+        _expire_run(session, run_id)
         return result.rowcount > 0
     
     @staticmethod
     def delete(session: Session, run_id: int) -> bool:
         """Delete a payroll run (only if in draft status)."""
-        stmt = delete(PayrollRun).where(
-            and_(
-                PayrollRun.id == run_id,
-                PayrollRun.status == PayrollStatus.DRAFT
-            )
-        )
-        result = session.execute(stmt)
+        result = session.execute(_RUN_DELETE_STMT, {"run_id": run_id})
+        run = session.identity_map.get(identity_key(PayrollRun, run_id))
+        if result.rowcount and run is not None:
+            session.expunge(run)
         return result.rowcount > 0
 
 
@@ -525,8 +1071,9 @@ class PayrollSlipRepository:
         total_deductions: Decimal = Decimal("0"),
         net_salary: Decimal = Decimal("0"),
         details_encrypted: Optional[str] = None,
+        flush: bool = True,
     ) -> PayrollSlip:
-        """Create a payroll slip."""
+        """Create a payroll slip (flush=False defers the INSERT to the next flush/commit)."""
         slip = PayrollSlip(
             payroll_run_id=payroll_run_id,
             employee_id=employee_id,
@@ -544,25 +1091,163 @@ class PayrollSlipRepository:
             details_encrypted=details_encrypted,
         )
         session.add(slip)
-        session.flush()
+        if flush:
+            session.flush()
         return slip
     
+    @staticmethod
+    def create_many(session: Session, run_id: int, rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Create slips for a payroll run with one batched INSERT ... RETURNING.
+        批量创建工资条
+        
+        Each row holds employee_id plus the amount fields accepted by create().
+        
+        Returns:
+            IDs of the created slips, in row order
+        """
+        if not rows:
+            return []
+        
+        # One timestamp for the batch instead of the column default per row
+        created_at = datetime.utcnow()
+        params = [{"payroll_run_id": run_id, "created_at": created_at, **row} for row in rows]
+        stmt = insert(PayrollSlip).returning(PayrollSlip.id, sort_by_parameter_order=True)
+        return list(session.execute(stmt, params).scalars())
+    
+    @staticmethod
+    def bulk_create(session: Session, run_id: int, rows: List[Dict[str, Any]]) -> int:
+        """
+        Create slips for a payroll run with a plain executemany INSERT.
+        批量写入工资条（不回传主键）
+        
+        Like create_many() but without RETURNING, which lets the driver
+        use its fastest executemany path when the IDs are not needed.
+        
+        Returns:
+            Number of slips written
+        """
+        if not rows:
+            return 0
+        
+        created_at = datetime.utcnow()
+        session.execute(
+            insert(PayrollSlip),
+            [{"payroll_run_id": run_id, "created_at": created_at, **row} for row in rows],
+        )
+        return len(rows)
+    
     @staticmethod
     def list_by_run(session: Session, run_id: int) -> List[PayrollSlip]:
         """List all slips for a payroll run."""
         stmt = select(PayrollSlip).where(PayrollSlip.payroll_run_id == run_id)
         return list(session.execute(stmt).scalars().all())
     
+    @staticmethod
+    def iter_for_run(
+        session: Session,
+        run_id: int,
+        chunk: int = 1000,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream slips for a payroll run in chunks of dict rows.
+        分块流式读取工资条
+        
+        Rows carry the slip amounts plus employee_no, employee_name,
+        department and bank_card_encrypted, so callers need no per-slip
+        employee lookups. Memory stays bounded by `chunk` rows.
+        
+        Yields:
+            Lists of up to `chunk` row dicts, ordered by slip id
+        """
+        stmt = (
+            select(
+                PayrollSlip.id,
+                PayrollSlip.employee_id,
+                Employee.employee_no,
+                Employee.name.label("employee_name"),
+                Employee.department,
+                Employee.bank_card_encrypted,
+                PayrollSlip.base_salary,
+                PayrollSlip.overtime_pay,
+                PayrollSlip.allowances_total,
+                PayrollSlip.adjustments_add,
+                PayrollSlip.gross_salary,
+                PayrollSlip.absence_deduction,
+                PayrollSlip.deductions_total,
+                PayrollSlip.adjustments_deduct,
+                PayrollSlip.tax,
+                PayrollSlip.total_deductions,
+                PayrollSlip.net_salary,
+            )
+            .outerjoin(Employee, Employee.id == PayrollSlip.employee_id)
+            .where(PayrollSlip.payroll_run_id == run_id)
+            .order_by(PayrollSlip.id)
+            .execution_options(yield_per=chunk)
+        )
+        for partition in session.execute(stmt).mappings().partitions():
+            yield [dict(row) for row in partition]
+    
     @staticmethod
     def get_by_run_employee(session: Session, run_id: int, employee_id: int) -> Optional[PayrollSlip]:
         """Get slip for a specific employee in a run."""
-        stmt = select(PayrollSlip).where(
+        stmt = lambda_stmt(lambda: select(PayrollSlip).where(
             and_(
                 PayrollSlip.payroll_run_id == run_id,
                 PayrollSlip.employee_id == employee_id
             )
+        ).limit(1))
+        return session.execute(stmt).scalars().first()
+    
+    @staticmethod
+    def summary(session: Session, run_id: int) -> Dict[str, Any]:
+        """
+        Aggregate slip totals for a payroll run in one query.
+        汇总工资批次合计
+        
+        Sums run over integer cents, so totals are exact regardless of how
+        the backend stores NUMERIC values.
+        
+        Returns:
+            Dict with count, gross, deductions and net (Decimal)
+        """
+        stmt = select(
+            func.count(PayrollSlip.id),
+            func.coalesce(func.sum(PayrollSlip.gross_salary_cents), 0),
+            func.coalesce(func.sum(PayrollSlip.total_deductions_cents), 0),
+            func.coalesce(func.sum(PayrollSlip.net_salary_cents), 0),
+        ).where(PayrollSlip.payroll_run_id == run_id)
+        count, gross, deductions, net = session.execute(stmt).one()
+        return {
+            "count": count,
+            "gross": _cents_to_decimal(gross),
+            "deductions": _cents_to_decimal(deductions),
+            "net": _cents_to_decimal(net),
+        }
+    
+    @staticmethod
+    def summary_by_department(session: Session, run_id: int) -> List[Row]:
+        """
+        Aggregate slip totals per department for a payroll run.
+        按部门汇总工资批次
+        
+        Returns:
+            Rows of (department, count, gross_cents, deductions_cents, net_cents)
+        """
+        stmt = (
+            select(
+                Employee.department,
+                func.count(PayrollSlip.id).label("count"),
+                func.sum(PayrollSlip.gross_salary_cents).label("gross_cents"),
+                func.sum(PayrollSlip.total_deductions_cents).label("deductions_cents"),
+                func.sum(PayrollSlip.net_salary_cents).label("net_cents"),
+            )
+            .join(Employee, Employee.id == PayrollSlip.employee_id)
+            .where(PayrollSlip.payroll_run_id == run_id)
+            .group_by(Employee.department)
+            .order_by(Employee.department)
         )
-        return session.execute(stmt).scalar_one_or_none()
+        return list(session.execute(stmt).all())
     
     @staticmethod
     def delete_by_run(session: Session, run_id: int) -> int:
@@ -576,6 +1261,18 @@ class PayrollSlipRepository:
 # Audit Log Repository
 # =============================================================================
 
+# (monotonic timestamp, row count) per database URL, for count_approx()
+_AUDIT_COUNT_CACHE: Dict[str, Tuple[float, int]] = {}
+
+
+def _audit_before(created_at: datetime, log_id: int):
+    """Keyset condition: rows strictly after (created_at, id) in newest-first order."""
+    return or_(
+        AuditLog.created_at < created_at,
+        and_(AuditLog.created_at == created_at, AuditLog.id < log_id),
+    )
+
+
 class AuditLogRepository:
     """Repository for AuditLog operations (append-only)."""
     
@@ -588,20 +1285,53 @@ class AuditLogRepository:
         resource_type: Optional[str] = None,
         resource_id: Optional[int] = None,
         metadata: Optional[Dict[str, Any]] = None,
+        flush: bool = True,
     ) -> AuditLog:
-        """Create an audit log entry."""
+        """Create an audit log entry (flush=False defers the INSERT to the next flush/commit)."""
         log = AuditLog(
             actor=actor,
             action=action,
             result=result,
             resource_type=resource_type,
             resource_id=resource_id,
-            metadata_json=json.dumps(metadata) if metadata else None,
+            metadata_json=_json_or_none(metadata),
         )
         session.add(log)
-        session.flush()
+        if flush:
+            session.flush()
         return log
     
+    @staticmethod
+    def bulk_create(session: Session, entries: List[Dict[str, Any]]) -> int:
+        """
+        Create many audit log entries with a single INSERT (no ORM objects).
+        批量写入审计日志
+        
+        Each entry takes the same keys as create() and may carry its own
+        created_at (e.g. when entries were buffered before being written).
+        
+        Returns:
+            Number of entries written
+        """
+        if not entries:
+            return 0
+        
+        now = datetime.utcnow()
+        rows = [
+            {
+                "actor": entry["actor"],
+                "action": entry["action"],
+                "result": entry.get("result", "success"),
+                "resource_type": entry.get("resource_type"),
+                "resource_id": entry.get("resource_id"),
+                "metadata_json": _json_or_none(entry.get("metadata")),
+                "created_at": entry.get("created_at") or now,
+            }
+            for entry in entries
+        ]
+        session.execute(insert(AuditLog), rows)
+        return len(rows)
+    
     @staticmethod
     def list_all(
         session: Session,
@@ -611,8 +1341,15 @@ class AuditLogRepository:
         action: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
+        before: Optional[Tuple[datetime, int]] = None,
     ) -> List[AuditLog]:
-        """List audit logs with filters."""
+        """
+        List audit logs with filters, newest first.
+        
+        For deep pages pass the (created_at, id) of the last row seen as
+        `before` instead of a large `offset`; OFFSET still has to walk and
+        discard every skipped row.
+        """
         stmt = select(AuditLog)
         
         if actor:
@@ -623,16 +1360,113 @@ class AuditLogRepository:
             stmt = stmt.where(AuditLog.created_at >= start_date)
         if end_date:
             stmt = stmt.where(AuditLog.created_at <= end_date)
+        if before:
+            stmt = stmt.where(_audit_before(*before))
         
-        stmt = stmt.order_by(AuditLog.created_at.desc()).offset(offset).limit(limit)
+        stmt = stmt.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+        if offset:
+            stmt = stmt.offset(offset)
+        stmt = stmt.limit(limit)
         return list(session.execute(stmt).scalars().all())
     
+    @staticmethod
+    def list_recent(
+        session: Session,
+        limit: int = 200,
+        actor: Optional[str] = None,
+        action: Optional[str] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> List[Any]:
+        """
+        List the most recent audit logs as row mappings, newest first.
+        最近审计日志（键集分页）
+        
+        Walks idx_audit_created backwards and stops after `limit` rows
+        (idx_audit_actor_action when filtering by actor). Pass the
+        (created_at, id) of the last row seen as `before` to fetch the next
+        page; unlike OFFSET this stays cheap however deep the page is.
+        """
+        stmt = select(
+            AuditLog.id,
+            AuditLog.actor,
+            AuditLog.action,
+            AuditLog.result,
+            AuditLog.resource_type,
+            AuditLog.resource_id,
+            AuditLog.metadata_json,
+            AuditLog.created_at,
+        )
+        
+        if actor:
+            stmt = stmt.where(AuditLog.actor == actor)
+        if action:
+            stmt = stmt.where(AuditLog.action == action)
+        if before:
+            stmt = stmt.where(_audit_before(*before))
+        
+        stmt = stmt.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit)
+        return list(session.execute(stmt).mappings().all())
+    
     @staticmethod
     def count(session: Session) -> int:
         """Count total audit logs."""
         stmt = select(func.count(AuditLog.id))
         return session.execute(stmt).scalar() or 0
     
+    @staticmethod
+    def count_approx(session: Session, max_age: float = 60.0, stats_max_age: float = 3600.0) -> int:
+        """
+        Approximate audit log count for dashboards.
+        审计日志近似数量
+        
+        Reads the planner statistics instead of scanning the table:
+        sqlite_stat1 (after ANALYZE / PRAGMA optimize) on SQLite, and
+        pg_class.reltuples on PostgreSQL when the table was (auto-)analyzed
+        within `stats_max_age` seconds. Falls back to an exact count() when
+        no usable statistics exist. sqlite_stat1 has no timestamp, so on
+        SQLite the figure trails rows written since the last analysis and
+        should be shown as approximate. Results are cached per database for
+        `max_age` seconds.
+        """
+        bind = session.get_bind()
+        cache_key = str(bind.url)
+        cached = _AUDIT_COUNT_CACHE.get(cache_key)
+        if cached and time.monotonic() - cached[0] < max_age:
+            return cached[1]
+        
+        table = AuditLog.__tablename__
+        estimate: Optional[int] = None
+        if bind.dialect.name == "sqlite":
+            has_stats = session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )).first()
+            if has_stats:
+                stat = session.execute(
+                    text("SELECT stat FROM sqlite_stat1 WHERE tbl = :tbl LIMIT 1"),
+                    {"tbl": table},
+                ).scalar()
+                if stat:
+                    estimate = int(stat.split()[0])  # first token is the row count
+        elif bind.dialect.name == "postgresql":
+            row = session.execute(
+                text(
+                    "SELECT c.reltuples, EXTRACT(EPOCH FROM now() - "
+                    "GREATEST(s.last_analyze, s.last_autoanalyze)) "
+                    "FROM pg_class c LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid "
+                    "WHERE c.relname = :tbl"
+                ),
+                {"tbl": table},
+            ).first()
+            if row is not None:
+                reltuples, stats_age = row
+                if reltuples is not None and reltuples >= 0 and stats_age is not None and stats_age <= stats_max_age:
+                    estimate = int(reltuples)
+        
+        if estimate is None:
+            estimate = AuditLogRepository.count(session)
+        _AUDIT_COUNT_CACHE[cache_key] = (time.monotonic(), estimate)
+        return estimate
+    
     @staticmethod
     def get_recent(session: Session, limit: int = 10) -> List[AuditLog]:
         """Get most recent audit logs."""
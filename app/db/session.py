@@ -4,16 +4,67 @@ Provides database initialization and session context management.
 """
 
 import os
+import json
+import base64
 from contextlib import contextmanager
-from typing import Optional, Generator
+from typing import Any, Optional, Generator
 
-from sqlalchemy import create_engine, event
+import orjson
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlalchemy.orm import sessionmaker, Session
 
 from .models import Base
 
 
+# Columns that moved from TEXT + json.dumps to the JSON column type
+JSON_COLUMNS = (
+    ("salary_structures", "allowances_json"),
+    ("salary_structures", "deductions_json"),
+    ("audit_logs", "metadata_json"),
+)
+
+# Columns holding Fernet tokens (app.security.EncryptionManager)
+ENCRYPTED_COLUMNS = (
+    ("employees", "bank_card_encrypted"),
+    ("employees", "id_number_encrypted"),
+    ("payroll_slips", "details_encrypted"),
+)
+
+# Prefix of tokens written with the old extra base64 layer ("gAAAAA" encoded again)
+LEGACY_TOKEN_PREFIX = "Z0FBQUFB"
+
+# Indexes replaced by wider ones; dropped from existing databases
+OBSOLETE_INDEXES = (
+    "idx_adjustment_employee_period",  # now idx_adjustment_employee_period_amount
+    "idx_slip_employee",  # now idx_slip_employee_run
+)
+
+# Bumped when a new one-shot data migration is added to _run_data_migrations();
+# SQLite databases record the version they are at in PRAGMA user_version
+DATA_MIGRATION_VERSION = 1
+
+# Connection-level SQLite tuning applied on every new connection
+SQLITE_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA journal_mode=WAL",        # readers don't block the writer
+    "PRAGMA synchronous=NORMAL",      # no fsync per commit in WAL mode
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",       # 64 MB page cache
+    "PRAGMA mmap_size=268435456",     # 256 MB memory-mapped I/O
+    "PRAGMA busy_timeout=5000",       # wait for a competing writer instead of failing
+)
+
+# Connection pool for file-backed SQLite: connections (and their PRAGMAs)
+# are reused across requests. StaticPool would share one connection between
+# Streamlit's script threads and interleave their transactions.
+SQLITE_POOL_OPTIONS = {
+    "poolclass": QueuePool,
+    "pool_size": 5,
+    "max_overflow": 5,
+}
+
 # Global engine and session factory
 _engine: Optional[Engine] = None
 _SessionLocal: Optional[sessionmaker] = None
@@ -24,6 +75,21 @@ def get_database_path() -> str:
     return os.environ.get("DATABASE_PATH", "payroll.db")
 
 
+def json_serializer(value: Any) -> str:
+    """Serialize JSON column values with orjson (non-str keys allowed, like json.dumps)."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def set_sqlite_pragma(dbapi_connection, connection_record) -> None:
+    """Apply SQLITE_PRAGMAS to a new SQLite/SQLCipher DBAPI connection."""
+    if not type(dbapi_connection).__module__.startswith(("sqlite", "sqlcipher")):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
 def init_database_simple(db_path: Optional[str] = None) -> Engine:
     """
     Initialize the database with a simple SQLite connection.
@@ -42,24 +108,28 @@ def init_database_simple(db_path: Optional[str] = None) -> Engine:
     
     # Create SQLite engine
     database_url = f"sqlite:///{db_path}"
+    # An in-memory database lives in a single connection, so it must be shared
+    pool_options = {"poolclass": StaticPool} if db_path == ":memory:" else SQLITE_POOL_OPTIONS
     
     _engine = create_engine(
         database_url,
         echo=os.environ.get("SQL_DEBUG", "").lower() == "true",
         connect_args={"check_same_thread": False},  # Allow multi-threaded access
+        **pool_options,
+        insertmanyvalues_page_size=1000,  # Rows per batched INSERT ... VALUES
+        query_cache_size=1200,  # Compiled SQL cache entries (default 500)
+        json_serializer=json_serializer,  # orjson for JSON columns
+        json_deserializer=orjson.loads,
     )
     
-    # Enable foreign key support for SQLite
-    @event.listens_for(_engine, "connect")
-    def set_sqlite_pragma(dbapi_connection, connection_record):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
+    # Enable foreign key support and WAL tuning for SQLite
+    event.listen(_engine, "connect", set_sqlite_pragma)
     
     # Create session factory
     _SessionLocal = sessionmaker(
         autocommit=False,
         autoflush=False,
+        expire_on_commit=False,
         bind=_engine
     )
     
@@ -96,8 +166,14 @@ def init_database_encrypted(db_path: Optional[str] = None, master_key: Optional[
         _engine = create_engine(
             database_url,
             echo=os.environ.get("SQL_DEBUG", "").lower() == "true",
+            connect_args={"check_same_thread": False},
+            **SQLITE_POOL_OPTIONS,
+            json_serializer=json_serializer,
+            json_deserializer=orjson.loads,
         )
         
+        event.listen(_engine, "connect", set_sqlite_pragma)
+        
     except ImportError:
         # Fall back to standard SQLite
         print("Warning: SQLCipher not available, using standard SQLite")
@@ -107,6 +183,7 @@ def init_database_encrypted(db_path: Optional[str] = None, master_key: Optional[
     _SessionLocal = sessionmaker(
         autocommit=False,
         autoflush=False,
+        expire_on_commit=False,
         bind=_engine
     )
     
@@ -125,6 +202,160 @@ def create_all_tables(engine: Optional[Engine] = None) -> None:
         engine = get_engine()
     
     Base.metadata.create_all(bind=engine)
+    
+    # Replaced indexes would only add write overhead
+    with engine.begin() as conn:
+        for index_name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+    
+    # create_all skips tables that already exist, so add any indexes
+    # introduced since the database was first created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    _run_data_migrations(engine)
+
+
+def _run_data_migrations(engine: Engine) -> None:
+    """
+    Bring data written by older versions up to the current format.
+    
+    SQLite databases are migrated once and then skipped via PRAGMA
+    user_version. Other backends run the (idempotent) migrations on every
+    call; the JSON one is a catalog check there and the ciphertext one an
+    index-free prefix scan that normally matches nothing.
+    """
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            if conn.execute(text("PRAGMA user_version")).scalar() >= DATA_MIGRATION_VERSION:
+                return
+    
+    migrate_json_columns(engine)
+    migrate_legacy_ciphertexts(engine)
+    
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text(f"PRAGMA user_version = {DATA_MIGRATION_VERSION}"))
+
+
+def optimize_database(engine: Optional[Engine] = None) -> None:
+    """
+    Refresh query planner statistics after bulk loads.
+    更新查询优化器统计信息
+    
+    On SQLite this runs PRAGMA optimize, which only re-analyzes tables
+    whose statistics are stale; other backends run ANALYZE.
+    
+    Args:
+        engine: Optional engine instance (uses global if not provided)
+    """
+    if engine is None:
+        engine = get_engine()
+    
+    statement = "PRAGMA optimize" if engine.dialect.name == "sqlite" else "ANALYZE"
+    with engine.begin() as conn:
+        conn.execute(text(statement))
+
+
+def migrate_json_columns(engine: Optional[Engine] = None) -> int:
+    """
+    One-shot migration of legacy TEXT JSON columns to the JSON column type.
+    迁移旧版 JSON 文本列
+    
+    On PostgreSQL the columns are converted to JSONB in place. On SQLite the
+    storage is already TEXT, so existing values are parsed and any that are
+    not valid JSON objects (e.g. empty strings) are reset to NULL.
+    
+    Args:
+        engine: Optional engine instance (uses global if not provided)
+        
+    Returns:
+        Number of columns converted (PostgreSQL) or values reset (SQLite)
+    """
+    if engine is None:
+        engine = get_engine()
+    
+    inspector = inspect(engine)
+    changed = 0
+    
+    with engine.begin() as conn:
+        for table, column in JSON_COLUMNS:
+            if not inspector.has_table(table):
+                continue
+            
+            if engine.dialect.name == "postgresql":
+                column_types = {c["name"]: str(c["type"]).upper() for c in inspector.get_columns(table)}
+                if column_types.get(column) in ("JSON", "JSONB"):
+                    continue
+                conn.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB "
+                    f"USING NULLIF({column}, '')::jsonb"
+                ))
+                changed += 1
+                continue
+            
+            rows = conn.execute(text(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL"))
+            invalid_ids = []
+            for row_id, raw in rows:
+                try:
+                    if not isinstance(json.loads(raw), dict):
+                        invalid_ids.append(row_id)
+                except (TypeError, ValueError):
+                    invalid_ids.append(row_id)
+            
+            for row_id in invalid_ids:
+                conn.execute(text(f"UPDATE {table} SET {column} = NULL WHERE id = :id"), {"id": row_id})
+            changed += len(invalid_ids)
+    
+    return changed
+
+
+def migrate_legacy_ciphertexts(engine: Optional[Engine] = None) -> int:
+    """
+    One-shot migration of double-base64 encrypted values to plain Fernet tokens.
+    迁移旧版双重 Base64 密文
+    
+    Only the redundant outer base64 layer is removed, so no key is needed
+    and the data is never decrypted. Values already in the new form are
+    left alone; EncryptionManager.decrypt reads both forms either way.
+    
+    Args:
+        engine: Optional engine instance (uses global if not provided)
+        
+    Returns:
+        Number of values rewritten
+    """
+    if engine is None:
+        engine = get_engine()
+    
+    inspector = inspect(engine)
+    changed = 0
+    
+    with engine.begin() as conn:
+        for table, column in ENCRYPTED_COLUMNS:
+            if not inspector.has_table(table):
+                continue
+            
+            rows = conn.execute(
+                text(f"SELECT id, {column} FROM {table} WHERE {column} LIKE :prefix"),
+                {"prefix": LEGACY_TOKEN_PREFIX + "%"},
+            ).all()
+            updates = []
+            for row_id, raw in rows:
+                if not raw.startswith(LEGACY_TOKEN_PREFIX):  # LIKE is case-insensitive on SQLite
+                    continue
+                try:
+                    token = base64.urlsafe_b64decode(raw.encode("ascii")).decode("ascii")
+                except ValueError:
+                    continue
+                updates.append({"id": row_id, "token": token})
+            
+            if updates:
+                conn.execute(text(f"UPDATE {table} SET {column} = :token WHERE id = :id"), updates)
+            changed += len(updates)
+    
+    return changed
 
 
 def drop_all_tables(engine: Optional[Engine] = None) -> None:
@@ -195,7 +426,10 @@ def session_scope() -> Generator[Session, None, None]:
     
     try:
         yield session
-        session.commit()
+        # A session that never touched the database has nothing to commit;
+        # commit() would autobegin and end an empty transaction
+        if session.in_transaction():
+            session.commit()
     except Exception:
         session.rollback()
         raise
@@ -203,6 +437,26 @@ def session_scope() -> Generator[Session, None, None]:
         session.close()
 
 
+@contextmanager
+def bulk_session_scope() -> Generator[Session, None, None]:
+    """
+    Transactional scope for bulk writes.
+    批量写入事务上下文
+    
+    Like session_scope(), but autoflush is off for the whole block
+    (whatever the factory says) and objects stay loaded after commit, so
+    pending rows go out in one flush at commit time. Repository creators
+    should be called with flush=False inside it unless an ID is needed.
+    
+    Yields:
+        SQLAlchemy Session instance
+    """
+    with session_scope() as session:
+        session.expire_on_commit = False
+        with session.no_autoflush:
+            yield session
+
+
 def get_session() -> Session:
     """
     Get a new session instance.
@@ -16,6 +16,7 @@ from .rate_limiter import (
 from .sanitizer import (
     sanitize_for_spreadsheet,
     sanitize_dataframe_for_export,
+    iter_sanitized_rows,
 )
 
 __all__ = [
@@ -30,4 +31,5 @@ __all__ = [
     # Sanitizer
     "sanitize_for_spreadsheet",
     "sanitize_dataframe_for_export",
+    "iter_sanitized_rows",
 ]
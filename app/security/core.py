@@ -6,16 +6,83 @@ Provides encryption and password hashing functionality.
 import os
 import base64
 import json
+import time
+import random
+import functools
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Iterable
 from datetime import datetime
 from threading import Lock
 
 from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError, InvalidHash
+from argon2 import Parameters, extract_parameters
+from argon2.exceptions import VerificationError, VerifyMismatchError, InvalidHash
+from argon2.low_level import ARGON2_VERSION, hash_secret, hash_secret_raw, verify_secret, Type
+
+# Optional compiled Fernet for the per-field encrypt/decrypt path; tokens are
+# interchangeable with cryptography's, so the key file format is unaffected
+try:
+    import rfernet
+except ImportError:
+    rfernet = None
+
+
+def _fernet_key(fernet: Fernet) -> bytes:
+    """Recover the url-safe base64 key of a cryptography Fernet instance."""
+    return base64.urlsafe_b64encode(fernet._signing_key + fernet._encryption_key)
+
+
+class _RFernetCipher:
+    """
+    rfernet.MultiFernet behind cryptography's bytes-in/bytes-out interface.
+    Rust 实现的 Fernet 适配器
+    """
+    
+    def __init__(self, fernet_keys: List[Fernet]):
+        self._impl = rfernet.MultiFernet([_fernet_key(f).decode() for f in fernet_keys])
+    
+    def encrypt(self, data: bytes) -> bytes:
+        return self._impl.encrypt(data).encode()
+    
+    def decrypt(self, token: bytes) -> bytes:
+        try:
+            return self._impl.decrypt(token.decode("ascii"))
+        except (rfernet.DecryptionError, UnicodeDecodeError):
+            raise InvalidToken
+
+
+@functools.lru_cache(maxsize=8)
+def _derive_kek(master_key: bytes, salt: bytes, argon2: bool) -> bytes:
+    """
+    Derive the key-encryption key that protects the keys file.
+
+    Cached per (master key, salt), so reloading or rewriting the keys file in
+    the same process does not repeat the deliberately slow derivation.
+    """
+    if argon2:
+        raw = hash_secret_raw(
+            master_key, salt,
+            time_cost=3, memory_cost=65536, parallelism=4,
+            hash_len=32, type=Type.ID,
+        )
+    else:
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=480000,
+        )
+        raw = kdf.derive(master_key)
+    return base64.urlsafe_b64encode(raw)
+
+
+def _data_cipher(fernet_keys: List[Fernet]):
+    """MultiFernet over the data keys, using rfernet when it is installed."""
+    if rfernet is not None:
+        return _RFernetCipher(fernet_keys)
+    return MultiFernet(fernet_keys)
 
 
 class EncryptionManager:
@@ -27,6 +94,21 @@ class EncryptionManager:
     KEYS_FILE = "encryption_keys.dat"
     SALT_SIZE = 16
     
+    # Keys files written since format version 3 start with this marker and
+    # derive their KEK with Argon2id; files without it (versions 1 and 2)
+    # use PBKDF2-SHA256 and are rewritten in the new format on next save
+    KEK_ARGON2_MAGIC = b"PHK3"
+    
+    # Payload version written by _write_keys_file. Versions before 4 stored
+    # each Fernet key base64-encoded a second time.
+    KEYS_FORMAT_VERSION = 4
+    
+    # Fernet tokens start with "gAAAAA"; older releases base64-encoded the
+    # token a second time, which turns that prefix into "Z0FBQUFB"
+    LEGACY_TOKEN_PREFIX = "Z0FBQUFB"
+    
+    DECRYPT_CACHE_SIZE = 1024
+    
     def __init__(self, master_key: str, keys_dir: Optional[str] = None):
         """
         Initialize encryption manager with master key.
@@ -39,19 +121,40 @@ class EncryptionManager:
         self.keys_dir = Path(keys_dir) if keys_dir else Path(".")
         self.keys_file = self.keys_dir / self.KEYS_FILE
         
+        # Recently decrypted tokens (token -> plaintext). Fernet tokens carry
+        # a random IV, so a token identifies exactly one plaintext and repeat
+        # views of the same record skip the AES/HMAC work.
+        self._decrypt_cached = functools.lru_cache(maxsize=self.DECRYPT_CACHE_SIZE)(self._decrypt)
+        # Redacted views are cached separately (token -> masked string), so
+        # unprivileged reads never leave plaintext in a cache.
+        self._redact_cached = functools.lru_cache(maxsize=self.DECRYPT_CACHE_SIZE)(self._decrypt_redacted)
+        
         # Load or create encryption keys
         self._load_or_create_keys()
     
-    def _derive_key_from_master(self, salt: bytes) -> bytes:
-        """Derive a Fernet key from the master password using PBKDF2."""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=480000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(self.master_key.encode()))
-        return key
+    def _derive_key_from_master(self, salt: bytes, argon2: bool = True) -> bytes:
+        """Derive a Fernet key from the master password (Argon2id, or legacy PBKDF2)."""
+        return _derive_kek(self.master_key.encode(), salt, argon2)
+    
+    def _write_keys_file(self, keys_data: dict) -> None:
+        """Encrypt keys_data under the master-derived KEK and write the keys file."""
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        
+        # The salt is generated once per installation and kept across
+        # rotations, so rewrites hit the derived-KEK cache
+        salt = getattr(self, "_kek_salt", None)
+        if salt is None:
+            salt = self._kek_salt = os.urandom(self.SALT_SIZE)
+        key_fernet = Fernet(self._derive_key_from_master(salt))
+        
+        keys_data["version"] = self.KEYS_FORMAT_VERSION
+        encrypted_data = key_fernet.encrypt(json.dumps(keys_data).encode())
+        
+        # Write to file: marker + salt + encrypted data
+        with open(self.keys_file, "wb") as f:
+            f.write(self.KEK_ARGON2_MAGIC)
+            f.write(salt)
+            f.write(encrypted_data)
     
     def _load_or_create_keys(self):
         """Load existing keys or create new ones."""
@@ -65,45 +168,31 @@ class EncryptionManager:
         # Generate a new Fernet key
         self.data_key = Fernet.generate_key()
         self.fernet_keys = [Fernet(self.data_key)]
-        self.fernet = MultiFernet(self.fernet_keys)
+        self.fernet = _data_cipher(self.fernet_keys)
         
         # Encrypt and save the data key
         self._save_keys()
     
     def _save_keys(self):
         """Save encrypted keys to file."""
-        self.keys_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Generate salt for key derivation
-        salt = os.urandom(self.SALT_SIZE)
-        
-        # Derive key from master password
-        key_encryption_key = self._derive_key_from_master(salt)
-        key_fernet = Fernet(key_encryption_key)
-        
-        # Prepare keys data
-        keys_data = {
-            "version": 1,
-            "keys": [base64.urlsafe_b64encode(self.data_key).decode()],
+        self._write_keys_file({
+            "keys": [self.data_key.decode()],
             "created_at": datetime.utcnow().isoformat(),
-        }
-        
-        # Encrypt keys data
-        encrypted_data = key_fernet.encrypt(json.dumps(keys_data).encode())
-        
-        # Write to file: salt + encrypted data
-        with open(self.keys_file, "wb") as f:
-            f.write(salt)
-            f.write(encrypted_data)
+        })
     
     def _load_keys(self):
         """Load and decrypt keys from file."""
         with open(self.keys_file, "rb") as f:
-            salt = f.read(self.SALT_SIZE)
-            encrypted_data = f.read()
+            content = f.read()
+        
+        argon2 = content.startswith(self.KEK_ARGON2_MAGIC)
+        if argon2:
+            content = content[len(self.KEK_ARGON2_MAGIC):]
+        salt = content[:self.SALT_SIZE]
+        encrypted_data = content[self.SALT_SIZE:]
         
         # Derive key from master password
-        key_encryption_key = self._derive_key_from_master(salt)
+        key_encryption_key = self._derive_key_from_master(salt, argon2=argon2)
         key_fernet = Fernet(key_encryption_key)
         
         try:
@@ -112,13 +201,18 @@ class EncryptionManager:
             keys_data = json.loads(decrypted_data.decode())
             
             # Load keys
-            self.data_key = base64.urlsafe_b64decode(keys_data["keys"][0])
-            self.fernet_keys = [
-                Fernet(base64.urlsafe_b64decode(k)) for k in keys_data["keys"]
-            ]
-            self.fernet = MultiFernet(self.fernet_keys)
+            keys = [k.encode() for k in keys_data["keys"]]
+            if keys_data.get("version", 1) < self.KEYS_FORMAT_VERSION:
+                keys = [base64.urlsafe_b64decode(k) for k in keys]
+            self.data_key = keys[0]
+            self.fernet_keys = [Fernet(k) for k in keys]
+            self.fernet = _data_cipher(self.fernet_keys)
         except InvalidToken:
             raise ValueError("Invalid master key - unable to decrypt encryption keys")
+        
+        # Legacy PBKDF2 files get a fresh salt when rewritten with Argon2id
+        if argon2:
+            self._kek_salt = salt
     
     def encrypt(self, plaintext: str) -> str:
         """
@@ -128,35 +222,101 @@ class EncryptionManager:
             plaintext: The string to encrypt
             
         Returns:
-            Base64-encoded encrypted string
+            Fernet token (already url-safe base64)
         """
-        if not plaintext:
+        # Empty and non-string values (None, NaN, pd.NA) pass through
+        if not isinstance(plaintext, str) or not plaintext:
             return plaintext
         
-        encrypted = self.fernet.encrypt(plaintext.encode())
-        return base64.urlsafe_b64encode(encrypted).decode()
+        return self.fernet.encrypt(plaintext.encode()).decode("ascii")
     
     def decrypt(self, ciphertext: str) -> str:
         """
         Decrypt an encrypted string.
         
+        The last DECRYPT_CACHE_SIZE results are cached per token (cleared on
+        key rotation); bulk paths use decrypt_many(), which bypasses the cache.
+        
         Args:
-            ciphertext: Base64-encoded encrypted string
+            ciphertext: Fernet token, or a legacy double-base64 token
             
         Returns:
             Decrypted plaintext string
         """
-        if not ciphertext:
+        if not isinstance(ciphertext, str) or not ciphertext:
             return ciphertext
         
+        return self._decrypt_cached(ciphertext)
+    
+    def _decrypt(self, ciphertext: str) -> str:
+        """Uncached decrypt() of a non-empty string."""
         try:
-            encrypted = base64.urlsafe_b64decode(ciphertext.encode())
-            decrypted = self.fernet.decrypt(encrypted)
+            token = self.unwrap_legacy_token(ciphertext).encode("ascii")
+            decrypted = self.fernet.decrypt(token)
             return decrypted.decode()
         except (InvalidToken, ValueError):
             # Return original if decryption fails (might not be encrypted)
             return ciphertext
     
+    def decrypt_redacted(self, ciphertext: str) -> str:
+        """
+        Decrypt a token and redact it with redact_sensitive().
+        解密并脱敏
+        
+        Only the redacted result is cached per token (cleared on key
+        rotation). Empty and non-string values pass through as in decrypt().
+        """
+        if not isinstance(ciphertext, str) or not ciphertext:
+            return ciphertext
+        
+        return self._redact_cached(ciphertext)
+    
+    def _decrypt_redacted(self, ciphertext: str) -> str:
+        """Uncached decrypt_redacted() of a non-empty string."""
+        return self.redact_sensitive(self._decrypt(ciphertext))
+    
+    def encrypt_many(self, values: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """
+        Encrypt many strings; empty and non-string values pass through as in encrypt().
+        批量加密
+        """
+        encrypt = self.fernet.encrypt
+        return [
+            encrypt(value.encode()).decode("ascii") if isinstance(value, str) and value else value
+            for value in values
+        ]
+    
+    def decrypt_many(self, values: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """
+        Decrypt many strings with the same fallbacks as decrypt().
+        批量解密
+        """
+        decrypt = self.fernet.decrypt
+        unwrap = self.unwrap_legacy_token
+        results = []
+        for value in values:
+            if isinstance(value, str) and value:
+                try:
+                    value = decrypt(unwrap(value).encode("ascii")).decode()
+                except (InvalidToken, ValueError):
+                    pass
+            results.append(value)
+        return results
+    
+    @classmethod
+    def unwrap_legacy_token(cls, ciphertext: str) -> str:
+        """
+        Strip the extra base64 layer from a legacy token; other values are returned as-is.
+        
+        Needs no key, so stored values can be migrated without decrypting them.
+        """
+        if ciphertext.startswith(cls.LEGACY_TOKEN_PREFIX):
+            try:
+                return base64.urlsafe_b64decode(ciphertext.encode("ascii")).decode("ascii")
+            except ValueError:
+                pass
+        return ciphertext
+    
     def rotate_key(self) -> None:
         """
         Rotate encryption keys. Old keys are retained for decryption.
@@ -168,7 +328,9 @@ class EncryptionManager:
         
         # Add new key to the front (primary key)
         self.fernet_keys.insert(0, new_fernet)
-        self.fernet = MultiFernet(self.fernet_keys)
+        self.fernet = _data_cipher(self.fernet_keys)
+        self._decrypt_cached.cache_clear()
+        self._redact_cached.cache_clear()
         self.data_key = new_key
         
         # Save updated keys
@@ -176,32 +338,12 @@ class EncryptionManager:
     
     def _save_keys_multi(self):
         """Save multiple keys to file."""
-        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        all_keys = [_fernet_key(fernet).decode() for fernet in self.fernet_keys]
         
-        salt = os.urandom(self.SALT_SIZE)
-        key_encryption_key = self._derive_key_from_master(salt)
-        key_fernet = Fernet(key_encryption_key)
-        
-        # Get all keys as base64
-        all_keys = []
-        for fernet in self.fernet_keys:
-            # Extract key from Fernet instance
-            key_bytes = fernet._signing_key + fernet._encryption_key
-            all_keys.append(base64.urlsafe_b64encode(
-                base64.urlsafe_b64encode(key_bytes)
-            ).decode())
-        
-        keys_data = {
-            "version": 2,
+        self._write_keys_file({
             "keys": all_keys,
             "rotated_at": datetime.utcnow().isoformat(),
-        }
-        
-        encrypted_data = key_fernet.encrypt(json.dumps(keys_data).encode())
-        
-        with open(self.keys_file, "wb") as f:
-            f.write(salt)
-            f.write(encrypted_data)
+        })
     
     @staticmethod
     def redact_sensitive(value: str, show_last: int = 4) -> str:
@@ -231,25 +373,49 @@ class PasswordManager:
     
     def __init__(
         self,
-        time_cost: int = 3,
-        memory_cost: int = 65536,
-        parallelism: int = 4,
+        time_cost: Optional[int] = None,
+        memory_cost: Optional[int] = None,
+        parallelism: Optional[int] = None,
     ):
         """
         Initialize password manager with Argon2 parameters.
         
+        Parameters left as None are read from ARGON2_TIME_COST,
+        ARGON2_MEMORY_KIB and ARGON2_PARALLELISM, defaulting to t=3,
+        m=64 MiB, p=4. Lower them (OWASP's interactive minimum is m=19456,
+        t=2, p=1) to cut per-login CPU; existing hashes keep verifying with
+        the parameters they were created with.
+        
         Args:
             time_cost: Number of iterations
             memory_cost: Memory usage in KiB
             parallelism: Number of parallel threads
         """
-        self.hasher = PasswordHasher(
+        if time_cost is None:
+            time_cost = int(os.environ.get("ARGON2_TIME_COST", "3"))
+        if memory_cost is None:
+            memory_cost = int(os.environ.get("ARGON2_MEMORY_KIB", "65536"))
+        if parallelism is None:
+            parallelism = int(os.environ.get("ARGON2_PARALLELISM", "4"))
+        
+        # Argon2id through argon2-cffi's low-level API (no PasswordHasher
+        # wrapper); the encoded hashes are identical
+        self.parameters = Parameters(
+            type=Type.ID,
+            version=ARGON2_VERSION,
+            salt_len=16,
+            hash_len=32,
             time_cost=time_cost,
             memory_cost=memory_cost,
             parallelism=parallelism,
-            hash_len=32,
-            salt_len=16,
         )
+        
+        # Hash of a random secret with the current parameters. Hashing costs
+        # the same as verifying, so timing it seeds the verify-time estimate
+        # that verify_dummy() reproduces.
+        start = time.perf_counter()
+        self._dummy_hash = self.hash_password(os.urandom(16).hex())
+        self._verify_seconds = time.perf_counter() - start
     
     def hash_password(self, password: str) -> str:
         """
@@ -261,7 +427,16 @@ class PasswordManager:
         Returns:
             Argon2 hash string
         """
-        return self.hasher.hash(password)
+        params = self.parameters
+        return hash_secret(
+            password.encode("utf-8"),
+            os.urandom(params.salt_len),
+            time_cost=params.time_cost,
+            memory_cost=params.memory_cost,
+            parallelism=params.parallelism,
+            hash_len=params.hash_len,
+            type=params.type,
+        ).decode("ascii")
     
     def verify_password(self, password: str, password_hash: str) -> bool:
         """
@@ -274,11 +449,35 @@ class PasswordManager:
         Returns:
             True if password matches, False otherwise
         """
+        start = time.perf_counter()
         try:
-            self.hasher.verify(password_hash, password)
-            return True
-        except (VerifyMismatchError, InvalidHash):
+            valid = verify_secret(
+                password_hash.encode("ascii"), password.encode("utf-8"), Type.ID
+            )
+        except VerifyMismatchError:
+            valid = False
+        except (VerificationError, InvalidHash, UnicodeEncodeError):
             return False
+        
+        # Moving average of real verification time, for verify_dummy()
+        elapsed = time.perf_counter() - start
+        self._verify_seconds += 0.2 * (elapsed - self._verify_seconds)
+        return valid
+    
+    def verify_dummy(self, password: str) -> bool:
+        """
+        Take as long as a verification, for users that do not exist.
+        防止时序攻击 - 对不存在的用户执行同等耗时的等待
+        
+        Sleeps for the measured average verification time (with a little
+        jitter) instead of running Argon2, so unknown usernames cannot be
+        used to burn CPU and memory.
+        
+        Returns:
+            False
+        """
+        time.sleep(max(0.0, random.gauss(self._verify_seconds, 0.005)))
+        return False
     
     def needs_rehash(self, password_hash: str) -> bool:
         """
@@ -290,19 +489,54 @@ class PasswordManager:
         Returns:
             True if hash should be regenerated
         """
-        return self.hasher.check_needs_rehash(password_hash)
+        try:
+            return extract_parameters(password_hash) != self.parameters
+        except InvalidHash:
+            return True
 
 
 # Singleton instances
-_encryption_manager: Optional[EncryptionManager] = None
-_password_manager: Optional[PasswordManager] = None
+_encryption_manager: Optional[EncryptionManager] = None  # manager used when no master key is given
 _encryption_lock = Lock()  # 线程锁保护加密管理器初始化
-_password_lock = Lock()     # 线程锁保护密码管理器初始化
+
+
+@functools.lru_cache(maxsize=None)
+def _make_encryption_manager(master_key: str, keys_dir: str) -> EncryptionManager:
+    """Create (once per master key and keys directory) an EncryptionManager."""
+    # Serialize construction so concurrent first calls cannot both create
+    # a keys file; a second construction simply loads the first one's file
+    with _encryption_lock:
+        return EncryptionManager(master_key, keys_dir)
+
+
+def _resolve_master_key() -> str:
+    """Find the master key when the caller did not pass one."""
+    master_key = None
+    
+    # 尝试从 Streamlit session state 获取（优先级最高）
+    try:
+        import streamlit as st
+        master_key = st.session_state.get("master_key")
+    except:
+        pass
+    
+    # 仅在测试环境使用环境变量
+    if master_key is None and os.environ.get("TESTING") == "true":
+        master_key = os.environ.get("TEST_MASTER_KEY")
+    
+    if master_key is None:
+        raise ValueError("需要主密钥才能初始化加密服务。请确保您已登录并正确输入主密钥。")
+    
+    return master_key
 
 
 def get_encryption_manager(master_key: Optional[str] = None) -> EncryptionManager:
     """
-    Get or create the singleton EncryptionManager instance (thread-safe).
+    Get or create the EncryptionManager instance (thread-safe).
+    
+    Managers are cached per (master key, KEYS_DIR). Without a master key
+    the most recently obtained manager is returned, or one is created from
+    the Streamlit session (or TEST_MASTER_KEY when testing).
 
     Args:
         master_key: Master key for encryption (required on first call)
@@ -312,52 +546,31 @@ def get_encryption_manager(master_key: Optional[str] = None) -> EncryptionManage
     """
     global _encryption_manager
 
-    # 双重检查锁定模式（Double-Checked Locking）
-    if _encryption_manager is None:
-        with _encryption_lock:
-            # 再次检查，防止多个线程同时通过第一次检查
-            if _encryption_manager is None:
-                if master_key is None:
-                    # 尝试从 Streamlit session state 获取（优先级最高）
-                    try:
-                        import streamlit as st
-                        master_key = st.session_state.get("master_key")
-                    except:
-                        pass
-
-                    # 仅在测试环境使用环境变量
-                    if master_key is None and os.environ.get("TESTING") == "true":
-                        master_key = os.environ.get("TEST_MASTER_KEY")
-
-                    if master_key is None:
-                        raise ValueError("需要主密钥才能初始化加密服务。请确保您已登录并正确输入主密钥。")
-
-                keys_dir = os.environ.get("KEYS_DIR", ".")
-                _encryption_manager = EncryptionManager(master_key, keys_dir)
+    if master_key is None:
+        manager = _encryption_manager
+        if manager is not None:
+            return manager
+        master_key = _resolve_master_key()
 
-    return _encryption_manager
+    manager = _make_encryption_manager(master_key, os.environ.get("KEYS_DIR", "."))
+    _encryption_manager = manager
+    return manager
 
 
+@functools.lru_cache(maxsize=None)
 def get_password_manager() -> PasswordManager:
     """
-    Get or create the singleton PasswordManager instance (thread-safe).
+    Get or create the singleton PasswordManager instance.
 
     Returns:
         PasswordManager instance
     """
-    global _password_manager
-
-    # 双重检查锁定模式
-    if _password_manager is None:
-        with _password_lock:
-            if _password_manager is None:
-                _password_manager = PasswordManager()
-
-    return _password_manager
+    return PasswordManager()
 
 
 def reset_managers():
     """Reset singleton instances (for testing purposes)."""
-    global _encryption_manager, _password_manager
+    global _encryption_manager
     _encryption_manager = None
-    _password_manager = None
+    _make_encryption_manager.cache_clear()
+    get_password_manager.cache_clear()
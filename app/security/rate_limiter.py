@@ -4,17 +4,25 @@ Provides login attempt rate limiting to prevent brute force attacks.
 """
 
 import time
-from typing import Dict, Tuple, Optional
-from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Optional
 from threading import Lock
 
 
-@dataclass
 class AttemptRecord:
-    """Record of login attempts for a user/IP."""
-    attempts: int = 0
-    first_attempt_time: float = 0.0
-    locked_until: float = 0.0
+    """
+    Record of login attempts for a user/IP.
+    
+    A __slots__ class rather than a dataclass (slots=True needs Python
+    3.10): without a per-instance __dict__ each record is roughly 40%
+    smaller, which matters when many identifiers are being tracked.
+    """
+    
+    __slots__ = ("attempts", "first_attempt_time", "locked_until")
+    
+    def __init__(self, attempts: int = 0, first_attempt_time: float = 0.0, locked_until: float = 0.0):
+        self.attempts = attempts
+        self.first_attempt_time = first_attempt_time
+        self.locked_until = locked_until
 
 
 class RateLimiter:
@@ -25,8 +33,14 @@ class RateLimiter:
     Default settings:
     - 5 failed attempts within 5 minutes triggers a lockout
     - Lockout duration is 5 minutes
+    
+    Records are spread over SHARD_COUNT dicts, each with its own lock, so
+    concurrent logins for different identifiers rarely wait on each other.
     """
     
+    SHARD_COUNT = 16  # power of two, see _shard()
+    GC_INTERVAL = 60  # seconds between sweeps for stale records
+    
     def __init__(
         self,
         max_attempts: int = 5,
@@ -45,14 +59,22 @@ class RateLimiter:
         self.window_seconds = window_seconds
         self.lockout_seconds = lockout_seconds
         
-        self._records: Dict[str, AttemptRecord] = {}
-        self._lock = Lock()
+        self._shards: List[Tuple[Dict[str, AttemptRecord], Lock]] = [
+            ({}, Lock()) for _ in range(self.SHARD_COUNT)
+        ]
+        self._last_gc = 0.0
     
-    def _get_record(self, identifier: str) -> AttemptRecord:
-        """Get or create attempt record for an identifier."""
-        if identifier not in self._records:
-            self._records[identifier] = AttemptRecord()
-        return self._records[identifier]
+    def _shard(self, identifier: str) -> Tuple[Dict[str, AttemptRecord], Lock]:
+        """Records dict and lock responsible for an identifier."""
+        return self._shards[hash(identifier) & (self.SHARD_COUNT - 1)]
+    
+    @staticmethod
+    def _get_record(records: Dict[str, AttemptRecord], identifier: str) -> AttemptRecord:
+        """Get or create attempt record for an identifier (caller holds the shard lock)."""
+        record = records.get(identifier)
+        if record is None:
+            record = records[identifier] = AttemptRecord()
+        return record
     
     def _cleanup_expired(self, record: AttemptRecord, now: float) -> None:
         """Reset record if window has expired."""
@@ -61,6 +83,24 @@ class RateLimiter:
                 record.attempts = 0
                 record.first_attempt_time = 0.0
     
+    def _is_stale(self, record: AttemptRecord, now: float) -> bool:
+        """True if a record no longer affects any decision (not locked, window over)."""
+        if record.locked_until > now:
+            return False
+        return record.first_attempt_time == 0 or now - record.first_attempt_time > self.window_seconds
+    
+    def _evict_stale(self, now: float) -> None:
+        """Drop stale records at most once per GC_INTERVAL, so memory stays bounded."""
+        if now - self._last_gc < self.GC_INTERVAL:
+            return
+        self._last_gc = now
+        
+        for records, lock in self._shards:
+            with lock:
+                for identifier, record in list(records.items()):
+                    if self._is_stale(record, now):
+                        del records[identifier]
+    
     def is_locked(self, identifier: str) -> Tuple[bool, int]:
         """
         Check if an identifier is currently locked out.
@@ -71,11 +111,14 @@ class RateLimiter:
         Returns:
             Tuple of (is_locked, remaining_seconds)
         """
-        with self._lock:
-            now = time.time()
-            record = self._get_record(identifier)
+        now = time.time()
+        self._evict_stale(now)
+        
+        records, lock = self._shard(identifier)
+        with lock:
+            record = records.get(identifier)
             
-            if record.locked_until > now:
+            if record is not None and record.locked_until > now:
                 remaining = int(record.locked_until - now)
                 return True, remaining
             
@@ -91,11 +134,13 @@ class RateLimiter:
         Returns:
             Number of remaining attempts before lockout
         """
-        with self._lock:
-            now = time.time()
-            record = self._get_record(identifier)
+        records, lock = self._shard(identifier)
+        with lock:
+            record = records.get(identifier)
+            if record is None:
+                return self.max_attempts
             
-            self._cleanup_expired(record, now)
+            self._cleanup_expired(record, time.time())
             
             return max(0, self.max_attempts - record.attempts)
     
@@ -107,18 +152,18 @@ class RateLimiter:
             identifier: User ID or IP address
             success: Whether the login was successful
         """
-        with self._lock:
-            now = time.time()
-            record = self._get_record(identifier)
-            
+        now = time.time()
+        self._evict_stale(now)
+        
+        records, lock = self._shard(identifier)
+        with lock:
             if success:
-                # Reset on successful login
-                record.attempts = 0
-                record.first_attempt_time = 0.0
-                record.locked_until = 0.0
+                # Reset on successful login (an empty record is the reset state)
+                records.pop(identifier, None)
                 return
             
             # Failed attempt
+            record = self._get_record(records, identifier)
             self._cleanup_expired(record, now)
             
             if record.attempts == 0:
@@ -137,17 +182,19 @@ class RateLimiter:
         Args:
             identifier: User ID or IP address
         """
-        with self._lock:
-            if identifier in self._records:
-                record = self._records[identifier]
+        records, lock = self._shard(identifier)
+        with lock:
+            record = records.get(identifier)
+            if record is not None:
                 record.attempts = 0
                 record.first_attempt_time = 0.0
                 record.locked_until = 0.0
     
     def clear_all(self) -> None:
         """Clear all records (for testing purposes)."""
-        with self._lock:
-            self._records.clear()
+        for records, lock in self._shards:
+            with lock:
+                records.clear()
 
 
 # Singleton instance
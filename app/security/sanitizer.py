@@ -3,16 +3,45 @@ Data Sanitizer Module - 数据清洗模块
 Provides protection against spreadsheet formula injection attacks.
 """
 
+from __future__ import annotations
+
 import re
-from typing import Any, List, Union
-import pandas as pd
+from typing import Any, Iterator, List, Union, TYPE_CHECKING
+
+# pandas is imported on first use, so importing app.security stays light
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 # Characters that trigger formula execution in spreadsheets
 FORMULA_TRIGGERS = ('=', '+', '-', '@', '\t', '\r', '\n')
 
-# Pattern to detect potential formula injection
-FORMULA_PATTERN = re.compile(r'^[\s]*[=+\-@]')
+# First non-whitespace characters that make a cell a formula (tab/CR/LF in
+# FORMULA_TRIGGERS are whitespace, so they are skipped over like spaces)
+_FORMULA_START = frozenset(t for t in FORMULA_TRIGGERS if not t.isspace())
+
+# Whitespace as str.lstrip() sees it, spelled out (rather than \s) so the
+# pattern below means the same in Python's re and in pandas' Arrow/RE2 kernels
+_WHITESPACE = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000"
+
+# Pattern to detect potential formula injection. Matches exactly the values
+# sanitize_for_spreadsheet() prefixes: leading whitespace (including tab/CR/LF)
+# is stripped before the first character is checked.
+FORMULA_PATTERN = re.compile("^[" + _WHITESPACE + "]*[=+\\-@]")
+
+# Translation table deleting C0 control characters other than tab, newline
+# and carriage return (those are handled by sanitize_for_spreadsheet)
+_CONTROL_CHARS = ''.join(chr(i) for i in range(32) if i not in (9, 10, 13))
+_CONTROL_CHARS_TABLE = str.maketrans('', '', _CONTROL_CHARS)
+
+
+def _starts_with_formula(value: str) -> bool:
+    """True if the first non-whitespace character of value is a formula trigger."""
+    first = value[:1]
+    if not first.isspace():
+        # Common case: no leading whitespace, so no scan or stripped copy
+        return first in _FORMULA_START
+    return FORMULA_PATTERN.match(value) is not None
 
 
 def sanitize_for_spreadsheet(value: Any) -> Any:
@@ -45,8 +74,7 @@ def sanitize_for_spreadsheet(value: Any) -> Any:
         return value
     
     # Check if value starts with a formula trigger
-    stripped = value.lstrip()
-    if stripped and stripped[0] in FORMULA_TRIGGERS:
+    if _starts_with_formula(value):
         # Prefix with apostrophe to prevent formula execution
         return "'" + value
     
@@ -58,21 +86,56 @@ def sanitize_dataframe_for_export(df: pd.DataFrame) -> pd.DataFrame:
     Sanitize all string columns in a DataFrame for safe spreadsheet export.
     批量清洗 DataFrame 中的所有字符串列
     
+    Covers object and pandas string-dtype columns. Columns holding strings
+    use pandas' vectorized string matching, and only the matching cells are
+    rewritten. Other object columns fall back to sanitize_for_spreadsheet per
+    cell. Non-string cells are left untouched either way.
+    
     Args:
         df: The DataFrame to sanitize
         
     Returns:
-        New DataFrame with sanitized string values
+        New DataFrame with sanitized string values; columns that needed no
+        changes share memory with df
     """
-    result = df.copy()
+    import pandas as pd
+    
+    # Shallow copy: columns are replaced wholesale below, never written in
+    # place, so untouched columns can keep sharing df's memory
+    result = df.copy(deep=False)
     
     for column in result.columns:
-        if result[column].dtype == 'object':
-            result[column] = result[column].apply(sanitize_for_spreadsheet)
+        values = result[column]
+        if values.dtype != 'object' and not isinstance(values.dtype, pd.StringDtype):
+            continue
+        
+        # .str only works on columns holding strings; object columns of ints,
+        # Decimals, bytes or only None are checked cell by cell instead
+        if pd.api.types.infer_dtype(values, skipna=True) not in ("string", "mixed"):
+            result[column] = values.map(sanitize_for_spreadsheet)
+            continue
+        
+        # Non-string cells yield NaN from .str and count as safe
+        mask = values.str.match(FORMULA_PATTERN.pattern, na=False).astype(bool)
+        if mask.any():
+            result[column] = values.mask(mask, "'" + values.where(mask, ""))
     
     return result
 
 
+def iter_sanitized_rows(df: pd.DataFrame, chunk_size: int = 4096) -> Iterator[tuple]:
+    """
+    Yield the rows of a DataFrame as tuples, sanitized for spreadsheet export.
+    逐块清洗并逐行输出，供流式写入使用
+    
+    Sanitizes `chunk_size` rows at a time with sanitize_dataframe_for_export,
+    so a writer can consume rows without a sanitized copy of the whole frame.
+    """
+    for start in range(0, len(df), chunk_size):
+        chunk = sanitize_dataframe_for_export(df.iloc[start:start + chunk_size])
+        yield from chunk.itertuples(index=False, name=None)
+
+
 def sanitize_list(values: List[Any]) -> List[Any]:
     """
     Sanitize a list of values for spreadsheet export.
@@ -122,8 +185,7 @@ def is_safe_for_spreadsheet(value: str) -> bool:
     if not value or not isinstance(value, str):
         return True
     
-    stripped = value.lstrip()
-    return not (stripped and stripped[0] in FORMULA_TRIGGERS)
+    return not _starts_with_formula(value)
 
 
 def remove_control_characters(value: str) -> str:
@@ -139,7 +201,4 @@ def remove_control_characters(value: str) -> str:
     if not isinstance(value, str):
         return value
     
-    # Remove most control characters except tab, newline, carriage return
-    # which are handled by the sanitize function
-    control_chars = ''.join(chr(i) for i in range(32) if i not in (9, 10, 13))
-    return value.translate(str.maketrans('', '', control_chars))
+    return value.translate(_CONTROL_CHARS_TABLE)
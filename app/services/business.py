@@ -3,20 +3,36 @@ Business Services - 业务服务层
 Provides business logic for the payroll management system.
 """
 
+from __future__ import annotations
+
 import os
 import re
-import json
+import mmap
+import hmac
+import time
 import hashlib
+import secrets
+import functools
+import itertools
+import threading
 from datetime import datetime, date
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Callable, TYPE_CHECKING
 from dataclasses import dataclass
 from pathlib import Path
 
-import pandas as pd
+import orjson
+
+# Optional faster xlsx writer for exports; openpyxl is used when it is missing
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
 
 from app.db import (
     session_scope,
+    bulk_session_scope,
+    optimize_database,
     User, UserRole,
     Employee, EmployeeStatus,
     SalaryStructure,
@@ -33,24 +49,54 @@ from app.db import (
     PayrollRunRepository,
     PayrollSlipRepository,
     AuditLogRepository,
+    get_audit_writer,
+    flush_audit_logs,
 )
 
+# pandas (and payroll_calc, built on it) is imported inside the functions that
+# need it, so login and simple lookups do not pay for loading it
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Smallest money unit (one cent)
+MONEY_QUANTUM = Decimal("0.01")
+MONEY_ZERO = Decimal("0.00")  # Quantized zero amount
+
 
 # =============================================================================
 # Singleton Accessors (with lazy import to avoid circular dependencies)
 # =============================================================================
 
+@functools.lru_cache(maxsize=None)
+def _streamlit():
+    """Import Streamlit once; None when it is not installed."""
+    try:
+        import streamlit
+    except ImportError:
+        return None
+    return streamlit
+
+
 def get_encryption_manager():
-    """Get encryption manager (lazy import)."""
+    """
+    Get encryption manager (lazy import).
+    
+    Managers are memoized in app.security, so this is cheap to call from
+    every service method. Streamlit's session_state is only consulted
+    inside a running app: outside one each access costs tens of
+    microseconds and logs a warning.
+    """
     from app.security import get_encryption_manager as _get_em
     # Try to get master_key from Streamlit session_state
-    try:
-        import streamlit as st
-        master_key = st.session_state.get("master_key")
-        if master_key:
-            return _get_em(master_key)
-    except:
-        pass
+    st = _streamlit()
+    if st is not None and st.runtime.exists():
+        try:
+            master_key = st.session_state.get("master_key")
+            if master_key:
+                return _get_em(master_key)
+        except Exception:
+            pass
     return _get_em()
 
 
@@ -88,7 +134,64 @@ class AuthService:
     Authentication service.
     用户认证服务
     """
-    
+
+    # Successful password checks, so Streamlit re-runs skip Argon2.
+    # Maps (user_id, HMAC of the password) -> (expiry, stored password hash);
+    # the HMAC key is per-process so cached digests cannot be brute-forced
+    # offline. Failures are never cached.
+    VERIFY_CACHE_TTL = 300.0
+    VERIFY_CACHE_SIZE = 1024
+    _verify_cache: Dict[Tuple[int, bytes], Tuple[float, str]] = {}
+    _verify_cache_lock = threading.Lock()
+    _verify_cache_key = secrets.token_bytes(32)
+
+    @classmethod
+    def _verify_cache_slot(cls, user_id: int, password: str) -> Tuple[int, bytes]:
+        digest = hmac.new(cls._verify_cache_key, password.encode("utf-8"), hashlib.sha256).digest()
+        return user_id, digest
+
+    @classmethod
+    def _verify_password_cached(cls, user_id: int, password_hash: str, password: str) -> bool:
+        """
+        Verify a password, reusing a recent successful check for this user.
+        带短期缓存的密码验证
+
+        A hit also requires the stored hash to be unchanged, so a password
+        changed through any path invalidates the entry.
+        """
+        key = cls._verify_cache_slot(user_id, password)
+        now = time.monotonic()
+
+        with cls._verify_cache_lock:
+            cached = cls._verify_cache.get(key)
+        if cached is not None and cached[0] > now and cached[1] == password_hash:
+            return True
+
+        if not get_password_manager().verify_password(password, password_hash):
+            return False
+
+        with cls._verify_cache_lock:
+            cache = cls._verify_cache
+            cache.pop(key, None)
+            if len(cache) >= cls.VERIFY_CACHE_SIZE:
+                # Drop expired entries first, then the oldest insertions
+                for stale in [k for k, (expiry, _) in cache.items() if expiry <= now]:
+                    del cache[stale]
+                while len(cache) >= cls.VERIFY_CACHE_SIZE:
+                    del cache[next(iter(cache))]
+            cache[key] = (now + cls.VERIFY_CACHE_TTL, password_hash)
+        return True
+
+    @classmethod
+    def clear_verify_cache(cls, user_id: Optional[int] = None) -> None:
+        """Forget cached password checks for one user, or for everyone."""
+        with cls._verify_cache_lock:
+            if user_id is None:
+                cls._verify_cache.clear()
+                return
+            for key in [k for k in cls._verify_cache if k[0] == user_id]:
+                del cls._verify_cache[key]
+
     @staticmethod
     def login(username: str, password: str) -> Tuple[bool, Optional[Dict[str, Any]], str]:
         """
@@ -108,51 +211,55 @@ class AuthService:
         if is_locked:
             return False, None, f"账户已锁定，请 {remaining} 秒后重试"
 
+        # Short read: copy what is needed into a plain dict so no connection
+        # is held during the (deliberately slow) password verification
         with session_scope() as session:
             user = UserRepository.get_by_username(session, username)
-            pm = get_password_manager()
-
-            # 防止时序攻击：无论用户是否存在都执行密码验证
-            if user is None:
-                # 使用真实的假哈希值进行验证，确保执行时间一致
-                dummy_hash = "$argon2id$v=19$m=65536,t=3,p=4$rC9Ed1gB7Jf471DMpaZMKw$rSCCGDtp6nzTkPWilb0tfdVJMWu6EUICWNi/rjz8fnY"
-                pm.verify_password(password, dummy_hash)
-                rate_limiter.record_attempt(username, success=False)
-                return False, None, "用户名或密码错误"
-
-            # Verify password (真实验证)
-            password_valid = pm.verify_password(password, user.password_hash)
-
-            # 检查账户状态
-            if not user.is_active:
-                rate_limiter.record_attempt(username, success=False)
-                return False, None, "用户名或密码错误"  # 统一错误消息，不泄露账户状态
-
-            if not password_valid:
-                rate_limiter.record_attempt(username, success=False)
-                remaining_attempts = rate_limiter.get_remaining_attempts(username)
-                return False, None, f"用户名或密码错误（剩余 {remaining_attempts} 次尝试）"
-
-            # Success - extract user data while still in session
-            user_data = {
-                "id": user.id,
-                "username": user.username,
-                "role": user.role.value,
-                "is_active": user.is_active,
-            }
+            if user is not None:
+                user = {
+                    "id": user.id,
+                    "username": user.username,
+                    "role": user.role.value,
+                    "is_active": user.is_active,
+                    "password_hash": user.password_hash,
+                }
 
-            rate_limiter.record_attempt(username, success=True)
-            UserRepository.update_last_login(session, user.id)
+        # 防止时序攻击：无论用户是否存在都执行密码验证
+        if user is None:
+            # 使用与当前参数一致的假哈希进行验证，确保执行时间一致
+            get_password_manager().verify_dummy(password)
+            rate_limiter.record_attempt(username, success=False)
+            return False, None, "用户名或密码错误"
 
-            # Log the login
-            AuditLogRepository.create(
-                session,
-                actor=username,
-                action="login",
-                result="success",
-            )
+        # Verify password (真实验证，成功结果短期缓存)
+        password_valid = AuthService._verify_password_cached(
+            user["id"], user.pop("password_hash"), password
+        )
+
+        # 检查账户状态
+        if not user["is_active"]:
+            rate_limiter.record_attempt(username, success=False)
+            return False, None, "用户名或密码错误"  # 统一错误消息，不泄露账户状态
+
+        if not password_valid:
+            rate_limiter.record_attempt(username, success=False)
+            remaining_attempts = rate_limiter.get_remaining_attempts(username)
+            return False, None, f"用户名或密码错误（剩余 {remaining_attempts} 次尝试）"
 
-            return True, user_data, "登录成功"
+        rate_limiter.record_attempt(username, success=True)
+
+        # Short write: a single UPDATE
+        with session_scope() as session:
+            UserRepository.update_last_login(session, user["id"])
+
+        # Log the login (batched by the background audit writer)
+        get_audit_writer().enqueue(
+            actor=username,
+            action="login",
+            result="success",
+        )
+
+        return True, user, "登录成功"
     
     @staticmethod
     def create_user(
@@ -222,6 +329,7 @@ class AuthService:
             success = UserRepository.update_password(session, user_id, password_hash)
             
             if success:
+                AuthService.clear_verify_cache(user_id)
                 AuditLogRepository.create(
                     session,
                     actor=actor,
@@ -245,6 +353,48 @@ class EmployeeService:
     员工管理服务
     """
     
+    # Callbacks run after employees are committed (e.g. UI cache invalidation)
+    _change_listeners: List[Callable[[], None]] = []
+    
+    @staticmethod
+    def add_change_listener(callback: Callable[[], None]) -> None:
+        """Register a callback to run after employees are created or updated."""
+        if callback not in EmployeeService._change_listeners:
+            EmployeeService._change_listeners.append(callback)
+    
+    @staticmethod
+    def _notify_changed() -> None:
+        for callback in EmployeeService._change_listeners:
+            callback()
+    
+    @staticmethod
+    def _validate_new_employee(data: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Normalize and validate new-employee data.
+        
+        Returns:
+            Tuple of (error message or None, cleaned fields with plaintext
+            bank_card/id_number)
+        """
+        fields = {
+            "employee_no": data.get("employee_no", "").strip(),
+            "name": data.get("name", "").strip(),
+            # 部门是可选的，默认为"未分配"
+            "department": data.get("department", "").strip() or "未分配",
+            "hire_date": data.get("hire_date"),
+            "bank_card": data.get("bank_card", ""),
+            "id_number": data.get("id_number", ""),
+        }
+        
+        # Validation
+        if not fields["employee_no"]:
+            return "员工编号无效", fields
+        if not fields["name"]:
+            return "员工姓名无效", fields
+        if not fields["hire_date"]:
+            return "入职日期无效", fields
+        return None, fields
+    
     @staticmethod
     def create_employee(data: Dict[str, Any], actor: str) -> Tuple[bool, str, Optional[int]]:
         """
@@ -257,23 +407,13 @@ class EmployeeService:
         Returns:
             Tuple of (success, message, employee_id)
         """
-        employee_no = data.get("employee_no", "").strip()
-        name = data.get("name", "").strip()
-        department = data.get("department", "").strip()
-        hire_date = data.get("hire_date")
-        bank_card = data.get("bank_card", "")
-        id_number = data.get("id_number", "")
-        
-        # Validation
-        if not employee_no:
-            return False, "员工编号无效", None
-        if not name:
-            return False, "员工姓名无效", None
-        # 部门是可选的，默认为"未分配"
-        if not department:
-            department = "未分配"
-        if not hire_date:
-            return False, "入职日期无效", None
+        error, fields = EmployeeService._validate_new_employee(data)
+        if error:
+            return False, error, None
+        employee_no = fields["employee_no"]
+        name = fields["name"]
+        bank_card = fields["bank_card"]
+        id_number = fields["id_number"]
         
         # Encrypt sensitive data
         em = get_encryption_manager()
@@ -290,13 +430,13 @@ class EmployeeService:
                 session,
                 employee_no=employee_no,
                 name=name,
-                department=department,
-                hire_date=hire_date,
+                department=fields["department"],
+                hire_date=fields["hire_date"],
                 bank_card_encrypted=bank_card_encrypted,
                 id_number_encrypted=id_number_encrypted,
             )
             
-            AuditLogRepository.create(
+            get_audit_writer().enqueue_on_commit(
                 session,
                 actor=actor,
                 action="create_employee",
@@ -304,8 +444,10 @@ class EmployeeService:
                 resource_type="employee",
                 resource_id=employee.id,
             )
-            
-            return True, f"员工 {name} 创建成功", employee.id
+            employee_id = employee.id
+        
+        EmployeeService._notify_changed()
+        return True, f"员工 {name} 创建成功", employee_id
     
     @staticmethod
     def get_employee_with_sensitive_data(
@@ -344,13 +486,58 @@ class EmployeeService:
                 result["id_number"] = em.decrypt(employee.id_number_encrypted) if employee.id_number_encrypted else None
             else:
                 # Redact sensitive values
-                bank_card = em.decrypt(employee.bank_card_encrypted) if employee.bank_card_encrypted else None
-                id_number = em.decrypt(employee.id_number_encrypted) if employee.id_number_encrypted else None
-                result["bank_card"] = em.redact_sensitive(bank_card) if bank_card else None
-                result["id_number"] = em.redact_sensitive(id_number) if id_number else None
+                result["bank_card"] = em.decrypt_redacted(employee.bank_card_encrypted) or None
+                result["id_number"] = em.decrypt_redacted(employee.id_number_encrypted) or None
             
             return result
     
+    @staticmethod
+    def list_employees_sensitive(
+        employee_ids: Iterable[int],
+        can_view_sensitive: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get many employees with sensitive fields, decrypted in two batches.
+        批量获取员工敏感数据
+        
+        Same entries as get_employee_with_sensitive_data(), in employee_ids
+        order; unknown IDs are skipped.
+        
+        Args:
+            employee_ids: Employee IDs
+            can_view_sensitive: Whether to show full values instead of redacted ones
+            
+        Returns:
+            List of employee data dictionaries
+        """
+        employee_ids = list(employee_ids)
+        
+        with session_scope() as session:
+            by_id = EmployeeRepository.get_by_ids(session, employee_ids)
+            employees = [by_id[i] for i in dict.fromkeys(employee_ids) if i in by_id]
+            
+            em = get_encryption_manager()
+            bank_cards = em.decrypt_many(e.bank_card_encrypted for e in employees)
+            id_numbers = em.decrypt_many(e.id_number_encrypted for e in employees)
+            
+            if not can_view_sensitive:
+                bank_cards = [em.redact_sensitive(v) if v else None for v in bank_cards]
+                id_numbers = [em.redact_sensitive(v) if v else None for v in id_numbers]
+            
+            return [
+                {
+                    "id": employee.id,
+                    "employee_no": employee.employee_no,
+                    "name": employee.name,
+                    "department": employee.department,
+                    "hire_date": employee.hire_date,
+                    "status": employee.status.value,
+                    "bank_card": bank_card or None,
+                    "id_number": id_number or None,
+                }
+                for employee, bank_card, id_number in zip(employees, bank_cards, id_numbers)
+            ]
+    
     @staticmethod
     def list_employees(status: Optional[EmployeeStatus] = None) -> List[Dict[str, Any]]:
         """
@@ -364,9 +551,9 @@ class EmployeeService:
         """
         with session_scope() as session:
             if status:
-                employees = EmployeeRepository.list_all(session, status=status)
+                employees = EmployeeRepository.list_summary(session, status=status)
             else:
-                employees = EmployeeRepository.list_all(session)
+                employees = EmployeeRepository.list_summary(session)
             
             return [
                 {
@@ -388,41 +575,48 @@ class EmployeeService:
     
     @staticmethod
     def update_employee(employee_id: int, data: Dict[str, Any], actor: str) -> Tuple[bool, str]:
-        """Update employee data."""
-        with session_scope() as session:
-            employee = EmployeeRepository.get_by_id(session, employee_id)
-            if not employee:
-                return False, "员工不存在"
-            
-            # Update basic fields
-            update_data = {}
-            if "name" in data:
-                update_data["name"] = data["name"]
-            if "department" in data:
-                update_data["department"] = data["department"]
-            if "status" in data:
-                update_data["status"] = data["status"]
-            
-            # Encrypt sensitive fields if provided
+        """
+        Update employee data.
+        
+        Fields are encrypted before the transaction opens, and the change is a
+        single UPDATE whose row count tells whether the employee exists. With
+        nothing to update, no database call is made at all.
+        """
+        # Update basic fields
+        update_data = {}
+        if "name" in data:
+            update_data["name"] = data["name"]
+        if "department" in data:
+            update_data["department"] = data["department"]
+        if "status" in data:
+            update_data["status"] = data["status"]
+        
+        # Encrypt sensitive fields if provided
+        if "bank_card" in data or "id_number" in data:
             em = get_encryption_manager()
             if "bank_card" in data:
                 update_data["bank_card_encrypted"] = em.encrypt(data["bank_card"]) if data["bank_card"] else None
             if "id_number" in data:
                 update_data["id_number_encrypted"] = em.encrypt(data["id_number"]) if data["id_number"] else None
+        
+        if not update_data:
+            return True, "员工信息无变更"
+        
+        with session_scope() as session:
+            if not EmployeeRepository.update(session, employee_id, **update_data):
+                return False, "员工不存在"
             
-            if update_data:
-                EmployeeRepository.update(session, employee_id, **update_data)
-                
-                AuditLogRepository.create(
-                    session,
-                    actor=actor,
-                    action="update_employee",
-                    result="success",
-                    resource_type="employee",
-                    resource_id=employee_id,
-                )
-            
-            return True, "员工信息更新成功"
+            get_audit_writer().enqueue_on_commit(
+                session,
+                actor=actor,
+                action="update_employee",
+                result="success",
+                resource_type="employee",
+                resource_id=employee_id,
+            )
+        
+        EmployeeService._notify_changed()
+        return True, "员工信息更新成功"
 
 
 # =============================================================================
@@ -475,7 +669,7 @@ class SalaryStructureService:
                 deductions=deductions,
             )
             
-            AuditLogRepository.create(
+            get_audit_writer().enqueue_on_commit(
                 session,
                 actor=actor,
                 action="update_salary_structure",
@@ -501,8 +695,8 @@ class SalaryStructureService:
                 "hourly_rate": structure.hourly_rate,
                 "overtime_multiplier": structure.overtime_multiplier,
                 "daily_deduction": structure.daily_deduction,
-                "allowances": json.loads(structure.allowances_json) if structure.allowances_json else {},
-                "deductions": json.loads(structure.deductions_json) if structure.deductions_json else {},
+                "allowances": structure.allowances_json or {},
+                "deductions": structure.deductions_json or {},
             }
 
 
@@ -516,21 +710,35 @@ class PayrollService:
     工资计算与管理服务
     """
     
-    PERIOD_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+    # fullmatch + ASCII: no trailing newline (as "$" allowed) or non-ASCII digits
+    PERIOD_PATTERN = re.compile(r"\d{4}-(?:0[1-9]|1[0-2])", re.ASCII)
     
     @staticmethod
     def validate_period(period: str) -> bool:
         """Validate period format (YYYY-MM)."""
-        return bool(PayrollService.PERIOD_PATTERN.match(period))
+        return PayrollService.PERIOD_PATTERN.fullmatch(period) is not None
+    
+    # Employees per generate_payroll batch: bundle load, slip calc and insert
+    PAYROLL_CHUNK_SIZE = 500
     
     @staticmethod
-    def generate_payroll(period: str, actor: str) -> Tuple[bool, str, Optional[PayrollSummary]]:
+    def generate_payroll(
+        period: str,
+        actor: str,
+        chunk_size: Optional[int] = None,
+    ) -> Tuple[bool, str, Optional[PayrollSummary]]:
         """
         Generate payroll for a period.
         
+        The whole run shares one session and transaction. Employees are
+        processed in chunks: each chunk's inputs are loaded, its slips
+        inserted and flushed, and the identity map is then cleared so
+        memory stays flat however many employees are active.
+        
         Args:
             period: Period in YYYY-MM format
             actor: Username generating payroll
+            chunk_size: Employees per batch (default PAYROLL_CHUNK_SIZE)
             
         Returns:
             Tuple of (success, message, summary)
@@ -538,87 +746,97 @@ class PayrollService:
         if not PayrollService.validate_period(period):
             return False, "期间格式无效，请使用 YYYY-MM 格式", None
         
-        with session_scope() as session:
-            # Get active employees
-            employees = EmployeeRepository.list_active(session)
+        chunk_size = max(1, chunk_size or PayrollService.PAYROLL_CHUNK_SIZE)
+        
+        import pandas as pd
+        from app.services.payroll_calc import slip_inputs, calculate_slips, iter_slip_amounts
+        
+        with bulk_session_scope() as session:
+            # Get active employees (lightweight rows, no ORM objects)
+            employees = EmployeeRepository.list_summary(session, status=EmployeeStatus.ACTIVE)
             if not employees:
                 return False, "没有在职员工", None
             
             # Create payroll run
-            run = PayrollRunRepository.create(session, period, actor)
-            
-            total_gross = Decimal("0")
-            total_deductions = Decimal("0")
-            total_net = Decimal("0")
-            processed_count = 0
+            run_id = PayrollRunRepository.create(session, period, actor).id
             
             employees_without_attendance = []
-
-            for employee in employees:
-                # Get salary structure
-                structure = SalaryStructureRepository.get_by_employee(session, employee.id)
-                if not structure:
-                    continue
-
-                # Get attendance - 必须存在考勤记录
-                attendance = AttendanceRepository.get_by_employee_period(session, employee.id, period)
-                if not attendance:
-                    employees_without_attendance.append(f"{employee.name}({employee.employee_no})")
-                    continue  # 跳过没有考勤记录的员工
-
-                # Get adjustments
-                adj_add, adj_deduct = AdjustmentRepository.sum_by_employee_period(session, employee.id, period)
-
-                # Calculate payroll
-                slip_data = PayrollService._calculate_slip(structure, attendance, adj_add, adj_deduct)
-
-                # Create slip
-                PayrollSlipRepository.create(
-                    session,
-                    payroll_run_id=run.id,
-                    employee_id=employee.id,
-                    **slip_data
-                )
-
-                total_gross += slip_data["gross_salary"]
-                total_deductions += slip_data["total_deductions"]
-                total_net += slip_data["net_salary"]
-                processed_count += 1
-
+            
+            for start in range(0, len(employees), chunk_size):
+                chunk = employees[start:start + chunk_size]
+                
+                # Load salary structures, attendance and adjustments for the chunk
+                bundle = PayrollRunRepository.load_period_bundle(session, period, [e.id for e in chunk])
+                slip_records = []
+                
+                for employee in chunk:
+                    # Get salary structure
+                    structure = bundle.structures.get(employee.id)
+                    if not structure:
+                        continue
+                    
+                    # Get attendance - 必须存在考勤记录
+                    attendance = bundle.attendance.get(employee.id)
+                    if not attendance:
+                        employees_without_attendance.append(f"{employee.name}({employee.employee_no})")
+                        continue  # 跳过没有考勤记录的员工
+                    
+                    # Get adjustments
+                    adj_add_cents, adj_deduct_cents = bundle.adjustment_totals_cents(employee.id)
+                    
+                    slip_records.append({
+                        "employee_id": employee.id,
+                        **slip_inputs(structure, attendance, adj_add_cents, adj_deduct_cents),
+                    })
+                
+                # Calculate the chunk's slips at once (integer cents, exact)
+                if slip_records:
+                    slips = calculate_slips(pd.DataFrame.from_records(slip_records, index="employee_id"))
+                    PayrollSlipRepository.bulk_create(
+                        session,
+                        run_id,
+                        [
+                            {"employee_id": int(employee_id), **slip_data}
+                            for employee_id, slip_data in iter_slip_amounts(slips)
+                        ],
+                    )
+                
+                # Send the chunk's writes, then drop its loaded objects
+                session.flush()
+                session.expunge_all()
+            
+            # Totals are aggregated from the persisted slips in the database
+            totals = PayrollRunRepository.recompute_totals(session, run_id)
+            processed_count = totals["count"]
+            total_gross = totals["gross"]
+            total_deductions = totals["deductions"]
+            total_net = totals["net"]
+
+            audit_entries = []
+            
             # 如果有员工缺少考勤记录，添加到审计日志
             if employees_without_attendance:
                 warning_msg = f"以下员工没有考勤记录，已跳过: {', '.join(employees_without_attendance[:10])}"
                 if len(employees_without_attendance) > 10:
                     warning_msg += f" 等共 {len(employees_without_attendance)} 人"
-                AuditLogRepository.create(
-                    session,
-                    actor=actor,
-                    action="generate_payroll_warning",
-                    result="success",
-                    resource_type="payroll_run",
-                    resource_id=run.id,
-                    metadata={"warning": warning_msg, "skipped_employees": len(employees_without_attendance)},
-                )
-            
-            # Update run totals
-            PayrollRunRepository.update_totals(
-                session,
-                run.id,
-                total_employees=processed_count,
-                total_gross=total_gross,
-                total_deductions=total_deductions,
-                total_net=total_net,
-            )
+                audit_entries.append({
+                    "actor": actor,
+                    "action": "generate_payroll_warning",
+                    "resource_type": "payroll_run",
+                    "resource_id": run_id,
+                    "metadata": {"warning": warning_msg, "skipped_employees": len(employees_without_attendance)},
+                })
             
-            AuditLogRepository.create(
-                session,
-                actor=actor,
-                action="generate_payroll",
-                result="success",
-                resource_type="payroll_run",
-                resource_id=run.id,
-                metadata={"period": period, "employees": processed_count},
-            )
+            audit_entries.append({
+                "actor": actor,
+                "action": "generate_payroll",
+                "resource_type": "payroll_run",
+                "resource_id": run_id,
+                "metadata": {"period": period, "employees": processed_count},
+            })
+            audit_writer = get_audit_writer()
+            for entry in audit_entries:
+                audit_writer.enqueue_on_commit(session, **entry)
             
             summary = PayrollSummary(
                 total_employees=processed_count,
@@ -636,47 +854,57 @@ class PayrollService:
         adj_add: Decimal,
         adj_deduct: Decimal
     ) -> Dict[str, Decimal]:
-        """Calculate individual payroll slip."""
-        # 定义精度量化函数
+        """
+        Calculate individual payroll slip.
+        
+        Decimal reference for payroll_calc.calculate_slips, which
+        generate_payroll uses for whole runs.
+        """
+        # Each component is quantized once; gross, total and net are sums
+        # of 2-decimal values and therefore already exact to the cent
         def quantize_money(value: Decimal) -> Decimal:
             """量化金额到2位小数"""
-            return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+            return value.quantize(MONEY_QUANTUM, rounding=ROUND_HALF_UP)
 
+        zero = Decimal("0")
         base_salary = quantize_money(structure.base_salary)
 
-        # Overtime pay
-        overtime_hours = Decimal(str(attendance.overtime_hours)) if attendance else Decimal("0")
-        overtime_pay = quantize_money(overtime_hours * structure.hourly_rate * structure.overtime_multiplier)
+        # Overtime pay (most months have none: skip the Decimal work for zero)
+        overtime_hours = attendance.overtime_hours if attendance else 0
+        if overtime_hours:
+            overtime_pay = quantize_money(
+                Decimal(str(overtime_hours)) * structure.hourly_rate * structure.overtime_multiplier
+            )
+        else:
+            overtime_pay = MONEY_ZERO
 
-        # Allowances - 确保每个津贴都量化
-        allowances = json.loads(structure.allowances_json) if structure.allowances_json else {}
-        allowances_total = quantize_money(sum(Decimal(str(v)) for v in allowances.values()))
+        # Allowances (start=Decimal so an empty dict sums to Decimal, not int 0)
+        allowances = structure.allowances_json or {}
+        allowances_total = quantize_money(sum((Decimal(str(v)) for v in allowances.values()), zero))
 
-        # 确保调整项也量化
         adj_add = quantize_money(adj_add)
 
-        # Gross salary - 所有项都已量化，再次量化以确保精度
-        gross_salary = quantize_money(base_salary + overtime_pay + allowances_total + adj_add)
+        gross_salary = base_salary + overtime_pay + allowances_total + adj_add
 
-        # Absence deduction
-        absence_days = Decimal(str(attendance.absence_days)) if attendance else Decimal("0")
-        absence_deduction = quantize_money(absence_days * structure.daily_deduction)
+        # Absence deduction (likewise zero for most employees)
+        absence_days = attendance.absence_days if attendance else 0
+        if absence_days:
+            absence_deduction = quantize_money(Decimal(str(absence_days)) * structure.daily_deduction)
+        else:
+            absence_deduction = MONEY_ZERO
 
-        # Fixed deductions - 确保每个扣款都量化
-        deductions = json.loads(structure.deductions_json) if structure.deductions_json else {}
-        deductions_total = quantize_money(sum(Decimal(str(v)) for v in deductions.values()))
+        # Fixed deductions
+        deductions = structure.deductions_json or {}
+        deductions_total = quantize_money(sum((Decimal(str(v)) for v in deductions.values()), zero))
 
-        # 确保调整扣款也量化
         adj_deduct = quantize_money(adj_deduct)
 
         # Tax (simplified - 0 for now, can be expanded)
-        tax = Decimal("0")
+        tax = zero
 
-        # Total deductions - 所有项都已量化，再次量化以确保精度
-        total_deductions = quantize_money(absence_deduction + deductions_total + adj_deduct + tax)
+        total_deductions = absence_deduction + deductions_total + adj_deduct + tax
 
-        # Net salary - 最终量化
-        net_salary = quantize_money(gross_salary - total_deductions)
+        net_salary = gross_salary - total_deductions
 
         return {
             "base_salary": base_salary,
@@ -712,33 +940,67 @@ class PayrollService:
                 for run in runs
             ]
     
+    @staticmethod
+    def get_run_summary(run_id: int) -> Dict[str, Any]:
+        """Get slip totals for a payroll run, aggregated in SQL."""
+        with session_scope() as session:
+            totals = PayrollSlipRepository.summary(session, run_id)
+            return {
+                "employees": totals["count"],
+                "total_gross": float(totals["gross"]),
+                "total_deductions": float(totals["deductions"]),
+                "total_net": float(totals["net"]),
+            }
+    
+    @staticmethod
+    def get_department_summary(run_id: int) -> List[Dict[str, Any]]:
+        """Get per-department totals for a payroll run."""
+        with session_scope() as session:
+            rows = PayrollSlipRepository.summary_by_department(session, run_id)
+            return [
+                {
+                    "department": row.department or "未分配",
+                    "employees": row.count,
+                    "total_gross": (row.gross_cents or 0) / 100,
+                    "total_deductions": (row.deductions_cents or 0) / 100,
+                    "total_net": (row.net_cents or 0) / 100,
+                }
+                for row in rows
+            ]
+    
     @staticmethod
     def get_payroll_slips(run_id: int) -> List[Dict[str, Any]]:
         """Get all payroll slips for a run."""
         with session_scope() as session:
-            slips = PayrollSlipRepository.list_by_run(session, run_id)
-            result = []
-            for slip in slips:
-                employee = EmployeeRepository.get_by_id(session, slip.employee_id)
-                result.append({
-                    "id": slip.id,
-                    "employee_id": slip.employee_id,
-                    "employee_no": employee.employee_no if employee else "",
-                    "employee_name": employee.name if employee else "",
-                    "department": employee.department if employee else "",
-                    "base_salary": float(slip.base_salary),
-                    "overtime_pay": float(slip.overtime_pay),
-                    "allowances_total": float(slip.allowances_total),
-                    "adjustments_add": float(slip.adjustments_add),
-                    "gross_salary": float(slip.gross_salary),
-                    "absence_deduction": float(slip.absence_deduction),
-                    "deductions_total": float(slip.deductions_total),
-                    "adjustments_deduct": float(slip.adjustments_deduct),
-                    "tax": float(slip.tax),
-                    "total_deductions": float(slip.total_deductions),
-                    "net_salary": float(slip.net_salary),
-                })
-            return result
+            return list(PayrollService._iter_slip_dicts(session, run_id, float))
+    
+    @staticmethod
+    def get_payroll_slips_json(run_id: int) -> bytes:
+        """
+        Get all payroll slips for a run as a JSON array (UTF-8 bytes).
+        工资条 JSON 序列化
+        
+        Amounts are exact decimal strings ("8000.00") rather than floats,
+        serialized by orjson in one pass, for callers that ship the data on.
+        """
+        with session_scope() as session:
+            return orjson.dumps(list(PayrollService._iter_slip_dicts(session, run_id, str)))
+    
+    @staticmethod
+    def _iter_slip_dicts(session, run_id: int, amount: Callable[[Decimal], Any]) -> Iterable[Dict[str, Any]]:
+        """Yield a run's slips as plain dicts, converting amounts with `amount`."""
+        from app.services.payroll_calc import SLIP_AMOUNT_FIELDS
+        
+        for chunk in PayrollSlipRepository.iter_for_run(session, run_id):
+            for row in chunk:
+                yield {
+                    "id": row["id"],
+                    "employee_id": row["employee_id"],
+                    "employee_no": row["employee_no"] or "",
+                    "employee_name": row["employee_name"] or "",
+                    "department": row["department"] or "",
+                    **{key: amount(row[key]) for key in SLIP_AMOUNT_FIELDS},
+                }
     
     @staticmethod
     def lock_payroll(run_id: int, actor: str) -> Tuple[bool, str]:
@@ -754,7 +1016,7 @@ class PayrollService:
             success = PayrollRunRepository.lock(session, run_id, actor)
             
             if success:
-                AuditLogRepository.create(
+                get_audit_writer().enqueue_on_commit(
                     session,
                     actor=actor,
                     action="lock_payroll",
@@ -893,6 +1155,9 @@ class ImportService:
         "备注": "reason",
     }
     
+    # Rows per batched INSERT when importing employees
+    IMPORT_BATCH_SIZE = 1000
+    
     @staticmethod
     def _rename_columns(df: pd.DataFrame, mapping: Dict[str, str]) -> pd.DataFrame:
         """Rename DataFrame columns using mapping."""
@@ -905,6 +1170,76 @@ class ImportService:
                 pass  # Already in English
         return df.rename(columns=columns_to_rename)
     
+    @staticmethod
+    def _decimal_column(df: pd.DataFrame, column: str, default: Any) -> List[Optional[Decimal]]:
+        """
+        Convert a numeric column to Decimals in one pass.
+        
+        Missing columns and empty cells take the default; cells that are
+        present but not numbers become None.
+        """
+        import pandas as pd
+        
+        if column not in df.columns:
+            return [Decimal(str(default))] * len(df)
+        
+        raw = df[column]
+        values = pd.to_numeric(raw, errors="coerce")
+        invalid = (values.isna() & raw.notna()).tolist()
+        return [
+            None if bad else Decimal(str(value))
+            for value, bad in zip(values.fillna(default).tolist(), invalid)
+        ]
+    
+    @staticmethod
+    def _json_column(df: pd.DataFrame, column: str) -> List[Any]:
+        """Parse a JSON text column, using {} for empty or malformed cells."""
+        import pandas as pd
+        
+        if column not in df.columns:
+            return [{} for _ in range(len(df))]
+        
+        parsed = []
+        for value in df[column].tolist():
+            try:
+                parsed.append(orjson.loads(str(value)) if pd.notna(value) else {})
+            except orjson.JSONDecodeError:
+                parsed.append({})
+        return parsed
+    
+    @staticmethod
+    def _employee_id_map(session, df: pd.DataFrame) -> Dict[str, int]:
+        """Look up the ids of every employee number in df in one pass."""
+        if "employee_no" not in df.columns:
+            return {}
+        employee_nos = df["employee_no"].astype(str).str.strip().unique().tolist()
+        return EmployeeRepository.get_id_map(session, employee_nos)
+    
+    @staticmethod
+    def _normalize_employee_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Normalize renamed employee columns in whole-column passes.
+        
+        Text fields become stripped strings (missing cells and columns become
+        ""), and hire_date becomes a date, or None when absent or not a valid
+        YYYY-MM-DD date.
+        """
+        import pandas as pd
+        
+        df = df.copy()
+        for column in ("employee_no", "name", "department", "bank_card", "id_number"):
+            if column in df.columns:
+                df[column] = df[column].fillna("").astype(str).str.strip()
+            else:
+                df[column] = ""
+        
+        if "hire_date" in df.columns:
+            hire_dates = pd.to_datetime(df["hire_date"], format="%Y-%m-%d", errors="coerce")
+            df["hire_date"] = hire_dates.dt.date.astype(object).where(hire_dates.notna(), None)
+        else:
+            df["hire_date"] = None
+        return df
+    
     @staticmethod
     def import_employees(df: pd.DataFrame, actor: str) -> Tuple[bool, str, int]:
         """
@@ -925,36 +1260,81 @@ class ImportService:
         except Exception as e:
             return False, f"导入失败: 加密服务错误 - {str(e)}", 0
 
-        df = ImportService._rename_columns(df, ImportService.EMPLOYEE_COLUMNS)
+        df = ImportService._normalize_employee_frame(
+            ImportService._rename_columns(df, ImportService.EMPLOYEE_COLUMNS)
+        )
 
-        imported_count = 0
-        errors = []
+        errors = []  # (row number, message)
         total_rows = len(df)
+        pending = []  # (row number, validated fields)
+        seen_nos = set()
 
-        for idx, row in df.iterrows():
+        # Phase 1: validate every row
+        for idx, row in zip(df.index, df.itertuples(index=False)):
             try:
-                hire_date = row.get("hire_date")
-                if isinstance(hire_date, str):
-                    hire_date = datetime.strptime(hire_date, "%Y-%m-%d").date()
-                elif hasattr(hire_date, "date"):
-                    hire_date = hire_date.date()
-
                 data = {
-                    "employee_no": str(row.get("employee_no", "")).strip(),
-                    "name": str(row.get("name", "")).strip(),
-                    "department": str(row.get("department", "")).strip(),
-                    "hire_date": hire_date,
-                    "bank_card": str(row.get("bank_card", "")).strip() if pd.notna(row.get("bank_card")) else "",
-                    "id_number": str(row.get("id_number", "")).strip() if pd.notna(row.get("id_number")) else "",
+                    "employee_no": row.employee_no,
+                    "name": row.name,
+                    "department": row.department,
+                    "hire_date": row.hire_date,
+                    "bank_card": row.bank_card,
+                    "id_number": row.id_number,
                 }
 
-                success, message, _ = EmployeeService.create_employee(data, actor)
-                if success:
-                    imported_count += 1
-                else:
-                    errors.append(f"行 {idx + 2}: {message}")
+                error, fields = EmployeeService._validate_new_employee(data)
+                if not error and fields["employee_no"] in seen_nos:
+                    error = f"员工编号 {fields['employee_no']} 已存在"
+                if error:
+                    errors.append((idx + 2, error))
+                    continue
+                seen_nos.add(fields["employee_no"])
+                pending.append((idx + 2, fields))
+            except Exception as e:
+                errors.append((idx + 2, str(e)))
+
+        # Phase 2: encrypt in batch, skip existing numbers, insert in chunks
+        imported_count = 0
+        if pending:
+            try:
+                em = get_encryption_manager()
+                bank_cards = em.encrypt_many(fields["bank_card"] for _, fields in pending)
+                id_numbers = em.encrypt_many(fields["id_number"] for _, fields in pending)
+
+                with bulk_session_scope() as session:
+                    existing = EmployeeRepository.get_id_map(session, seen_nos)
+                    rows = []
+                    for (line, fields), bank_card, id_number in zip(pending, bank_cards, id_numbers):
+                        if fields["employee_no"] in existing:
+                            errors.append((line, f"员工编号 {fields['employee_no']} 已存在"))
+                            continue
+                        rows.append({
+                            "employee_no": fields["employee_no"],
+                            "name": fields["name"],
+                            "department": fields["department"],
+                            "hire_date": fields["hire_date"],
+                            "bank_card_encrypted": bank_card or None,
+                            "id_number_encrypted": id_number or None,
+                        })
+
+                    audit_writer = get_audit_writer()
+                    batch_size = ImportService.IMPORT_BATCH_SIZE
+                    for start in range(0, len(rows), batch_size):
+                        for employee_id in EmployeeRepository.create_many(session, rows[start:start + batch_size]):
+                            audit_writer.enqueue_on_commit(
+                                session,
+                                actor=actor,
+                                action="create_employee",
+                                result="success",
+                                resource_type="employee",
+                                resource_id=employee_id,
+                            )
+                    imported_count = len(rows)
             except Exception as e:
-                errors.append(f"行 {idx + 2}: {str(e)}")
+                return False, f"导入失败: {str(e)}", 0
+            if imported_count:
+                EmployeeService._notify_changed()
+
+        errors = [f"行 {line}: {message}" for line, message in sorted(errors)]
 
         # 改进的结果报告
         failed_count = len(errors)
@@ -980,51 +1360,58 @@ class ImportService:
         df = ImportService._rename_columns(df, ImportService.SALARY_COLUMNS)
         
         imported_count = 0
+        structure_rows = []
         
-        with session_scope() as session:
-            for idx, row in df.iterrows():
-                try:
-                    employee_no = str(row.get("employee_no", "")).strip()
-                    employee = EmployeeRepository.get_by_employee_no(session, employee_no)
-                    if not employee:
-                        continue
-                    
-                    allowances = {}
-                    deductions = {}
-                    
-                    if pd.notna(row.get("allowances_json")):
-                        try:
-                            allowances = json.loads(str(row.get("allowances_json")))
-                        except:
-                            pass
-                    
-                    if pd.notna(row.get("deductions_json")):
-                        try:
-                            deductions = json.loads(str(row.get("deductions_json")))
-                        except:
-                            pass
-                    
-                    SalaryStructureRepository.create_or_update(
-                        session,
-                        employee_id=employee.id,
-                        base_salary=Decimal(str(row.get("base_salary", 0))),
-                        hourly_rate=Decimal(str(row.get("hourly_rate", 0))),
-                        overtime_multiplier=Decimal(str(row.get("overtime_multiplier", 1.5))),
-                        daily_deduction=Decimal(str(row.get("daily_deduction", 0))),
-                        allowances=allowances,
-                        deductions=deductions,
-                    )
-                    imported_count += 1
-                except Exception as e:
+        # Convert whole columns up front; the loop only picks values out
+        employee_nos = (
+            df["employee_no"].astype(str).str.strip().tolist()
+            if "employee_no" in df.columns else [""] * len(df)
+        )
+        amounts = {
+            column: ImportService._decimal_column(df, column, default)
+            for column, default in (
+                ("base_salary", 0),
+                ("hourly_rate", 0),
+                ("overtime_multiplier", 1.5),
+                ("daily_deduction", 0),
+            )
+        }
+        allowances = ImportService._json_column(df, "allowances_json")
+        deductions = ImportService._json_column(df, "deductions_json")
+        
+        with bulk_session_scope() as session:
+            employee_ids = ImportService._employee_id_map(session, df)
+            for i, employee_no in enumerate(employee_nos):
+                employee_id = employee_ids.get(employee_no)
+                if employee_id is None:
                     continue
+                
+                row_amounts = {column: values[i] for column, values in amounts.items()}
+                if None in row_amounts.values():
+                    continue  # Non-numeric amount
+                
+                structure_rows.append({
+                    "employee_id": employee_id,
+                    **row_amounts,
+                    "allowances": allowances[i],
+                    "deductions": deductions[i],
+                })
+                imported_count += 1
             
-            AuditLogRepository.create(
-                session,
-                actor=actor,
-                action="import_salary_structures",
-                result="success",
-                metadata={"count": imported_count},
-            )
+            # Write all structures in a single upsert
+            SalaryStructureRepository.bulk_upsert(session, structure_rows)
+            
+            # Same transaction as the data, as a plain INSERT (no ORM object)
+            AuditLogRepository.bulk_create(session, [{
+                "actor": actor,
+                "action": "import_salary_structures",
+                "result": "success",
+                "metadata": {"count": imported_count},
+            }])
+        
+        # Refresh planner statistics after a bulk load
+        if imported_count:
+            optimize_database()
         
         return True, f"成功导入 {imported_count} 条薪资结构", imported_count
     
@@ -1034,82 +1421,120 @@ class ImportService:
         df = ImportService._rename_columns(df, ImportService.ATTENDANCE_COLUMNS)
         
         imported_count = 0
+        attendance_rows = []
         
-        with session_scope() as session:
-            for idx, row in df.iterrows():
+        with bulk_session_scope() as session:
+            employee_ids = ImportService._employee_id_map(session, df)
+            for row in df.itertuples(index=False):
                 try:
-                    employee_no = str(row.get("employee_no", "")).strip()
-                    employee = EmployeeRepository.get_by_employee_no(session, employee_no)
-                    if not employee:
+                    employee_no = str(getattr(row, "employee_no", "")).strip()
+                    employee_id = employee_ids.get(employee_no)
+                    if employee_id is None:
                         continue
                     
-                    period = str(row.get("period", "")).strip()
+                    period = str(getattr(row, "period", "")).strip()
                     
-                    AttendanceRepository.get_or_create(
-                        session,
-                        employee_id=employee.id,
-                        period=period,
-                        work_days=int(row.get("work_days", 0)),
-                        work_hours=int(row.get("work_days", 0)) * 8,
-                        overtime_hours=Decimal(str(row.get("overtime_hours", 0))),
-                        absence_days=Decimal(str(row.get("absence_days", 0))),
-                    )
+                    attendance_rows.append({
+                        "employee_id": employee_id,
+                        "period": period,
+                        "work_days": int(getattr(row, "work_days", 0)),
+                        "work_hours": int(getattr(row, "work_days", 0)) * 8,
+                        "overtime_hours": Decimal(str(getattr(row, "overtime_hours", 0))),
+                        "absence_days": Decimal(str(getattr(row, "absence_days", 0))),
+                    })
                     imported_count += 1
                 except Exception as e:
                     continue
             
-            AuditLogRepository.create(
-                session,
-                actor=actor,
-                action="import_attendance",
-                result="success",
-                metadata={"count": imported_count},
-            )
+            # Write all records in one upsert
+            AttendanceRepository.bulk_upsert(session, attendance_rows)
+            
+            # Same transaction as the data, as a plain INSERT (no ORM object)
+            AuditLogRepository.bulk_create(session, [{
+                "actor": actor,
+                "action": "import_attendance",
+                "result": "success",
+                "metadata": {"count": imported_count},
+            }])
+        
+        # Refresh planner statistics after a bulk load
+        if imported_count:
+            optimize_database()
         
         return True, f"成功导入 {imported_count} 条考勤记录", imported_count
     
     @staticmethod
     def import_adjustments(df: pd.DataFrame, actor: str) -> Tuple[bool, str, int]:
         """Import adjustment data from DataFrame."""
+        import pandas as pd
+        
         df = ImportService._rename_columns(df, ImportService.ADJUSTMENT_COLUMNS)
         
         imported_count = 0
+        adjustment_rows = []
         
-        with session_scope() as session:
-            for idx, row in df.iterrows():
+        with bulk_session_scope() as session:
+            employee_ids = ImportService._employee_id_map(session, df)
+            for row in df.itertuples(index=False):
                 try:
-                    employee_no = str(row.get("employee_no", "")).strip()
-                    employee = EmployeeRepository.get_by_employee_no(session, employee_no)
-                    if not employee:
+                    employee_no = str(getattr(row, "employee_no", "")).strip()
+                    employee_id = employee_ids.get(employee_no)
+                    if employee_id is None:
                         continue
                     
-                    period = str(row.get("period", "")).strip()
-                    adj_type_str = str(row.get("type", "")).strip().lower()
+                    period = str(getattr(row, "period", "")).strip()
+                    adj_type_str = str(getattr(row, "type", "")).strip().lower()
                     adj_type = AdjustmentType.ADD if adj_type_str == "add" else AdjustmentType.DEDUCT
                     
-                    AdjustmentRepository.create(
-                        session,
-                        employee_id=employee.id,
-                        period=period,
-                        adjustment_type=adj_type,
-                        amount=Decimal(str(row.get("amount", 0))),
-                        reason=str(row.get("reason", "")) if pd.notna(row.get("reason")) else None,
-                    )
+                    adjustment_rows.append({
+                        "employee_id": employee_id,
+                        "period": period,
+                        "adjustment_type": adj_type,
+                        "amount": Decimal(str(getattr(row, "amount", 0))),
+                        "reason": str(getattr(row, "reason", "")) if pd.notna(getattr(row, "reason", None)) else None,
+                    })
                     imported_count += 1
                 except Exception as e:
                     continue
             
-            AuditLogRepository.create(
-                session,
-                actor=actor,
-                action="import_adjustments",
-                result="success",
-                metadata={"count": imported_count},
-            )
+            # Write all adjustments in one executemany INSERT
+            AdjustmentRepository.bulk_create(session, adjustment_rows)
+            
+            # Same transaction as the data, as a plain INSERT (no ORM object)
+            AuditLogRepository.bulk_create(session, [{
+                "actor": actor,
+                "action": "import_adjustments",
+                "result": "success",
+                "metadata": {"count": imported_count},
+            }])
+        
+        # Refresh planner statistics after a bulk load
+        if imported_count:
+            optimize_database()
         
         return True, f"成功导入 {imported_count} 条调整项", imported_count
 
 
+# Summary export columns: (row key, header)
+SUMMARY_EXPORT_COLUMNS = (
+    ("employee_no", "员工编号"),
+    ("employee_name", "姓名"),
+    ("department", "部门"),
+    ("base_salary", "基本工资"),
+    ("overtime_pay", "加班费"),
+    ("allowances_total", "津贴合计"),
+    ("adjustments_add", "增项调整"),
+    ("gross_salary", "应发工资"),
+    ("absence_deduction", "缺勤扣款"),
+    ("deductions_total", "扣款合计"),
+    ("adjustments_deduct", "扣项调整"),
+    ("tax", "个税"),
+    ("total_deductions", "扣款总计"),
+    ("net_salary", "实发工资"),
+)
+SUMMARY_TEXT_FIELDS = ("employee_no", "employee_name", "department")
+
+
 # =============================================================================
 # Export Service
 # =============================================================================
@@ -1120,15 +1545,78 @@ class ExportService:
     报表导出服务
     """
     
+    # Files up to this size are hashed from a memory map in one update() call
+    HASH_MMAP_MAX_BYTES = 512 * 1024 * 1024
+    
     @staticmethod
     def _calculate_file_hash(file_path: str) -> str:
         """Calculate SHA-256 hash of a file."""
-        sha256_hash = hashlib.sha256()
         with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
+            size = os.fstat(f.fileno()).st_size
+            if 0 < size <= ExportService.HASH_MMAP_MAX_BYTES:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return hashlib.sha256(mapped).hexdigest()
+            
+            # Python 3.11+: read and hash in C without per-block round trips
+            if hasattr(hashlib, "file_digest"):
+                return hashlib.file_digest(f, "sha256").hexdigest()
+            
+            sha256_hash = hashlib.sha256()
+            for byte_block in iter(lambda: f.read(1 << 20), b""):
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
     
+    @staticmethod
+    def _write_excel_frames(output_path: str, headers: List[str], frames: Iterable[pd.DataFrame]) -> int:
+        """
+        Write DataFrame chunks to an xlsx file, one row at a time.
+        流式写入 Excel（逐块写出，内存占用恒定）
+        
+        Uses xlsxwriter's constant_memory mode when it is installed (rows are
+        flushed to disk as they are written), otherwise openpyxl's write-only
+        mode. Each chunk's string columns are sanitized against formula
+        injection column-wise before its rows are written.
+        
+        Returns:
+            Number of data rows written
+        """
+        from app.security import iter_sanitized_rows
+        
+        if xlsxwriter is not None:
+            # Cell text is written as-is, never turned into formulas or links
+            workbook = xlsxwriter.Workbook(output_path, {
+                "constant_memory": True,
+                "strings_to_formulas": False,
+                "strings_to_urls": False,
+                "nan_inf_to_errors": True,
+            })
+            sheet = workbook.add_worksheet("Sheet1")
+            sheet.write_row(0, 0, headers)
+            
+            count = 0
+            for frame in frames:
+                for row in iter_sanitized_rows(frame):
+                    count += 1
+                    sheet.write_row(count, 0, row)
+            
+            workbook.close()
+            return count
+        
+        from openpyxl import Workbook
+        
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Sheet1")
+        sheet.append(headers)
+        
+        count = 0
+        for frame in frames:
+            for row in iter_sanitized_rows(frame):
+                sheet.append(row)
+            count += len(frame)
+        
+        workbook.save(output_path)
+        return count
+    
     @staticmethod
     def export_payroll_summary(
         run_id: int,
@@ -1150,46 +1638,30 @@ class ExportService:
         Returns:
             Tuple of (success, message, file_path, file_hash)
         """
-        from app.security import sanitize_dataframe_for_export
-        
-        slips = PayrollService.get_payroll_slips(run_id)
-        if not slips:
-            return False, "没有工资数据", None, None
-        
-        df = pd.DataFrame(slips)
-        
-        # Rename columns to Chinese
-        column_names = {
-            "employee_no": "员工编号",
-            "employee_name": "姓名",
-            "department": "部门",
-            "base_salary": "基本工资",
-            "overtime_pay": "加班费",
-            "allowances_total": "津贴合计",
-            "adjustments_add": "增项调整",
-            "gross_salary": "应发工资",
-            "absence_deduction": "缺勤扣款",
-            "deductions_total": "扣款合计",
-            "adjustments_deduct": "扣项调整",
-            "tax": "个税",
-            "total_deductions": "扣款总计",
-            "net_salary": "实发工资",
-        }
-        df = df.rename(columns=column_names)
-        
-        # Select and order columns
-        export_columns = [
-            "员工编号", "姓名", "部门", "基本工资", "加班费", "津贴合计",
-            "增项调整", "应发工资", "缺勤扣款", "扣款合计", "扣项调整",
-            "个税", "扣款总计", "实发工资"
-        ]
-        df = df[[col for col in export_columns if col in df.columns]]
+        import pandas as pd
         
-        # Sanitize for spreadsheet
-        df = sanitize_dataframe_for_export(df)
-        
-        # Export to Excel
-        df.to_excel(output_path, index=False, engine="openpyxl")
+        with session_scope() as session:
+            chunks = PayrollSlipRepository.iter_for_run(session, run_id)
+            first_chunk = next(chunks, None)
+            if not first_chunk:
+                return False, "没有工资数据", None, None
+            
+            keys = [key for key, _ in SUMMARY_EXPORT_COLUMNS]
+            
+            def summary_frames():
+                # One column-oriented frame per chunk
+                for chunk in itertools.chain([first_chunk], chunks):
+                    frame = pd.DataFrame(chunk, columns=keys)
+                    for key in keys:
+                        if key in SUMMARY_TEXT_FIELDS:
+                            frame[key] = frame[key].fillna("")
+                        else:
+                            frame[key] = frame[key].astype(float)
+                    yield frame
+            
+            ExportService._write_excel_frames(
+                output_path, [header for _, header in SUMMARY_EXPORT_COLUMNS], summary_frames()
+            )
         
         # Calculate hash
         file_hash = ExportService._calculate_file_hash(output_path)
@@ -1216,35 +1688,32 @@ class ExportService:
         encrypt: bool = False
     ) -> Tuple[bool, str, Optional[str], Optional[str]]:
         """Export bank transfer file with decrypted bank card numbers."""
-        from app.security import sanitize_dataframe_for_export
+        import pandas as pd
         
         em = get_encryption_manager()
         
         with session_scope() as session:
-            slips = PayrollSlipRepository.list_by_run(session, run_id)
-            if not slips:
+            chunks = PayrollSlipRepository.iter_for_run(session, run_id)
+            first_chunk = next(chunks, None)
+            if not first_chunk:
                 return False, "没有工资数据", None, None
             
-            data = []
-            for slip in slips:
-                employee = EmployeeRepository.get_by_id(session, slip.employee_id)
-                if not employee:
-                    continue
-                
-                bank_card = ""
-                if employee.bank_card_encrypted:
-                    bank_card = em.decrypt(employee.bank_card_encrypted)
-                
-                data.append({
-                    "员工编号": employee.employee_no,
-                    "姓名": employee.name,
-                    "银行卡号": bank_card,
-                    "实发工资": float(slip.net_salary),
-                })
+            def bank_frames():
+                # Decrypt card numbers a chunk (column) at a time
+                for chunk in itertools.chain([first_chunk], chunks):
+                    frame = pd.DataFrame(chunk, columns=[
+                        "employee_no", "employee_name", "bank_card_encrypted", "net_salary",
+                    ])
+                    frame = frame[frame["employee_no"].notna()]
+                    cards = em.decrypt_many(frame["bank_card_encrypted"].tolist())
+                    yield frame.assign(
+                        bank_card_encrypted=[card or "" for card in cards],
+                        net_salary=frame["net_salary"].astype(float),
+                    )
             
-            df = pd.DataFrame(data)
-            df = sanitize_dataframe_for_export(df)
-            df.to_excel(output_path, index=False, engine="openpyxl")
+            ExportService._write_excel_frames(
+                output_path, ["员工编号", "姓名", "银行卡号", "实发工资"], bank_frames()
+            )
             
             file_hash = ExportService._calculate_file_hash(output_path)
             
@@ -1268,7 +1737,7 @@ class ExportService:
         encrypt: bool = False
     ) -> Tuple[bool, str, Optional[str], Optional[str]]:
         """Export accounting voucher template."""
-        from app.security import sanitize_dataframe_for_export
+        import pandas as pd
         
         with session_scope() as session:
             run = PayrollRunRepository.get_by_id(session, run_id)
@@ -1301,8 +1770,7 @@ class ExportService:
             ]
             
             df = pd.DataFrame(data)
-            df = sanitize_dataframe_for_export(df)
-            df.to_excel(output_path, index=False, engine="openpyxl")
+            ExportService._write_excel_frames(output_path, list(df.columns), [df])
             
             file_hash = ExportService._calculate_file_hash(output_path)
             
@@ -1376,27 +1844,41 @@ class SystemService:
     def get_audit_logs(
         limit: int = 100,
         actor: Optional[str] = None,
-        action: Optional[str] = None
+        action: Optional[str] = None,
+        before: Optional[Tuple[datetime, int]] = None,
     ) -> List[Dict[str, Any]]:
-        """Get audit logs."""
+        """
+        Get audit logs, newest first.
+        
+        Args:
+            limit: Maximum number of entries
+            actor: Optional actor filter
+            action: Optional action filter
+            before: (created_at, id) of the last entry of the previous page
+        """
+        # Include entries still buffered by the audit writer; they are
+        # committed in the writer's own transaction, not this read
+        flush_audit_logs()
+        
         with session_scope() as session:
-            logs = AuditLogRepository.list_all(
+            logs = AuditLogRepository.list_recent(
                 session,
                 limit=limit,
                 actor=actor,
-                action=action
+                action=action,
+                before=before,
             )
             
             return [
                 {
-                    "id": log.id,
-                    "actor": log.actor,
-                    "action": log.action,
-                    "result": log.result,
-                    "resource_type": log.resource_type,
-                    "resource_id": log.resource_id,
-                    "metadata": json.loads(log.metadata_json) if log.metadata_json else None,
-                    "created_at": log.created_at.isoformat(),
+                    "id": log["id"],
+                    "actor": log["actor"],
+                    "action": log["action"],
+                    "result": log["result"],
+                    "resource_type": log["resource_type"],
+                    "resource_id": log["resource_id"],
+                    "metadata": log["metadata_json"],
+                    "created_at": log["created_at"].isoformat(),
                 }
                 for log in logs
             ]
@@ -1405,15 +1887,15 @@ class SystemService:
     def get_dashboard_stats() -> Dict[str, Any]:
         """Get dashboard statistics."""
         with session_scope() as session:
-            employee_count = EmployeeRepository.count_active(session)
             user_count = UserRepository.count(session)
+            audit_log_count = AuditLogRepository.count_approx(session)
             
             runs = PayrollRunRepository.list_all(session, limit=1)
             latest_run = runs[0] if runs else None
             
             return {
-                "active_employees": employee_count,
                 "total_users": user_count,
+                "audit_logs": audit_log_count,
                 "latest_payroll": {
                     "period": latest_run.period if latest_run else None,
                     "total_net": float(latest_run.total_net) if latest_run else 0,
@@ -0,0 +1,163 @@
+"""
+Payroll Calculation - 工资批量计算
+Vectorized payroll slip calculation over a whole run.
+
+All amounts are handled as integer cents (and quantities such as overtime
+hours as integer hundredths), so the arithmetic is exact and matches the
+Decimal ROUND_HALF_UP reference in PayrollService._calculate_slip.
+"""
+
+import functools
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Dict, Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from app.db import SalaryStructure, Attendance
+
+
+# Slip amount fields, in display order
+SLIP_AMOUNT_FIELDS = (
+    "base_salary", "overtime_pay", "allowances_total", "adjustments_add",
+    "gross_salary", "absence_deduction", "deductions_total", "adjustments_deduct",
+    "tax", "total_deductions", "net_salary",
+)
+
+# Largest magnitude that int64 arithmetic handles without overflow
+_INT64_SAFE = 2 ** 62
+
+_CENT = Decimal("0.01")
+
+
+def to_cents(value: Any) -> int:
+    """Convert a money value (or 2-decimal quantity) to integer hundredths, rounding half up."""
+    if isinstance(value, int):
+        return value * 100
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return int(value.quantize(_CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def from_cents(cents: int) -> Decimal:
+    """Convert integer cents back to a 2-decimal Decimal."""
+    # Exact: multiplying by 0.01 only shifts the exponent
+    return Decimal(int(cents)) * _CENT
+
+
+@functools.lru_cache(maxsize=4096)
+def _values_total_cents(values: tuple) -> int:
+    """
+    Sum allowance/deduction amounts to cents, memoized per set of values.
+
+    Structures are mostly copies of a few templates, so the same values
+    recur across a run and the Decimal parsing is done once per template.
+    """
+    return to_cents(sum((Decimal(str(v)) for v in values), Decimal("0")))
+
+
+def slip_inputs(
+    structure: SalaryStructure,
+    attendance: Optional[Attendance],
+    adj_add_cents: int,
+    adj_deduct_cents: int,
+) -> Dict[str, int]:
+    """
+    Build the integer inputs for one employee's slip.
+
+    Adjustment totals are taken in cents, as summed by the database.
+    Allowance and deduction dicts are summed here (they vary in shape per
+    employee, so the totals are cached by their values); everything else
+    is left to calculate_slips().
+    """
+    allowances = structure.allowances_json or {}
+    deductions = structure.deductions_json or {}
+
+    return {
+        "base_salary": to_cents(structure.base_salary),
+        "hourly_rate": to_cents(structure.hourly_rate),
+        "overtime_multiplier": to_cents(structure.overtime_multiplier),
+        "daily_deduction": to_cents(structure.daily_deduction),
+        # Zero for most employees in most months; skip the Decimal rounding
+        "overtime_hours": to_cents(attendance.overtime_hours) if attendance and attendance.overtime_hours else 0,
+        "absence_days": to_cents(attendance.absence_days) if attendance and attendance.absence_days else 0,
+        "allowances_total": _values_total_cents(tuple(allowances.values())),
+        "deductions_total": _values_total_cents(tuple(deductions.values())),
+        "adjustments_add": int(adj_add_cents),
+        "adjustments_deduct": int(adj_deduct_cents),
+    }
+
+
+def _exact_product(*columns: pd.Series) -> np.ndarray:
+    """Multiply integer columns, switching to Python ints if int64 could overflow."""
+    bound = 1
+    for column in columns:
+        bound *= int(column.abs().max()) if len(column) else 0
+
+    dtype = np.int64 if bound < _INT64_SAFE else object
+    result = np.ones(len(columns[0]), dtype=dtype)
+    for column in columns:
+        result = result * column.to_numpy(dtype=dtype)
+    return result
+
+
+def _round_div(numerator: np.ndarray, denominator: int) -> np.ndarray:
+    """Integer division rounding half away from zero (Decimal ROUND_HALF_UP)."""
+    quotient = (np.abs(numerator) + denominator // 2) // denominator
+    return np.where(numerator < 0, -quotient, quotient)
+
+
+def calculate_slips(inputs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate slips for many employees at once.
+    批量计算工资条
+
+    Args:
+        inputs: One row per employee with the columns produced by slip_inputs()
+
+    Returns:
+        DataFrame with the SLIP_AMOUNT_FIELDS columns in integer cents,
+        sharing the input index
+    """
+    # hours (1/100) * rate (cents) * multiplier (1/100) -> cents * 10^4
+    overtime_pay = _round_div(
+        _exact_product(inputs["overtime_hours"], inputs["hourly_rate"], inputs["overtime_multiplier"]),
+        10_000,
+    )
+    # days (1/100) * daily deduction (cents) -> cents * 10^2
+    absence_deduction = _round_div(
+        _exact_product(inputs["absence_days"], inputs["daily_deduction"]),
+        100,
+    )
+
+    slips = pd.DataFrame(index=inputs.index)
+    slips["base_salary"] = inputs["base_salary"]
+    slips["overtime_pay"] = overtime_pay
+    slips["allowances_total"] = inputs["allowances_total"]
+    slips["adjustments_add"] = inputs["adjustments_add"]
+    slips["gross_salary"] = (
+        slips["base_salary"] + slips["overtime_pay"]
+        + slips["allowances_total"] + slips["adjustments_add"]
+    )
+    slips["absence_deduction"] = absence_deduction
+    slips["deductions_total"] = inputs["deductions_total"]
+    slips["adjustments_deduct"] = inputs["adjustments_deduct"]
+    slips["tax"] = 0  # Simplified - 0 for now, same as _calculate_slip
+    slips["total_deductions"] = (
+        slips["absence_deduction"] + slips["deductions_total"]
+        + slips["adjustments_deduct"] + slips["tax"]
+    )
+    slips["net_salary"] = slips["gross_salary"] - slips["total_deductions"]
+
+    return slips[list(SLIP_AMOUNT_FIELDS)]
+
+
+def iter_slip_amounts(slips: pd.DataFrame) -> Iterable[tuple]:
+    """Yield (index, {field: Decimal}) pairs from a calculate_slips() result."""
+    # Convert column by column from plain Python ints, not row by row
+    columns = [
+        [Decimal(cents) * _CENT for cents in slips[field].tolist()]
+        for field in SLIP_AMOUNT_FIELDS
+    ]
+    for index, values in zip(slips.index.tolist(), zip(*columns)):
+        yield index, dict(zip(SLIP_AMOUNT_FIELDS, values))
@@ -1,28 +1,32 @@
 """
 UI module - 用户界面模块
 Provides Streamlit UI components and pages.
+
+Renderers are resolved on first access, so importing app.ui (or rendering
+the login page) does not load every page module and its dependencies.
 """
 
-from .pages import (
-    render_login_page,
-    render_dashboard_page,
-    render_import_page,
-    render_payroll_page,
-    render_export_page,
-    render_reports_page,
-    render_user_management_page,
-    render_audit_log_page,
-    render_settings_page,
-)
+import importlib
+
+# Public name -> module that defines it
+_EXPORTS = {
+    "logout": ".pages",
+    "render_login_page": ".pages",
+    "render_settings_page": ".pages",
+    "render_dashboard_page": ".dashboard_page",
+    "render_import_page": ".import_page",
+    "render_payroll_page": ".payroll_page",
+    "render_export_page": ".report_pages",
+    "render_reports_page": ".report_pages",
+    "render_user_management_page": ".admin_pages",
+    "render_audit_log_page": ".admin_pages",
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    "render_login_page",
-    "render_dashboard_page",
-    "render_import_page",
-    "render_payroll_page",
-    "render_export_page",
-    "render_reports_page",
-    "render_user_management_page",
-    "render_audit_log_page",
-    "render_settings_page",
-]
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
@@ -0,0 +1,119 @@
+"""
+Admin Pages - 用户管理与审计日志页面
+User management and audit log pages (admin only).
+"""
+
+from typing import Dict, Any
+
+import streamlit as st
+import pandas as pd
+
+from app.db import UserRole
+from app.services import AuthService, SystemService
+from .pages import get_current_user, has_role
+
+
+# =============================================================================
+# User Management Page
+# =============================================================================
+
+def render_user_management_page():
+    """Render the user management page."""
+    st.title("👥 用户管理")
+    
+    user = get_current_user()
+    
+    if not has_role([UserRole.ADMIN]):
+        st.error("权限不足")
+        return
+    
+    tab1, tab2 = st.tabs(["用户列表", "创建用户"])
+    
+    with tab1:
+        render_user_list()
+    
+    with tab2:
+        render_create_user(user)
+
+
+def render_user_list():
+    """Render user list."""
+    from app.db import session_scope, UserRepository
+    
+    with session_scope() as session:
+        users = UserRepository.list_summary(session, active_only=False)
+    
+    data = []
+    for u in users:
+        data.append({
+            "ID": u.id,
+            "用户名": u.username,
+            "角色": u.role.value,
+            "状态": "启用" if u.is_active else "禁用",
+            "最后登录": u.last_login.strftime("%Y-%m-%d %H:%M") if u.last_login else "从未",
+        })
+    
+    df = pd.DataFrame(data)
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+
+def render_create_user(current_user: Dict[str, Any]):
+    """Render create user form."""
+    st.subheader("创建新用户")
+    
+    with st.form("create_user_form"):
+        username = st.text_input("用户名")
+        password = st.text_input("密码", type="password")
+        role = st.selectbox("角色", [r.value for r in UserRole])
+        
+        submitted = st.form_submit_button("创建用户", use_container_width=True)
+        
+        if submitted:
+            if not username or not password:
+                st.error("请填写所有字段")
+            else:
+                role_enum = UserRole(role)
+                success, message = AuthService.create_user(
+                    username, password, role_enum, current_user["username"]
+                )
+                if success:
+                    st.success(message)
+                else:
+                    st.error(message)
+
+
+# =============================================================================
+# Audit Log Page
+# =============================================================================
+
+def render_audit_log_page():
+    """Render the audit log page."""
+    st.title("📋 审计日志")
+    
+    if not has_role([UserRole.ADMIN]):
+        st.error("权限不足")
+        return
+    
+    # Filters
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        actor_filter = st.text_input("操作者筛选")
+    
+    with col2:
+        action_filter = st.text_input("操作类型筛选")
+    
+    # Get logs
+    logs = SystemService.get_audit_logs(
+        limit=100,
+        actor=actor_filter if actor_filter else None,
+        action=action_filter if action_filter else None
+    )
+    
+    if logs:
+        df = pd.DataFrame(logs)
+        df = df[["created_at", "actor", "action", "result", "resource_type", "resource_id"]]
+        df.columns = ["时间", "操作者", "操作", "结果", "资源类型", "资源ID"]
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    else:
+        st.info("暂无日志记录")
@@ -0,0 +1,27 @@
+"""
+Cached Queries - 缓存查询
+Read-only reference lookups cached across Streamlit reruns.
+"""
+
+import streamlit as st
+
+from app.services import EmployeeService
+
+
+CACHE_TTL = "5m"
+CACHE_MAX_ENTRIES = 32
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_active_employee_count() -> int:
+    """Count active employees (cached; cleared when employees change)."""
+    return EmployeeService.count_active()
+
+
+def clear_employee_caches() -> None:
+    """Drop all cached employee lookups."""
+    cached_active_employee_count.clear()
+
+
+# Employee create/update/import invalidate the cached lookups
+EmployeeService.add_change_listener(clear_employee_caches)
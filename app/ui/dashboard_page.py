@@ -0,0 +1,87 @@
+"""
+Dashboard Page - 控制面板页面
+Key metrics, quick actions and recent activity.
+"""
+
+import streamlit as st
+import pandas as pd
+
+from app.services import SystemService
+from .cached_queries import cached_active_employee_count
+from .pages import get_current_user
+
+
+# =============================================================================
+# Dashboard Page
+# =============================================================================
+
+def render_dashboard_page():
+    """Render the main dashboard page."""
+    st.title("📊 控制面板")
+    
+    user = get_current_user()
+    st.write(f"欢迎，**{user['username']}** ({user['role']})")
+    
+    # Get statistics
+    stats = SystemService.get_dashboard_stats()
+    
+    # Key metrics
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("在职员工", cached_active_employee_count())
+    
+    with col2:
+        st.metric("系统用户", stats.get("total_users", 0))
+    
+    with col3:
+        latest = stats.get("latest_payroll")
+        if latest:
+            st.metric(
+                f"最近工资 ({latest['period']})",
+                f"¥{latest['total_net']:,.2f}"
+            )
+        else:
+            st.metric("最近工资", "暂无数据")
+    
+    with col4:
+        # From planner statistics, so it can trail the newest entries
+        st.metric("审计日志（约）", f"{stats.get('audit_logs', 0):,}")
+    
+    st.divider()
+    
+    # Quick actions
+    st.subheader("快速操作")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        if st.button("📥 导入数据", use_container_width=True):
+            st.session_state["page"] = "import"
+            st.rerun()
+    
+    with col2:
+        if st.button("💰 工资计算", use_container_width=True):
+            st.session_state["page"] = "payroll"
+            st.rerun()
+    
+    with col3:
+        if st.button("📤 导出报表", use_container_width=True):
+            st.session_state["page"] = "export"
+            st.rerun()
+    
+    with col4:
+        if st.button("📋 审计日志", use_container_width=True):
+            st.session_state["page"] = "audit"
+            st.rerun()
+    
+    # Recent audit logs
+    st.subheader("最近操作记录")
+    logs = SystemService.get_audit_logs(limit=10)
+    if logs:
+        df = pd.DataFrame(logs)
+        df = df[["created_at", "actor", "action", "result"]]
+        df.columns = ["时间", "操作者", "操作", "结果"]
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    else:
+        st.info("暂无操作记录")
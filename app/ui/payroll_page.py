@@ -0,0 +1,125 @@
+"""
+Payroll Page - 工资计算页面
+Payroll generation and payroll run pages.
+"""
+
+from datetime import datetime
+from typing import Dict, Any
+
+import streamlit as st
+import pandas as pd
+
+from app.db import UserRole
+from app.services import PayrollService
+from .pages import get_current_user, has_role
+
+
+# =============================================================================
+# Payroll Page
+# =============================================================================
+
+def render_payroll_page():
+    """Render the payroll calculation page."""
+    st.title("💰 工资计算")
+    
+    user = get_current_user()
+    
+    tab1, tab2 = st.tabs(["生成工资", "工资批次"])
+    
+    with tab1:
+        render_generate_payroll(user)
+    
+    with tab2:
+        render_payroll_runs(user)
+
+
+def render_generate_payroll(user: Dict[str, Any]):
+    """Render payroll generation section."""
+    st.subheader("生成工资")
+    
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        # Period selection
+        current_year = datetime.now().year
+        current_month = datetime.now().month
+        
+        year = st.selectbox("年份", range(current_year - 1, current_year + 2), index=1)
+        month = st.selectbox("月份", range(1, 13), index=current_month - 1)
+        
+        period = f"{year}-{month:02d}"
+    
+    with col2:
+        st.write("")
+        st.write("")
+        if st.button("🚀 生成工资", use_container_width=True, type="primary"):
+            with st.spinner("正在计算工资..."):
+                success, message, summary = PayrollService.generate_payroll(period, user["username"])
+                if success and summary:
+                    st.success(message)
+                    st.metric("处理员工数", summary.total_employees)
+                    st.metric("应发总额", f"¥{float(summary.total_gross):,.2f}")
+                    st.metric("实发总额", f"¥{float(summary.total_net):,.2f}")
+                else:
+                    st.error(message)
+
+
+def render_payroll_runs(user: Dict[str, Any]):
+    """Render payroll runs list."""
+    st.subheader("工资批次列表")
+    
+    runs = PayrollService.list_payroll_runs()
+    
+    if not runs:
+        st.info("暂无工资批次")
+        return
+    
+    for run in runs:
+        with st.expander(f"📋 {run['period']} - {run['status']} ({run['total_employees']}人)"):
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.write(f"**应发总额**: ¥{run['total_gross']:,.2f}")
+                st.write(f"**实发总额**: ¥{run['total_net']:,.2f}")
+            
+            with col2:
+                st.write(f"**生成者**: {run['generated_by']}")
+                st.write(f"**生成时间**: {run['created_at'][:19]}")
+            
+            with col3:
+                if run['status'] == 'draft':
+                    if st.button("🔒 锁定", key=f"lock_{run['id']}"):
+                        success, message = PayrollService.lock_payroll(run['id'], user['username'])
+                        if success:
+                            st.success(message)
+                            st.rerun()
+                        else:
+                            st.error(message)
+                elif run['status'] == 'locked':
+                    st.write(f"🔒 **已锁定** ({run['locked_at'][:10] if run['locked_at'] else ''})")
+                    
+                    if has_role([UserRole.ADMIN]):
+                        if st.button("🔓 解锁", key=f"unlock_{run['id']}"):
+                            if st.session_state.get(f"confirm_unlock_{run['id']}"):
+                                success, message = PayrollService.unlock_payroll(
+                                    run['id'], user['username'], confirmed=True
+                                )
+                                if success:
+                                    st.success(message)
+                                    del st.session_state[f"confirm_unlock_{run['id']}"]
+                                    st.rerun()
+                                else:
+                                    st.error(message)
+                            else:
+                                st.session_state[f"confirm_unlock_{run['id']}"] = True
+                                st.warning("再次点击确认解锁")
+            
+            # Show slips
+            slips = PayrollService.get_payroll_slips(run['id'])
+            if slips:
+                df = pd.DataFrame(slips)
+                display_cols = ['employee_no', 'employee_name', 'department', 
+                               'gross_salary', 'total_deductions', 'net_salary']
+                df_display = df[display_cols]
+                df_display.columns = ['员工编号', '姓名', '部门', '应发工资', '扣款合计', '实发工资']
+                st.dataframe(df_display, use_container_width=True, hide_index=True)
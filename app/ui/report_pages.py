@@ -0,0 +1,160 @@
+"""
+Report Pages - 报表导出与报表中心页面
+Export and reports pages.
+"""
+
+import tempfile
+
+import streamlit as st
+import pandas as pd
+
+from app.services import PayrollService, ExportService
+from .pages import get_current_user
+
+
+# =============================================================================
+# Export Page
+# =============================================================================
+
+def render_export_page():
+    """Render the export page."""
+    st.title("📤 报表导出")
+    
+    user = get_current_user()
+    
+    runs = PayrollService.list_payroll_runs()
+    
+    if not runs:
+        st.info("暂无可导出的工资批次")
+        return
+    
+    # Select payroll run
+    run_options = {f"{r['period']} ({r['status']})": r['id'] for r in runs}
+    selected_run = st.selectbox("选择工资批次", list(run_options.keys()))
+    run_id = run_options[selected_run]
+    
+    st.divider()
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.subheader("📊 工资汇总表")
+        if st.button("导出工资汇总", use_container_width=True):
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
+                success, message, file_path, file_hash = ExportService.export_payroll_summary(
+                    run_id, tmp.name, user["username"]
+                )
+                if success:
+                    with open(file_path, "rb") as f:
+                        st.download_button(
+                            "📥 下载文件",
+                            f,
+                            file_name=f"工资汇总_{selected_run.split()[0]}.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
+                    st.success(f"文件哈希: {file_hash[:16]}...")
+                else:
+                    st.error(message)
+    
+    with col2:
+        st.subheader("🏦 银行转账清单")
+        if st.button("导出银行清单", use_container_width=True):
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
+                success, message, file_path, file_hash = ExportService.export_bank_transfer(
+                    run_id, tmp.name, user["username"]
+                )
+                if success:
+                    with open(file_path, "rb") as f:
+                        st.download_button(
+                            "📥 下载文件",
+                            f,
+                            file_name=f"银行转账_{selected_run.split()[0]}.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
+                    st.success(f"文件哈希: {file_hash[:16]}...")
+                else:
+                    st.error(message)
+    
+    with col3:
+        st.subheader("📝 会计凭证")
+        if st.button("导出会计凭证", use_container_width=True):
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
+                success, message, file_path, file_hash = ExportService.export_accounting_voucher(
+                    run_id, tmp.name, user["username"]
+                )
+                if success:
+                    with open(file_path, "rb") as f:
+                        st.download_button(
+                            "📥 下载文件",
+                            f,
+                            file_name=f"会计凭证_{selected_run.split()[0]}.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
+                    st.success(f"文件哈希: {file_hash[:16]}...")
+                else:
+                    st.error(message)
+
+
+# =============================================================================
+# Reports Page
+# =============================================================================
+
+def render_reports_page():
+    """Render the reports/analytics page."""
+    st.title("📊 报表中心")
+    
+    # Get payroll runs for analysis
+    runs = PayrollService.list_payroll_runs(limit=12)
+    
+    if not runs:
+        st.info("暂无数据")
+        return
+    
+    # Monthly cost trend
+    st.subheader("月度人工成本趋势")
+    
+    df = pd.DataFrame(runs)
+    df = df.sort_values("period")
+    
+    st.line_chart(df.set_index("period")["total_net"])
+    
+    # Summary statistics
+    st.subheader("统计摘要")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("平均月度成本", f"¥{df['total_net'].mean():,.2f}")
+    
+    with col2:
+        st.metric("最高月度成本", f"¥{df['total_net'].max():,.2f}")
+    
+    with col3:
+        st.metric("总成本", f"¥{df['total_net'].sum():,.2f}")
+    
+    # Latest run, aggregated from its slips in SQL
+    latest = df.iloc[-1]
+    run_id = int(latest["id"])
+    st.subheader(f"最近批次 ({latest['period']})")
+    
+    summary = PayrollService.get_run_summary(run_id)
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("人数", summary["employees"])
+    
+    with col2:
+        st.metric("应发合计", f"¥{summary['total_gross']:,.2f}")
+    
+    with col3:
+        st.metric("扣款合计", f"¥{summary['total_deductions']:,.2f}")
+    
+    with col4:
+        st.metric("实发合计", f"¥{summary['total_net']:,.2f}")
+    
+    departments = PayrollService.get_department_summary(run_id)
+    if departments:
+        st.subheader("部门成本分布")
+        dept_df = pd.DataFrame(departments)
+        st.bar_chart(dept_df.set_index("department")["total_net"])
+        st.dataframe(dept_df, use_container_width=True, hide_index=True)
@@ -73,6 +73,9 @@ def mock_encryption():
         # Simple mock: just return the input with a prefix
         mock_instance.encrypt.side_effect = lambda x: f"ENC:{x}"
         mock_instance.decrypt.side_effect = lambda x: x.replace("ENC:", "") if x.startswith("ENC:") else x
+        mock_instance.encrypt_many.side_effect = lambda xs: [mock_instance.encrypt(x) if x else x for x in xs]
+        mock_instance.decrypt_many.side_effect = lambda xs: [mock_instance.decrypt(x) if x else x for x in xs]
+        mock_instance.decrypt_redacted.side_effect = lambda x: "****" + mock_instance.decrypt(x)[-4:] if x else x
         mock_em.return_value = mock_instance
         yield mock_instance
 
@@ -190,7 +193,39 @@ class TestAuthService:
         assert user is not None
         assert user.username == 'testuser'
         assert '成功' in message or user is not None
-    
+
+    def test_login_caches_successful_verify(self, test_db, mock_password_manager, mock_rate_limiter):
+        """Repeat logins skip the password hash until the password changes."""
+        from app.services.business import AuthService
+        from app.db import session_scope, UserRepository, UserRole
+
+        with session_scope() as session:
+            user = UserRepository.create(
+                session,
+                username='cacheuser',
+                password_hash=mock_password_manager.hash_password('cachepass123'),
+                role=UserRole.ADMIN
+            )
+            user_id = user.id
+
+        assert AuthService.login('cacheuser', 'cachepass123')[0] is True
+        assert AuthService.login('cacheuser', 'cachepass123')[0] is True
+        assert mock_password_manager.verify_password.call_count == 1
+
+        # Buffered login audit entries are visible to readers
+        from app.services.business import SystemService
+        logs = SystemService.get_audit_logs(actor='cacheuser', action='login')
+        assert len(logs) == 2
+
+        # Failures are never cached
+        assert AuthService.login('cacheuser', 'wrongpass123')[0] is False
+        assert AuthService.login('cacheuser', 'wrongpass123')[0] is False
+        assert mock_password_manager.verify_password.call_count == 3
+
+        AuthService.change_password(user_id, 'newpass12345', actor='admin')
+        assert AuthService.login('cacheuser', 'cachepass123')[0] is False
+        assert AuthService.login('cacheuser', 'newpass12345')[0] is True
+
     def test_login_wrong_password(self, test_db, mock_password_manager, mock_rate_limiter):
         """Test login failure with wrong password."""
         from app.services.business import AuthService
@@ -264,6 +299,68 @@ class TestAuthService:
         assert '禁用' in message
 
 
+# =============================================================================
+# RateLimiter Tests
+# =============================================================================
+
+class TestRateLimiter:
+    """Tests for the sharded login rate limiter."""
+
+    @staticmethod
+    def record_count(limiter):
+        return sum(len(records) for records, _ in limiter._shards)
+
+    def test_stale_records_evicted_after_window(self):
+        """Records past their window (and lockout) are swept on a later call."""
+        from app.security.rate_limiter import RateLimiter
+
+        limiter = RateLimiter(max_attempts=2, window_seconds=10, lockout_seconds=300)
+        with patch('app.security.rate_limiter.time.time') as clock:
+            clock.return_value = 1000.0
+            limiter.record_attempt('failing', success=False)
+            limiter.record_attempt('locked', success=False)
+            limiter.record_attempt('locked', success=False)
+            assert self.record_count(limiter) == 2
+
+            # Window over for both, but 'locked' is still serving its lockout
+            clock.return_value = 1000.0 + RateLimiter.GC_INTERVAL + 11
+            limiter.is_locked('someone_else')
+            assert self.record_count(limiter) == 1
+            assert limiter.is_locked('locked')[0] is True
+
+            # Lockout over as well (ends at 1300)
+            clock.return_value = 1300.0 + RateLimiter.GC_INTERVAL
+            assert limiter.is_locked('locked')[0] is False
+            assert self.record_count(limiter) == 0
+
+    def test_lock_state_across_shards(self):
+        """Locks on identifiers in different shards are tracked independently."""
+        from app.security.rate_limiter import RateLimiter
+
+        limiter = RateLimiter(max_attempts=1)
+        identifiers = [f'user_{i}' for i in range(64)]
+        for identifier in identifiers:
+            limiter.record_attempt(identifier, success=False)
+
+        assert sum(1 for records, _ in limiter._shards if records) > 1
+        assert all(limiter.is_locked(identifier)[0] for identifier in identifiers)
+
+        limiter.unlock('user_0')
+        assert limiter.is_locked('user_0')[0] is False
+        assert all(limiter.is_locked(identifier)[0] for identifier in identifiers[1:])
+
+    def test_unknown_identifier_lookups_do_not_create_records(self):
+        """is_locked and get_remaining_attempts never add records for unknown keys."""
+        from app.security.rate_limiter import RateLimiter
+
+        limiter = RateLimiter()
+        for i in range(100):
+            assert limiter.is_locked(f'probe_{i}') == (False, 0)
+            assert limiter.get_remaining_attempts(f'probe_{i}') == limiter.max_attempts
+
+        assert self.record_count(limiter) == 0
+
+
 # =============================================================================
 # EmployeeService Tests
 # =============================================================================
@@ -345,7 +442,72 @@ class TestEmployeeService:
         # Sensitive fields should be redacted (contain asterisks)
         if employee.get('bank_card'):
             assert '*' in employee['bank_card'] or employee['bank_card'] != data['bank_card']
-    
+            assert employee['bank_card'].endswith(data['bank_card'][-4:])
+
+    def test_update_employee(self, test_db, mock_encryption, sample_employee_data):
+        """Test updating an employee, a no-op update and a missing employee."""
+        from app.services.business import EmployeeService
+
+        data = sample_employee_data.copy()
+        data['employee_no'] = 'EMP_UPDATE_001'
+        _, _, employee_id = EmployeeService.create_employee(data, 'admin')
+
+        assert EmployeeService.update_employee(employee_id, {'department': '财务部'}, 'admin')[0] is True
+        assert EmployeeService.get_employee_with_sensitive_data(employee_id)['department'] == '财务部'
+
+        assert EmployeeService.update_employee(employee_id, {'unrelated': 1}, 'admin')[0] is True
+        assert EmployeeService.update_employee(999999, {'name': 'ghost'}, 'admin') == (False, "员工不存在")
+
+    def test_employee_change_listeners(self, test_db, mock_encryption, sample_employee_data):
+        """Change listeners run after employee create, update and import commits."""
+        import pandas as pd
+        from app.services.business import EmployeeService, ImportService
+        from app.db import EmployeeStatus
+
+        calls = []
+        listener = lambda: calls.append(1)
+        EmployeeService.add_change_listener(listener)
+        try:
+            data = sample_employee_data.copy()
+            data['employee_no'] = 'EMP_LISTEN_001'
+            _, _, employee_id = EmployeeService.create_employee(data, 'admin')
+            assert len(calls) == 1
+
+            # A rejected duplicate does not notify
+            assert EmployeeService.create_employee(data, 'admin')[0] is False
+            assert len(calls) == 1
+
+            EmployeeService.update_employee(employee_id, {'status': EmployeeStatus.INACTIVE}, 'admin')
+            assert len(calls) == 2
+
+            df = pd.DataFrame([{
+                '工号': 'EMP_LISTEN_002', '姓名': '监听', '部门': '技术部', '入职日期': '2024-01-01',
+            }])
+            assert ImportService.import_employees(df, 'admin')[0] is True
+            assert len(calls) == 3
+        finally:
+            EmployeeService._change_listeners.remove(listener)
+
+    def test_list_employees_sensitive(self, test_db, mock_encryption, sample_employee_data):
+        """Test batch retrieval decrypts each sensitive column in one call."""
+        from app.services.business import EmployeeService
+
+        employee_ids = []
+        for i in range(3):
+            data = sample_employee_data.copy()
+            data['employee_no'] = f'EMP_SENS_BATCH_{i}'
+            _, _, employee_id = EmployeeService.create_employee(data, 'admin')
+            employee_ids.append(employee_id)
+
+        mock_encryption.decrypt_many.reset_mock()
+        employees = EmployeeService.list_employees_sensitive(
+            employee_ids[::-1] + [999999], can_view_sensitive=True
+        )
+
+        assert [e['id'] for e in employees] == employee_ids[::-1]
+        assert all(e['bank_card'] == sample_employee_data['bank_card'] for e in employees)
+        assert mock_encryption.decrypt_many.call_count == 2
+
     def test_list_employees(self, test_db, mock_encryption, sample_employee_data):
         """Test listing all employees."""
         from app.services.business import EmployeeService
@@ -444,7 +606,60 @@ class TestSalaryStructureService:
         assert structure is not None
         assert structure['base_salary'] == sample_salary_structure['base_salary']
         assert structure['allowances'] == sample_salary_structure['allowances']
+    
+    def test_get_by_employees_batch(self, test_db, mock_encryption, sample_employee_data, sample_salary_structure):
+        """Test batch lookup of salary structures keyed by employee ID."""
+        from app.services.business import EmployeeService, SalaryStructureService
+        from app.db import session_scope, SalaryStructureRepository, EmployeeRepository
+        
+        employee_ids = []
+        for i in range(2):
+            data = sample_employee_data.copy()
+            data['employee_no'] = f'EMP_SAL_BATCH_{i}'
+            _, _, employee_id = EmployeeService.create_employee(data, 'admin')
+            SalaryStructureService.create_or_update(employee_id, sample_salary_structure, 'admin')
+            employee_ids.append(employee_id)
+        
+        with session_scope() as session:
+            structures = SalaryStructureRepository.get_by_employees(session, employee_ids + [999999])
+            
+            assert set(structures) == set(employee_ids)
+            assert all(s.base_salary == sample_salary_structure['base_salary'] for s in structures.values())
+            
+            employees = EmployeeRepository.get_by_ids(session, employee_ids + [999999])
+            assert set(employees) == set(employee_ids)
+        
+        with session_scope() as session:
+            from sqlalchemy import inspect
+            listed = EmployeeRepository.list_all(session)
+            assert 'bank_card_encrypted' in inspect(listed[0]).unloaded
+            assert 'employee_no' not in inspect(listed[0]).unloaded
 
+    
+    def test_bulk_upsert_inserts_and_updates(self, test_db, mock_encryption, sample_employee_data):
+        """Test bulk upsert creates new structures and overwrites existing ones."""
+        from app.services.business import EmployeeService, SalaryStructureService
+        from app.db import session_scope, SalaryStructureRepository
+        
+        data = sample_employee_data.copy()
+        data['employee_no'] = 'EMP_SAL_UPSERT'
+        _, _, employee_id = EmployeeService.create_employee(data, 'admin')
+        
+        row = {
+            'employee_id': employee_id,
+            'base_salary': Decimal('6000'),
+            'hourly_rate': Decimal('40'),
+            'allowances': {'餐补': 300},
+        }
+        with session_scope() as session:
+            assert SalaryStructureRepository.bulk_upsert(session, [row]) == 1
+        
+        with session_scope() as session:
+            SalaryStructureRepository.bulk_upsert(session, [dict(row, base_salary=Decimal('7000'))])
+        
+        structure = SalaryStructureService.get_by_employee(employee_id)
+        assert structure['base_salary'] == Decimal('7000')
+        assert structure['allowances'] == {'餐补': 300}
 
 # =============================================================================
 # PayrollService Tests
@@ -497,6 +712,79 @@ class TestPayrollService:
         assert summary.total_employees >= 1
         assert summary.total_gross > 0
         assert summary.total_net > 0
+        
+        # Run totals are aggregated from the persisted slips
+        run_id = PayrollService.list_payroll_runs()[0]['id']
+        slips = PayrollService.get_payroll_slips(run_id)
+        assert summary.total_employees == len(slips)
+        assert float(summary.total_net) == pytest.approx(sum(s['net_salary'] for s in slips))
+
+    def test_generate_payroll_chunked(self, test_db, mock_encryption, sample_employee_data, sample_salary_structure):
+        """Test payroll generation across several employee chunks."""
+        from app.services.business import EmployeeService, SalaryStructureService, PayrollService
+        from app.db import session_scope, AttendanceRepository
+
+        period = '2024-07'
+        for i in range(3):
+            data = sample_employee_data.copy()
+            data['employee_no'] = f'EMP_CHUNK_{i:03d}'
+            data['department'] = ['技术部', '财务部', '技术部'][i]
+            _, _, employee_id = EmployeeService.create_employee(data, 'admin')
+            SalaryStructureService.create_or_update(employee_id, sample_salary_structure, 'admin')
+            with session_scope() as session:
+                AttendanceRepository.create(session, employee_id=employee_id, period=period, work_days=22)
+
+        success, _, summary = PayrollService.generate_payroll(period, 'admin', chunk_size=1)
+
+        assert success is True
+        run_id = PayrollService.list_payroll_runs()[0]['id']
+        slips = PayrollService.get_payroll_slips(run_id)
+        assert summary.total_employees == len(slips) == 3
+        assert float(summary.total_net) == pytest.approx(sum(s['net_salary'] for s in slips))
+
+        # JSON form carries the same slips with exact decimal-string amounts
+        slips_json = json.loads(PayrollService.get_payroll_slips_json(run_id))
+        assert [s['id'] for s in slips_json] == [s['id'] for s in slips]
+        assert slips_json[0]['base_salary'] == '8000.00'
+        assert sum(Decimal(s['net_salary']) for s in slips_json) == summary.total_net
+
+        # Report KPIs and department breakdown are aggregated in SQL
+        run_summary = PayrollService.get_run_summary(run_id)
+        assert run_summary['employees'] == 3
+        assert run_summary['total_gross'] == pytest.approx(float(summary.total_gross))
+        assert run_summary['total_net'] == pytest.approx(float(summary.total_net))
+
+        departments = PayrollService.get_department_summary(run_id)
+        assert [(d['department'], d['employees']) for d in departments] == [('技术部', 2), ('财务部', 1)]
+        assert sum(d['total_net'] for d in departments) == pytest.approx(run_summary['total_net'])
+
+    def test_load_period_bundle(self, test_db, mock_encryption, sample_employee_data, sample_salary_structure):
+        """Test loading a period's payroll inputs in batch."""
+        from app.services.business import EmployeeService, SalaryStructureService
+        from app.db import (
+            session_scope, AttendanceRepository, AdjustmentRepository,
+            PayrollRunRepository, AdjustmentType,
+        )
+        
+        data = sample_employee_data.copy()
+        data['employee_no'] = 'EMP_BUNDLE_001'
+        _, _, employee_id = EmployeeService.create_employee(data, 'admin')
+        SalaryStructureService.create_or_update(employee_id, sample_salary_structure, 'admin')
+        
+        with session_scope() as session:
+            AttendanceRepository.create(session, employee_id=employee_id, period='2024-06', work_days=22)
+            AdjustmentRepository.create(session, employee_id, '2024-06', AdjustmentType.ADD, Decimal('300'))
+            AdjustmentRepository.create(session, employee_id, '2024-06', AdjustmentType.ADD, Decimal('200'))
+            AdjustmentRepository.create(session, employee_id, '2024-06', AdjustmentType.DEDUCT, Decimal('50'))
+            AdjustmentRepository.create(session, employee_id, '2024-05', AdjustmentType.ADD, Decimal('999'))
+        
+        with session_scope() as session:
+            bundle = PayrollRunRepository.load_period_bundle(session, '2024-06', [employee_id])
+            
+            assert employee_id in bundle.structures
+            assert bundle.attendance[employee_id].period == '2024-06'
+            assert bundle.adjustment_totals(employee_id) == (Decimal('500'), Decimal('50'))
+            assert bundle.adjustment_totals_cents(employee_id) == (50000, 5000)
     
     def test_generate_payroll_invalid_period(self, test_db):
         """Test payroll generation with invalid period format."""
@@ -566,6 +854,49 @@ class TestPayrollService:
             assert slips[0].get('net_salary') is not None
 
 
+class TestPayrollCalculation:
+    """Tests for the vectorized slip calculation."""
+    
+    def test_calculate_slips_matches_decimal_reference(self):
+        """Vectorized integer-cent results equal _calculate_slip exactly."""
+        import random
+        import pandas as pd
+        from types import SimpleNamespace
+        from app.services.business import PayrollService
+        from app.services.payroll_calc import slip_inputs, calculate_slips, iter_slip_amounts, to_cents
+        
+        rng = random.Random(42)
+        
+        def money(high):
+            return Decimal(rng.randint(0, high * 100)) / 100
+        
+        cases = {}
+        for employee_id in range(1, 201):
+            structure = SimpleNamespace(
+                base_salary=money(50000),
+                hourly_rate=money(500),
+                overtime_multiplier=rng.choice([Decimal('1.5'), Decimal('2'), Decimal('1.25')]),
+                daily_deduction=money(2000),
+                allowances_json={'餐补': float(money(1000)), '交通': int(money(500))},
+                deductions_json={'社保': float(money(2000)), '公积金': str(money(1000))},
+            )
+            attendance = SimpleNamespace(overtime_hours=money(80), absence_days=money(10))
+            cases[employee_id] = (structure, attendance, money(3000), money(3000))
+        
+        records = [
+            {
+                'employee_id': employee_id,
+                **slip_inputs(structure, attendance, to_cents(adj_add), to_cents(adj_deduct)),
+            }
+            for employee_id, (structure, attendance, adj_add, adj_deduct) in cases.items()
+        ]
+        slips = calculate_slips(pd.DataFrame.from_records(records, index='employee_id'))
+        
+        for employee_id, slip_data in iter_slip_amounts(slips):
+            expected = PayrollService._calculate_slip(*cases[employee_id])
+            assert slip_data == expected
+
+
 # =============================================================================
 # ImportService Tests
 # =============================================================================
@@ -612,7 +943,56 @@ class TestImportService:
         
         # Should either skip duplicates or update them (depending on implementation)
         assert success is True or '重复' in message or '已存在' in message
-    
+
+    def test_import_employees_batched_errors(self, test_db, mock_encryption):
+        """Duplicates (in file and in DB) and bad rows are reported per row across insert chunks."""
+        from app.services.business import ImportService, EmployeeService
+        from app.db import session_scope, EmployeeRepository
+
+        EmployeeService.create_employee({
+            'employee_no': 'IMP_BATCH_DB',
+            'name': '已存在',
+            'department': '测试部',
+            'hire_date': date(2023, 1, 1),
+        }, 'admin')
+
+        def row(no, name='员工', hire_date='2024-01-01'):
+            return {'员工编号': no, '姓名': name, '部门': '测试部', '入职日期': hire_date}
+
+        df = pd.DataFrame([
+            row('IMP_BATCH_1'),                       # 行 2
+            row('IMP_BATCH_1'),                       # 行 3: duplicate in file
+            row('IMP_BATCH_DB'),                      # 行 4: duplicate in DB
+            row('IMP_BATCH_2'),                       # 行 5
+            row('IMP_BATCH_BAD', hire_date='bad'),    # 行 6
+            row('IMP_BATCH_3'),                       # 行 7
+            row('IMP_BATCH_NONAME', name=None),       # 行 8
+            row('IMP_BATCH_4'),                       # 行 9
+        ])
+
+        # Four valid rows in chunks of two, with errors on both sides of the boundary
+        create_many = EmployeeRepository.create_many
+        with patch.object(ImportService, 'IMPORT_BATCH_SIZE', 2), \
+                patch.object(EmployeeRepository, 'create_many', side_effect=create_many) as spy:
+            success, message, count = ImportService.import_employees(df, 'admin')
+
+        assert success is True
+        assert count == 4
+        assert spy.call_count == 2
+        assert message == (
+            "部分成功：导入 4/8 名员工，4 行失败。错误: "
+            "行 3: 员工编号 IMP_BATCH_1 已存在; 行 4: 员工编号 IMP_BATCH_DB 已存在; "
+            "行 6: 入职日期无效; 行 8: 员工姓名无效"
+        )
+
+        with session_scope() as session:
+            ids = EmployeeRepository.get_id_map(
+                session, [f'IMP_BATCH_{i}' for i in range(1, 5)] + ['IMP_BATCH_BAD', 'IMP_BATCH_NONAME']
+            )
+            assert sorted(ids) == [f'IMP_BATCH_{i}' for i in range(1, 5)]
+            # The existing employee is left untouched
+            assert EmployeeRepository.get_by_employee_no(session, 'IMP_BATCH_DB').name == '已存在'
+
     def test_import_salary_structures(self, test_db, mock_encryption):
         """Test importing salary structures."""
         from app.services.business import ImportService, EmployeeService
@@ -659,10 +1039,20 @@ class TestImportService:
         ])
         
         success, message, count = ImportService.import_attendance(df, 'admin')
-        
+
         assert success is True
         assert count == 1
-    
+
+        # Re-importing updates the existing record in place
+        from app.db import session_scope, AttendanceRepository, EmployeeRepository
+        df['工作天数'] = 21
+        ImportService.import_attendance(df, 'admin')
+        with session_scope() as session:
+            employee_id = EmployeeRepository.get_id_map(session, ['IMP_ATT_001'])['IMP_ATT_001']
+            attendance = AttendanceRepository.get_by_employee_period(session, employee_id, '2024-02')
+            assert attendance.work_days == 21
+            assert attendance.work_hours == 168
+
     def test_import_adjustments(self, test_db, mock_encryption):
         """Test importing adjustment records."""
         from app.services.business import ImportService, EmployeeService
@@ -786,7 +1176,30 @@ class TestExportService:
         for input_val, expected in dangerous_values:
             result = sanitize_for_spreadsheet(input_val)
             assert result == expected, f"Failed for input: {input_val}"
-    
+
+    def test_sanitize_dataframe_object_columns_without_strings(self):
+        """Object columns of ints, Decimals, bytes or None are sanitized without errors."""
+        from app.security import sanitize_dataframe_for_export, iter_sanitized_rows
+
+        df = pd.DataFrame({
+            'ints': pd.Series([1, 2], dtype=object),
+            'decimals': pd.Series([Decimal('1.50'), Decimal('-2')], dtype=object),
+            'bytes': pd.Series([b'=x', b'y'], dtype=object),
+            'nones': pd.Series([None, None], dtype=object),
+            'mixed_int': pd.Series(['=bad', 3], dtype=object),
+            'text': ['=SUM(A1)', 'ok'],
+        })
+
+        result = sanitize_dataframe_for_export(df)
+
+        assert result['ints'].tolist() == [1, 2]
+        assert result['decimals'].tolist() == [Decimal('1.50'), Decimal('-2')]
+        assert result['bytes'].tolist() == [b'=x', b'y']
+        assert result['nones'].tolist() == [None, None]
+        assert result['mixed_int'].tolist() == ["'=bad", 3]
+        assert result['text'].tolist() == ["'=SUM(A1)", 'ok']
+        assert len(list(iter_sanitized_rows(df))) == 2
+
     def test_export_bank_transfer(self, setup_export_data, tmp_path):
         """Test exporting bank transfer file with decrypted bank cards."""
         from app.services.business import ExportService
@@ -858,6 +1271,167 @@ class TestSystemService:
         assert len(logs) >= 1
         assert logs[0].get('actor') is not None
         assert logs[0].get('action') is not None
+    
+    def test_get_audit_logs_keyset_pagination(self, test_db):
+        """Test paging through audit logs with a (created_at, id) cursor."""
+        from app.services.business import SystemService
+        from app.db import session_scope, AuditLogRepository
+        
+        same_time = datetime(2024, 1, 1, 12, 0, 0)
+        with session_scope() as session:
+            AuditLogRepository.bulk_create(session, [
+                {'actor': 'pager', 'action': f'page_{i}', 'created_at': same_time}
+                for i in range(5)
+            ])
+        
+        first = SystemService.get_audit_logs(limit=3, actor='pager')
+        last = first[-1]
+        cursor = (datetime.fromisoformat(last['created_at']), last['id'])
+        second = SystemService.get_audit_logs(limit=3, actor='pager', before=cursor)
+        
+        assert len(first) == 3
+        assert len(second) == 2
+        assert {log['id'] for log in first}.isdisjoint(log['id'] for log in second)
+
+    
+    def test_audit_log_count_approx(self, test_db):
+        """Test approximate audit count falls back to COUNT(*) and uses ANALYZE stats."""
+        from sqlalchemy import text
+        from app.db import session_scope, AuditLogRepository, flush_audit_logs
+        
+        # Settle entries buffered by earlier tests so the count is stable
+        flush_audit_logs()
+        with session_scope() as session:
+            AuditLogRepository.bulk_create(session, [
+                {'actor': 'counter', 'action': 'tick'} for _ in range(7)
+            ])
+        
+        with session_scope() as session:
+            # Drop any statistics gathered by earlier tests
+            if session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )).first():
+                session.execute(text("DELETE FROM sqlite_stat1 WHERE tbl = 'audit_logs'"))
+            
+            exact = AuditLogRepository.count(session)
+            assert AuditLogRepository.count_approx(session, max_age=0) == exact
+            
+            session.execute(text("ANALYZE"))
+            assert AuditLogRepository.count_approx(session, max_age=0) == exact
+        
+        # The estimate is read from the statistics, not a fresh scan
+        with session_scope() as session:
+            AuditLogRepository.bulk_create(session, [
+                {'actor': 'counter', 'action': 'tock'} for _ in range(3)
+            ])
+        with session_scope() as session:
+            assert AuditLogRepository.count_approx(session, max_age=0) == exact
+            session.execute(text("ANALYZE"))
+            assert AuditLogRepository.count_approx(session, max_age=0) == exact + 3
+
+    def test_audit_enqueue_on_commit(self, test_db):
+        """Audit entries tied to a session are queued on commit and dropped on rollback."""
+        from app.db import session_scope, get_audit_writer
+        from app.services.business import SystemService
+
+        writer = get_audit_writer()
+        with session_scope() as session:
+            writer.enqueue_on_commit(session, actor='hooked', action='kept')
+
+        with pytest.raises(RuntimeError):
+            with session_scope() as session:
+                writer.enqueue_on_commit(session, actor='hooked', action='dropped')
+                raise RuntimeError("abort")
+
+        logs = SystemService.get_audit_logs(actor='hooked')
+        assert [log['action'] for log in logs] == ['kept']
+
+    def test_audit_flush_into_session_requeued_on_rollback(self, test_db):
+        """Entries flushed into a caller's session return to the buffer if it rolls back."""
+        from app.db import session_scope, AuditLogWriter
+        from app.services.business import SystemService
+
+        # Long interval: the background thread must not flush behind the test
+        writer = AuditLogWriter(flush_interval=3600)
+        writer.enqueue(actor='flush_rollback', action='requeued')
+
+        with pytest.raises(RuntimeError):
+            with session_scope() as session:
+                assert writer.flush(session) == 1
+                assert writer.pending_count() == 0
+                raise RuntimeError("abort")
+
+        assert writer.pending_count() == 1
+        assert writer.flush() == 1
+
+        logs = SystemService.get_audit_logs(actor='flush_rollback')
+        assert [log['action'] for log in logs] == ['requeued']
+
+    def test_create_all_tables_migrates_legacy_data(self, tmp_path):
+        """Existing databases get legacy JSON text and ciphertexts migrated once."""
+        import base64
+        from sqlalchemy import create_engine, text
+        from app.db import create_all_tables
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        create_all_tables(engine)
+        legacy_token = base64.urlsafe_b64encode(b"gAAAAAlegacy").decode()
+        with engine.begin() as conn:
+            # Pretend the database predates the migrations
+            conn.execute(text("PRAGMA user_version = 0"))
+            conn.execute(text(
+                "INSERT INTO employees (employee_no, name, department, hire_date, status, "
+                "bank_card_encrypted, created_at, updated_at) VALUES "
+                "('LEG001', 'n', 'd', '2024-01-01', 'active', :token, '2024-01-01', '2024-01-01')"
+            ), {"token": legacy_token})
+            conn.execute(text(
+                "INSERT INTO audit_logs (actor, action, result, metadata_json, created_at) "
+                "VALUES ('a', 'legacy', 'success', '', '2024-01-01')"
+            ))
+
+        create_all_tables(engine)
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT bank_card_encrypted FROM employees")).scalar() == "gAAAAAlegacy"
+            assert conn.execute(text("SELECT metadata_json FROM audit_logs")).scalar() is None
+            assert conn.execute(text("PRAGMA user_version")).scalar() >= 1
+        engine.dispose()
+
+    def test_create_all_tables_drops_replaced_indexes(self, tmp_path):
+        """Indexes superseded by wider ones are removed from existing databases."""
+        from sqlalchemy import create_engine, inspect, text
+        from app.db import create_all_tables
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'old_index.db'}")
+        create_all_tables(engine)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE INDEX idx_adjustment_employee_period ON adjustments (employee_id, period)"
+            ))
+            conn.execute(text("CREATE INDEX idx_slip_employee ON payroll_slips (employee_id)"))
+
+        create_all_tables(engine)
+
+        inspector = inspect(engine)
+        names = {index["name"] for index in inspector.get_indexes("adjustments")}
+        assert "idx_adjustment_employee_period" not in names
+        assert "idx_adjustment_employee_period_amount" in names
+
+        names = {index["name"] for index in inspector.get_indexes("payroll_slips")}
+        assert "idx_slip_employee" not in names
+        assert "idx_slip_employee_run" in names
+        engine.dispose()
+
+    def test_session_scope_keeps_objects_after_commit(self, test_db):
+        """Sessions do not expire objects on commit, so they stay usable after the scope."""
+        from sqlalchemy import inspect
+        from app.db import session_scope, UserRepository, UserRole
+
+        with session_scope() as session:
+            user = UserRepository.create(session, "scope_user", "hash", UserRole.EMPLOYEE)
+
+        assert not inspect(user).expired
+        assert user.username == "scope_user"
 
 
 # =============================================================================